@@ -0,0 +1,91 @@
+"""
+Run the benchmark suite and compare it with the stored baseline.
+
+    python -m benchmarks                      # run everything, compare with benchmarks/baseline.json
+    python -m benchmarks config.factory       # only benchmarks whose name contains 'config.factory'
+    python -m benchmarks --save-baseline      # store the results as the new baseline
+
+The report is also written to `bench_output.txt` in the repository root. The exit status is 1 if any benchmark is
+slower than its baseline by more than the threshold, or has no baseline.
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+from benchmarks.harness import BASELINE_PATH, DEFAULT_THRESHOLD, compare, load_baseline, run, save_baseline
+
+
+SUITES = ('benchmarks.suite_config', 'benchmarks.suite_controller', 'benchmarks.suite_instrumentation')
+OUTPUT_PATH = Path(__file__).parent.parent / 'bench_output.txt'
+
+
+class Tee:
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Run the InspyreFire benchmark suite.')
+    parser.add_argument('selected', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='the baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='the allowed slowdown, as a fraction of the baseline (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repeats per benchmark (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per repeat (default: %(default)s)')
+    parser.add_argument('--output', type=Path, default=OUTPUT_PATH, help='where to write the report')
+    parser.add_argument('--use-user-dirs', action='store_true',
+                        help="use the real user config and cache directories instead of throwaway ones")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if not args.use_user_dirs:
+        # Importing the config package creates config files in the user directories; keep the benchmarks out of them.
+        scratch = tempfile.mkdtemp(prefix='inspyre-fire-bench-')
+
+        for variable in ('XDG_CONFIG_HOME', 'XDG_CACHE_HOME', 'XDG_DATA_HOME', 'XDG_STATE_HOME'):
+            os.environ[variable] = os.path.join(scratch, variable.lower())
+
+    with open(args.output, 'w') as report:
+        output = Tee(sys.stdout, report)
+
+        for suite in SUITES:
+            try:
+                importlib.import_module(suite)
+            except ImportError as e:
+                print(f'Skipping {suite}: {e}', file=output)
+
+        results = run(args.selected or None, args.repeat, args.min_time, output)
+        regressions = compare(results, load_baseline(args.baseline), args.threshold)
+
+        if args.save_baseline:
+            save_baseline(results, args.baseline)
+            print(f'\nSaved {len(results)} results to {args.baseline}', file=output)
+        elif regressions:
+            print(f'\n{len(regressions)} problem(s) against the baseline (limit {args.threshold:.0%}):', file=output)
+
+            for line in regressions:
+                print(f'  {line}', file=output)
+        else:
+            print(f'\nNo regressions beyond {args.threshold:.0%}.', file=output)
+
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
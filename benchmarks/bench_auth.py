@@ -0,0 +1,47 @@
+"""
+Compare the cost of a connection handshake with a cold signer (key parsed from disk) and a warm one (cached).
+
+Run with `python -m benchmarks.bench_auth` from the repository root.
+"""
+import tempfile
+from pathlib import Path
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.auth import KeyManager
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+ROUNDS = 20
+
+
+def connect(key_path):
+    controller = Controller(host='127.0.0.1', port=5555, adbkey=key_path, device=FakeAdbDevice(latency=0))
+    controller.connect()
+    controller.close()
+
+    return controller.last_handshake
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = Path(tmp) / 'adbkey'
+        KeyManager(key_path).ensure_key()
+
+        cold = []
+        for _ in range(ROUNDS):
+            KeyManager.clear_cache()
+            cold.append(connect(key_path))
+
+        warm = [connect(key_path) for _ in range(ROUNDS)]
+
+    def report(label, timings):
+        total = sum(t.total for t in timings) / len(timings)
+        signer = sum(t.signer for t in timings) / len(timings)
+        print(f'  {label}: handshake {total * 1000:8.3f} ms  (signer {signer * 1000:8.3f} ms)')
+
+    print(f'{ROUNDS} handshakes each against a local stand-in')
+    report('cold', cold)
+    report('warm', warm)
+
+
+if __name__ == '__main__':
+    main()
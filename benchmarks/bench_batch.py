@@ -0,0 +1,51 @@
+"""
+Compare running 100 small shell commands one at a time against running them as a single batch.
+
+Run with `python -m benchmarks.bench_batch` from the repository root.
+"""
+import time
+from inspyre_fire.controller import Controller
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+COMMAND_COUNT = 100
+
+
+def make_controller(latency):
+    controller = Controller(host='127.0.0.1', port=5555, adbkey='', device=FakeAdbDevice(latency))
+    controller.connect()
+
+    return controller
+
+
+def bench_unbatched(controller, commands):
+    start = time.perf_counter()
+
+    for command in commands:
+        controller.shell(command)
+
+    return time.perf_counter() - start
+
+
+def bench_batched(controller, commands):
+    start = time.perf_counter()
+    controller.batch(commands).run()
+
+    return time.perf_counter() - start
+
+
+def main(latency=0.005):
+    commands = [f'echo {i}' for i in range(COMMAND_COUNT)]
+    controller = make_controller(latency)
+
+    unbatched = bench_unbatched(controller, commands)
+    batched = bench_batched(controller, commands)
+
+    print(f'{COMMAND_COUNT} commands, {latency * 1000:.1f} ms simulated round trip')
+    print(f'  unbatched: {unbatched:8.4f}s  ({COMMAND_COUNT / unbatched:10.1f} cmd/s)')
+    print(f'  batched:   {batched:8.4f}s  ({COMMAND_COUNT / batched:10.1f} cmd/s)')
+    print(f'  speedup:   {unbatched / batched:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
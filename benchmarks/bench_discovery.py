@@ -0,0 +1,55 @@
+"""
+Time a discovery scan of a loopback /24 with a handful of local listeners standing in for devices, at several
+concurrency caps.
+
+Linux routes all of 127.0.0.0/8 to the loopback interface, so each listener gets its own address. Fingerprinting is
+disabled; the listeners do not speak ADB.
+
+Run with `python -m benchmarks.bench_discovery` from the repository root.
+"""
+import socket
+import tempfile
+import time
+from pathlib import Path
+from inspyre_fire.controller.discovery import DeviceDiscovery
+
+
+NETWORK = '127.0.42.0/24'
+PORT = 15555
+LISTENER_COUNT = 8
+
+
+def start_listeners():
+    listeners = []
+
+    for index in range(LISTENER_COUNT):
+        listener = socket.socket()
+        listener.bind((f'127.0.42.{10 + index * 20}', PORT))
+        listener.listen()
+        listeners.append(listener)
+
+    return listeners
+
+
+def main():
+    listeners = start_listeners()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = Path(temp_dir, 'discovered_devices.json')
+
+        for concurrency in (8, 64, 256):
+            discovery = DeviceDiscovery([PORT], concurrency, fingerprint=False, cache_path=cache_path)
+            start = time.perf_counter()
+            devices = discovery.discover(NETWORK, refresh=True)
+            print(f'concurrency {concurrency:3d}: {len(devices)} devices in {(time.perf_counter() - start) * 1000:7.1f} ms')
+
+        start = time.perf_counter()
+        devices = discovery.discover(NETWORK)
+        print(f'from cache:      {len(devices)} devices in {(time.perf_counter() - start) * 1000:7.1f} ms')
+
+    for listener in listeners:
+        listener.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure the press-to-accept latency of the key input session with each backend.
+
+The local ADB stand-in runs `input` and `sendevent` scripts instead of the device's binaries. `sendevent` returns at
+once, like the native binary; `input` first sleeps for the simulated start of the Android runtime, which the real
+command pays on every invocation. Isolated presses (each one waited for) and bursts of presses are measured.
+
+Run with `python -m benchmarks.bench_keys [ROUND_TRIP_MS] [RUNTIME_START_MS]` from the repository root; the defaults
+are a 5 ms round trip and a 200 ms runtime start.
+"""
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from inspyre_fire.controller import Controller
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+ISOLATED_PRESSES = 50
+BURSTS = 10
+BURST_SIZE = 10
+TARGET = 0.050
+
+SCRIPTS = {
+        'input':     '#!/bin/sh\nsleep "$INPUT_RUNTIME_START"\n',
+        'sendevent': '#!/bin/sh\n:\n',
+        }
+
+
+def make_controller(latency):
+    controller = Controller(host='127.0.0.1', port=5555, adbkey='', device=FakeAdbDevice(latency))
+    controller.connect()
+
+    return controller
+
+
+def measure(controller, backend):
+    session = controller.key_input(backend, device_node='/dev/input/event0')
+    isolated = []
+
+    for _ in range(ISOLATED_PRESSES):
+        session.press('down')
+        session.wait()
+        isolated.append(session.latencies[-1])
+
+    bursts = []
+
+    for _ in range(BURSTS):
+        for _ in range(BURST_SIZE):
+            session.press('right')
+
+        session.wait()
+        # Presses queued behind a running batch wait for it and then go out in the next one.
+        bursts.append(max(session.latencies[-BURST_SIZE:]))
+
+    session.stop()
+
+    if session.errors:
+        raise session.errors[-1]
+
+    return isolated, bursts
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    round_trip = float(argv[0]) / 1000 if argv else 0.005
+    runtime_start = float(argv[1]) / 1000 if len(argv) > 1 else 0.2
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, script in SCRIPTS.items():
+            path = Path(directory, name)
+            path.write_text(script)
+            path.chmod(0o755)
+
+        environment = dict(os.environ)
+        os.environ['PATH'] = f'{directory}{os.pathsep}{os.environ["PATH"]}'
+        os.environ['INPUT_RUNTIME_START'] = str(runtime_start)
+        controller = make_controller(round_trip)
+
+        try:
+            print(f'{round_trip * 1000:.0f} ms simulated round trip, {runtime_start * 1000:.0f} ms runtime start for '
+                  f'`input`; target {TARGET * 1000:.0f} ms')
+
+            for backend in ('sendevent', 'input'):
+                isolated, bursts = measure(controller, backend)
+                median = statistics.median(isolated)
+
+                print(f'  {backend:<9} isolated: median {median * 1000:6.1f} ms, max {max(isolated) * 1000:6.1f} ms '
+                      f'({"meets" if median < TARGET else "misses"} target); '
+                      f'slowest of a burst of {BURST_SIZE}: median {statistics.median(bursts) * 1000:6.1f} ms')
+        finally:
+            controller.close()
+            os.environ.clear()
+            os.environ.update(environment)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Compare replaying a navigation macro key by key against replaying it as one compiled script, on one device and
+across a fleet of devices.
+
+Run with `python -m benchmarks.bench_macros` from the repository root.
+"""
+import time
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.fleet import DeviceEntry, DeviceInventory, FleetController
+from inspyre_fire.controller.macros import Macro
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+DEVICE_COUNT = 16
+
+
+def navigation_macro():
+    macro = Macro('toggle-setting').add('home')
+
+    for key in ['right'] * 6 + ['select'] + ['down'] * 4 + ['select', 'back', 'back']:
+        macro.add(key)
+
+    return macro
+
+
+def make_controller(entry, latency):
+    controller = Controller(host=entry.host, port=entry.port, adbkey='', name=entry.name, device=FakeAdbDevice(latency))
+    controller.connect()
+
+    return controller
+
+
+def key_by_key(macro, controller):
+    start = time.perf_counter()
+
+    for step in macro.steps:
+        controller.shell(f'input keyevent {step.keycode}')
+
+    return time.perf_counter() - start
+
+
+def main(latency=0.005):
+    macro = navigation_macro()
+    entries = [DeviceEntry(f'tv-{i}', f'10.0.0.{i}') for i in range(DEVICE_COUNT)]
+    controller = make_controller(entries[0], latency)
+
+    print(f'{len(macro)}-key macro, {latency * 1000:.0f} ms simulated round trip')
+    print(f'  key by key:         {key_by_key(macro, controller) * 1000:8.1f} ms')
+    print(f'  compiled script:    {macro.play(controller) * 1000:8.1f} ms')
+
+    fleet = FleetController(DeviceInventory(entries), controller_factory=lambda entry: make_controller(entry, latency))
+    fleet.controllers
+
+    start = time.perf_counter()
+    fleet.run(lambda c: key_by_key(macro, c))
+    print(f'  {DEVICE_COUNT} devices, key by key:      {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+    result = macro.play_fleet(fleet)
+    print(f'  {DEVICE_COUNT} devices, compiled script: {result.elapsed * 1000:8.1f} ms '
+          f'({len(result.succeeded)} ok, {len(result.failed)} failed)')
+
+    fleet.close_all()
+    controller.close()
+
+
+if __name__ == '__main__':
+    main()
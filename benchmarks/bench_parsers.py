@@ -0,0 +1,146 @@
+"""
+Compare ad-hoc, whole-output parsing of `dumpsys package` against the streaming parsers, with and without early exit.
+
+Pass paths to captured `adb shell dumpsys package packages > dumpsys.txt` fixtures to use them; otherwise a
+synthetic fixture with a few thousand packages is generated.
+
+The device section runs the same lookups through a controller on the local ADB stand-in, with a `dumpsys` script
+that serves the fixture. Like adb-shell, the stand-in keeps sending the output of a stream that is closed early, so
+an early exit from the whole dump only saves parsing; `package_index([name])` asks the device for just that package.
+
+Run with `python -m benchmarks.bench_parsers [fixture ...]` from the repository root.
+"""
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fake_adb import FakeAdbDevice
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.parsers import iter_lines, parse_dumpsys_packages
+
+
+PACKAGE_COUNT = 3000
+CHUNK_SIZE = 64 * 1024
+ROUNDS = 5
+
+# `dumpsys package packages` serves the whole fixture, `dumpsys package <name>` just that package's block.
+DUMPSYS_SCRIPT = '''#!/bin/sh
+if [ "$2" = packages ]; then
+    cat "$DUMPSYS_FIXTURE"
+else
+    awk -v name="$2" '/^  Package \\[/ { on = index($0, "[" name "]") > 0 } on' "$DUMPSYS_FIXTURE"
+fi
+'''
+
+
+def synthetic_fixture(count=PACKAGE_COUNT):
+    lines = ['Packages:']
+
+    for i in range(count):
+        lines.append(f'  Package [com.example.app{i}] (a{i:x}):')
+        lines.append(f'    userId={10000 + i}')
+        lines.append(f'    pkg=Package{{a{i:x} com.example.app{i}}}')
+        lines.append(f'    codePath=/data/app/com.example.app{i}-1')
+        lines.extend(f'    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ALLOW_BACKUP ] detail{j}' for j in range(20))
+        lines.append(f'    versionCode={i * 3} minSdk=22 targetSdk=30')
+        lines.append(f'    versionName=1.{i}.0')
+        lines.extend(f'    android.permission.PERMISSION_{j}: granted=true' for j in range(15))
+
+    return '\n'.join(lines) + '\n'
+
+
+def chunks(text):
+    for start in range(0, len(text), CHUNK_SIZE):
+        yield text[start:start + CHUNK_SIZE]
+
+
+def adhoc_parse(text):
+    index = {}
+    current = None
+
+    for line in text.splitlines():
+        stripped = line.strip()
+
+        if stripped.startswith('Package ['):
+            current = stripped.split('[')[1].split(']')[0]
+            index[current] = {}
+        elif current and stripped.startswith('userId='):
+            index[current]['uid'] = int(stripped.split('=')[1])
+        elif current and stripped.startswith('versionCode='):
+            index[current]['version_code'] = int(stripped.split('=')[1].split()[0])
+        elif current and stripped.startswith('versionName='):
+            index[current]['version_name'] = stripped.split('=')[1]
+
+    return index
+
+
+def timed(function, *args):
+    best = float('inf')
+
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def device_lookups(text, target):
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = Path(directory, 'dumpsys.txt')
+        fixture.write_text(text)
+        script = Path(directory, 'dumpsys')
+        script.write_text(DUMPSYS_SCRIPT)
+        script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+        environment = dict(os.environ)
+        os.environ['PATH'] = f'{directory}{os.pathsep}{os.environ["PATH"]}'
+        os.environ['DUMPSYS_FIXTURE'] = str(fixture)
+
+        controller = Controller(host='127.0.0.1', port=5555, adbkey='', device_factory=lambda: FakeAdbDevice(latency=0))
+        controller.connect()
+
+        def early_exit():
+            parse_dumpsys_packages(controller.stream_lines('dumpsys package packages'), [target])
+            # The next command waits for the rest of the dump to arrive.
+            controller.shell('true')
+
+        try:
+            return (
+                    timed(controller.package_index),
+                    timed(early_exit),
+                    timed(lambda: controller.package_index([target])),
+                    )
+        finally:
+            controller.close()
+            os.environ.clear()
+            os.environ.update(environment)
+
+
+def main(paths=()):
+    fixtures = [(str(path), Path(path).read_text()) for path in paths] or [('synthetic', synthetic_fixture())]
+
+    for name, text in fixtures:
+        names = list(parse_dumpsys_packages(iter_lines(chunks(text))))
+        target = names[len(names) // 10] if names else None
+
+        print(f'{name}: {len(text) / 1024 / 1024:.1f} MiB, {len(names)} packages (best of {ROUNDS})')
+        print(f'  ad-hoc, whole output:     {timed(adhoc_parse, text) * 1000:8.1f} ms')
+        print(f'  streaming, full index:    '
+              f'{timed(lambda: parse_dumpsys_packages(iter_lines(chunks(text)))) * 1000:8.1f} ms')
+
+        if target:
+            print(f'  streaming, one package:   '
+                  f'{timed(lambda: parse_dumpsys_packages(iter_lines(chunks(text)), [target])) * 1000:8.1f} ms')
+
+            full, early_exit, filtered = device_lookups(text, target)
+            print('  through the ADB stand-in:')
+            print(f'    full index:             {full * 1000:8.1f} ms')
+            print(f'    one package, early exit:{early_exit * 1000:8.1f} ms')
+            print(f'    one package, on device: {filtered * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
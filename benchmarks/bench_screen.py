@@ -0,0 +1,62 @@
+"""
+Measure how many frames per second the screen capture pipeline can decode and delta-encode.
+
+Pass a directory of recorded raw captures (the output of `adb exec-out screencap > frame.raw`) to replay them;
+otherwise a synthetic 1920x1080 sequence with a moving box is used.
+
+Run with `python -m benchmarks.bench_screen [frames_dir]` from the repository root.
+"""
+import struct
+import sys
+import time
+from pathlib import Path
+from inspyre_fire.controller.screen import Frame, ScreenCapture
+
+
+WIDTH, HEIGHT, BPP = 1920, 1080, 4
+FRAME_COUNT = 60
+BOX = 200
+
+
+def synthetic_frames(count=FRAME_COUNT):
+    header = struct.pack('<IIII', WIDTH, HEIGHT, 1, 0)
+    background = bytearray(b'\x20\x40\x60\xff' * (WIDTH * HEIGHT))
+    box_row = b'\xff\x00\x00\xff' * BOX
+
+    for i in range(count):
+        pixels = bytearray(background)
+        x = (i * 24) % (WIDTH - BOX)
+        y = (i * 12) % (HEIGHT - BOX)
+
+        for row in range(y, y + BOX):
+            start = (row * WIDTH + x) * BPP
+            pixels[start:start + BOX * BPP] = box_row
+
+        yield header + bytes(pixels)
+
+
+def recorded_frames(directory):
+    for path in sorted(Path(directory).glob('*.raw')):
+        yield path.read_bytes()
+
+
+def main(frames_dir=None):
+    frames = list(recorded_frames(frames_dir) if frames_dir else synthetic_frames())
+    capture = ScreenCapture(controller=None)
+    delta_bytes = 0
+
+    start = time.perf_counter()
+
+    for raw in frames:
+        delta_bytes += capture.diff(Frame.decode(raw)).size
+
+    elapsed = time.perf_counter() - start
+    raw_bytes = sum(len(raw) for raw in frames)
+
+    print(f'{len(frames)} frames from {"recordings" if frames_dir else "synthetic sequence"}')
+    print(f'  decode + delta: {len(frames) / elapsed:8.1f} fps ({elapsed / len(frames) * 1000:.2f} ms/frame)')
+    print(f'  encoded size:   {delta_bytes / raw_bytes * 100:8.2f}% of raw ({delta_bytes} / {raw_bytes} bytes)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
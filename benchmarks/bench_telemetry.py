@@ -0,0 +1,52 @@
+"""
+Time sampling a hundred devices at once, and show that the collector's memory stays fixed as samples pile up.
+
+Run with `python -m benchmarks.bench_telemetry` from the repository root.
+"""
+import time
+import tracemalloc
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.telemetry import TelemetryCollector
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+DEVICE_COUNT = 100
+CAPACITY = 20
+ROUNDS = 3 * CAPACITY // 2
+
+
+def main(latency=0.005):
+    controllers = [
+            Controller(f'10.1.{i // 250}.{i % 250}', 5555, '', device=FakeAdbDevice(latency))
+            for i in range(DEVICE_COUNT)
+            ]
+
+    for controller in controllers:
+        controller.connect()
+
+    collector = TelemetryCollector(controllers, capacity=CAPACITY)
+    tracemalloc.start()
+    timings = []
+    footprints = []
+
+    for round_number in range(ROUNDS):
+        start = time.perf_counter()
+        collector.sample_all()
+        timings.append(time.perf_counter() - start)
+
+        if round_number in (CAPACITY - 1, ROUNDS - 1):
+            footprints.append(tracemalloc.get_traced_memory()[0])
+
+    tracemalloc.stop()
+    collector.stop()
+
+    print(f'{DEVICE_COUNT} devices, {latency * 1000:.0f} ms simulated round trip, {CAPACITY} samples kept per metric')
+    print(f'  one sample of every device: {min(timings) * 1000:7.1f} ms best, '
+          f'{sum(timings) / len(timings) * 1000:7.1f} ms average')
+    print(f'  time series buffers:        {collector.nbytes / 1024:7.1f} KiB')
+    print(f'  traced memory, full ring:   {footprints[0] / 1024:7.1f} KiB after {CAPACITY} rounds, '
+          f'{footprints[1] / 1024:7.1f} KiB after {ROUNDS}')
+
+
+if __name__ == '__main__':
+    main()
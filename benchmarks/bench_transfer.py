@@ -0,0 +1,51 @@
+"""
+Measure chunked push/pull throughput and per-chunk latency against the local ADB stand-in, including a resumed push.
+
+Run with `python -m benchmarks.bench_transfer` from the repository root.
+"""
+import os
+import tempfile
+from pathlib import Path
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.transfer import PARTIAL_SUFFIX, TransferManager
+from benchmarks.fake_adb import FakeAdbDevice
+
+
+FILE_SIZE = 64 * 1024 * 1024
+CHUNK_SIZES = (256 * 1024, 1024 * 1024, 8 * 1024 * 1024)
+
+
+def report(label, stats):
+    print(
+            f'  {label:<24} {stats.throughput / 1024 / 1024:8.1f} MiB/s  '
+            f'{stats.average_chunk_latency * 1000:8.2f} ms/chunk  '
+            f'({len(stats.chunk_latencies)} chunks, resumed from {stats.resumed_from})'
+            )
+
+
+def main():
+    controller = Controller(host='127.0.0.1', port=5555, adbkey='', device=FakeAdbDevice())
+    controller.connect()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = tmp / 'source.bin'
+        source.write_bytes(os.urandom(FILE_SIZE))
+
+        print(f'{FILE_SIZE // 1024 // 1024} MiB file')
+
+        for chunk_size in CHUNK_SIZES:
+            manager = TransferManager(controller, chunk_size=chunk_size)
+            label = f'{chunk_size // 1024} KiB chunks'
+            report(f'push, {label}', manager.push(source, str(tmp / 'remote.bin'), resume=False))
+            report(f'pull, {label}', manager.pull(str(tmp / 'remote.bin'), tmp / 'local.bin', resume=False))
+
+        # Leave half of the file behind as if a push had been interrupted, then resume it.
+        with open(source, 'rb') as f:
+            (tmp / f'resumed.bin{PARTIAL_SUFFIX}').write_bytes(f.read(FILE_SIZE // 2))
+
+        report('push, resumed at 50%', TransferManager(controller).push(source, str(tmp / 'resumed.bin')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+A local stand-in for `adb_shell.adb_device.AdbDeviceTcp`.
+
+Shell commands are run with the local `/bin/sh` after a simulated network round trip, so benchmarks measure the cost
+of the controller's own work plus a realistic per-invocation overhead without needing a Fire TV on the network.
+Device paths are local paths.
+"""
+import os
+import signal
+import subprocess
+import time
+from io import BytesIO
+
+
+DEFAULT_LATENCY = 0.005
+
+
+class FakeAdbDevice:
+    """
+    Mimic the parts of the `AdbDeviceTcp` interface the controller uses.
+    """
+
+    def __init__(self, latency: float = DEFAULT_LATENCY):
+        """
+        Initialize a FakeAdbDevice object.
+
+        Parameters:
+            latency (float):
+                The simulated round-trip time (in seconds) paid by every shell invocation.
+        """
+        self.latency = latency
+        self.available = False
+        self.invocations = 0
+        self.streams = set()
+        self.lingering = []
+
+    def _round_trip(self):
+        self.invocations += 1
+
+        # The rest of the output of streams closed early arrives on the connection ahead of this command's.
+        lingering, self.lingering = self.lingering, []
+
+        for process in lingering:
+            while process.stdout.read1(4096):
+                pass
+
+            self._end(process)
+
+        time.sleep(self.latency)
+
+    def _end(self, process):
+        self.streams.discard(process)
+
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        process.wait()
+
+    def close(self):
+        self.available = False
+        self.lingering = []
+
+        # Closing the transport ends every open stream, like a real device's socket being shut down.
+        for process in list(self.streams):
+            self._end(process)
+
+    def connect(self, rsa_keys=None, auth_timeout_s=None, **kwargs):
+        self._round_trip()
+
+        # A real device sends a 20-byte token for the client to sign during authentication.
+        for key in rsa_keys or ():
+            key.Sign(os.urandom(20))
+
+        self.available = True
+
+        return True
+
+    def exec_out(self, command, read_timeout_s=None, timeout_s=None, decode=True, **kwargs):
+        return self.shell(command, read_timeout_s=read_timeout_s, timeout_s=timeout_s, decode=decode)
+
+    def push(self, local_path, device_path, **kwargs):
+        self._round_trip()
+
+        # Like adb-shell's AdbDevice.push: a BytesIO is streamed, anything else is opened as a path.
+        if isinstance(local_path, BytesIO):
+            data = local_path.read()
+        else:
+            with open(local_path, 'rb') as source:
+                data = source.read()
+
+        with open(device_path, 'wb') as target:
+            target.write(data)
+
+    def shell(self, command, read_timeout_s=None, timeout_s=None, decode=True, **kwargs):
+        self._round_trip()
+        output = subprocess.run(['sh', '-c', command], capture_output=True, timeout=timeout_s).stdout
+
+        return output.decode() if decode else output
+
+    def streaming_shell(self, command, read_timeout_s=None, decode=True, **kwargs):
+        self._round_trip()
+        # In a session of its own, so the whole command (not just `sh`) can be killed.
+        process = subprocess.Popen(['sh', '-c', command], stdout=subprocess.PIPE, start_new_session=True)
+        self.streams.add(process)
+
+        try:
+            while chunk := process.stdout.read1(4096):
+                yield chunk.decode() if decode else chunk
+        except GeneratorExit:
+            # Like adb-shell, which sends no CLSE when its generator is closed: the command runs on.
+            if self.available:
+                self.lingering.append(process)
+            else:
+                self._end(process)
+
+            raise
+        except BaseException:
+            self._end(process)
+            raise
+
+        self._end(process)
@@ -0,0 +1,264 @@
+"""
+A small pyperf-style harness: benchmarks register a setup function, the harness calibrates a loop count, takes the
+best of several repeats, and compares the results with a stored baseline.
+
+A setup function takes no arguments and returns the callable to time, or a `(callable, teardown)` pair.
+"""
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import timeit
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_THRESHOLD = 0.25
+MAX_LOOPS = 2 ** 20
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+REGISTRY: Dict[str, 'Benchmark'] = {}
+"""Every registered benchmark, keyed by its full name (`group.name`)."""
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """
+    A registered benchmark.
+    """
+    group: str
+    name: str
+    setup: Callable
+
+    @property
+    def full_name(self) -> str:
+        return f'{self.group}.{self.name}'
+
+
+@dataclass
+class Result:
+    """
+    The timing of one benchmark, per call.
+    """
+    name: str
+    loops: int
+    best: float
+    median: float
+
+    def format(self) -> str:
+        return f'{self.name:<45} {_format_time(self.best):>10} best {_format_time(self.median):>10} median'
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def benchmark(group: str, name: Optional[str] = None):
+    """
+    Register a benchmark setup function.
+
+    Parameters:
+        group (str):
+            The group the benchmark belongs to, e.g. 'config' or 'controller'.
+
+        name (str):
+            The benchmark's name. Defaults to the setup function's name, without a `bench_` prefix.
+
+    Returns:
+        Callable:
+            The decorator.
+    """
+    def decorator(setup):
+        bench = Benchmark(group, name or setup.__name__.removeprefix('bench_'), setup)
+        REGISTRY[bench.full_name] = bench
+
+        return setup
+
+    return decorator
+
+
+def measure(
+        bench: Benchmark,
+        repeat: Optional[int] = DEFAULT_REPEAT,
+        min_time: Optional[float] = DEFAULT_MIN_TIME,
+        ) -> Result:
+    """
+    Time a benchmark.
+
+    Parameters:
+        bench (Benchmark):
+            The benchmark.
+
+        repeat (int):
+            The number of timed repeats.
+
+        min_time (float):
+            The loop count is raised until one repeat takes at least this long (in seconds).
+
+    Returns:
+        Result:
+            The best and median time per call.
+    """
+    prepared = bench.setup()
+    function, teardown = prepared if isinstance(prepared, tuple) else (prepared, None)
+
+    try:
+        timer = timeit.Timer(function)
+        loops = 1
+
+        while timer.timeit(loops) < min_time and loops < MAX_LOOPS:
+            loops *= 2
+
+        timings = [duration / loops for duration in timer.repeat(repeat, loops)]
+    finally:
+        if teardown is not None:
+            teardown()
+
+    return Result(bench.full_name, loops, min(timings), statistics.median(timings))
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Swallow stdout and warnings, so the console output of the code being measured neither floods the report nor
+    skews the timings.
+    """
+    with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+        warnings.simplefilter('ignore')
+        yield
+
+
+def load_baseline(path: Optional[Path] = BASELINE_PATH) -> Dict[str, float]:
+    """
+    Load the stored best time per call of each benchmark.
+
+    Parameters:
+        path (Path):
+            The baseline file.
+
+    Returns:
+        Dict[str, float]:
+            The baseline times, keyed by benchmark name. Empty if there is no baseline yet.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results: List[Result], path: Optional[Path] = BASELINE_PATH) -> None:
+    """
+    Store the results as the new baseline, keeping the baseline of benchmarks that were not run.
+
+    Parameters:
+        results (List[Result]):
+            The results.
+
+        path (Path):
+            The baseline file.
+
+    Returns:
+        None
+    """
+    baseline = load_baseline(path)
+    baseline.update({result.name: result.best for result in results})
+
+    with open(path, 'w') as f:
+        json.dump(
+                {
+                        'python':  platform.python_version(),
+                        'machine': platform.machine(),
+                        'results': dict(sorted(baseline.items())),
+                        },
+                f,
+                indent=4,
+                )
+        f.write('\n')
+
+
+def compare(results: List[Result], baseline: Dict[str, float], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Parameters:
+        results (List[Result]):
+            The results.
+
+        baseline (Dict[str, float]):
+            The baseline times, keyed by benchmark name.
+
+        threshold (float):
+            The fraction by which a benchmark may be slower than its baseline before it counts as a regression.
+
+    Returns:
+        List[str]:
+            A report line for each benchmark that regressed or has no baseline to compare with.
+    """
+    regressions = []
+
+    for result in results:
+        reference = baseline.get(result.name)
+
+        if reference is None:
+            # Without a baseline a regression would go unnoticed, so a missing one fails the comparison too.
+            regressions.append(f'{result.name}: {_format_time(result.best)}, no baseline (run with --save-baseline)')
+        elif result.best > reference * (1 + threshold):
+            regressions.append(
+                    f'{result.name}: {_format_time(result.best)} vs {_format_time(reference)} baseline '
+                    f'({result.best / reference - 1:+.0%})'
+                    )
+
+    return regressions
+
+
+def run(
+        selected: Optional[List[str]] = None,
+        repeat: Optional[int] = DEFAULT_REPEAT,
+        min_time: Optional[float] = DEFAULT_MIN_TIME,
+        output=sys.stdout,
+        ) -> List[Result]:
+    """
+    Run the registered benchmarks.
+
+    Parameters:
+        selected (List[str]):
+            Only run benchmarks whose full name contains one of these substrings. If None, run them all.
+
+        repeat (int):
+            The number of timed repeats per benchmark.
+
+        min_time (float):
+            The minimum duration (in seconds) of a single repeat.
+
+        output:
+            Where to write the report lines.
+
+    Returns:
+        List[Result]:
+            The results, in registration order.
+    """
+    results = []
+
+    for full_name, bench in REGISTRY.items():
+        if selected and not any(pattern in full_name for pattern in selected):
+            continue
+
+        with quiet():
+            result = measure(bench, repeat, min_time)
+
+        results.append(result)
+        print(result.format(), file=output, flush=True)
+
+    return results
+
@@ -0,0 +1,114 @@
+"""
+Measure the space and restore time of compressed delta-chain backups over a long synthetic edit history.
+
+    python -m benchmarks.history [VERSIONS]
+
+A config file of 20 sections with 15 keys each is edited VERSIONS times (2000 by default); each edit changes one to
+three values, and now and then adds or removes a section. Every version is backed up as a full copy (what
+`backup_config(history=False)` writes) and into a :class:`~inspyre_fire.config.history.BackupHistory` with each codec.
+The report shows the bytes on disk, the time per backup, and the time to restore a version by timestamp.
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from inspyre_fire.config.history import CODECS, BackupHistory
+from inspyre_fire.config.ini import render_section
+
+
+RESTORES = 200
+
+
+def synthetic_edits(versions=2000, sections=20, keys=15, seed=0):
+    """
+    Generate the successive contents of a config file under small, realistic edits.
+
+    Parameters:
+        versions (int):
+            The number of versions.
+
+        sections (int):
+            The number of sections in the first version.
+
+        keys (int):
+            The number of keys in each section.
+
+        seed (int):
+            The random seed, so every run sees the same history.
+
+    Returns:
+        Iterator[bytes]:
+            The contents of each version.
+    """
+    rng = random.Random(seed)
+    config = {
+            f'device-{section}': {f'option_{key}': f'value-{section}-{key}' for key in range(keys)}
+            for section in range(sections)
+            }
+    next_section = sections
+
+    for version in range(versions):
+        yield b''.join(render_section(name, values) for name, values in config.items())
+
+        if rng.random() < 0.02:
+            config[f'device-{next_section}'] = {f'option_{key}': f'value-{next_section}-{key}' for key in range(keys)}
+            next_section += 1
+        elif rng.random() < 0.02 and len(config) > 1:
+            del config[rng.choice(list(config))]
+
+        for _ in range(rng.randint(1, 3)):
+            section = config[rng.choice(list(config))]
+            section[rng.choice(list(section))] = f'edited-{version}-{rng.randint(0, 1 << 16)}'
+
+
+def measure_history(versions, codec, directory):
+    history = BackupHistory(Path(directory, f'bench-{codec}.history'), compression=codec)
+    start = time.perf_counter()
+
+    for number, data in enumerate(versions):
+        history.append(data, timestamp=1_000_000 + number)
+
+    append_time = (time.perf_counter() - start) / len(versions)
+
+    rng = random.Random(1)
+    restore_times = []
+
+    for _ in range(RESTORES):
+        number = rng.randrange(len(versions))
+        # A fresh instance, so nothing is cached from the previous restore.
+        fresh = BackupHistory(history.file_path)
+        start = time.perf_counter()
+        data = fresh.read_at(1_000_000 + number + 0.5)
+        restore_times.append(time.perf_counter() - start)
+
+        if data != versions[number]:
+            raise AssertionError(f'Version {number} was not restored exactly.')
+
+    return history.stats(), append_time, restore_times
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    versions = list(synthetic_edits(int(argv[0]) if argv else 2000))
+    full_copies = sum(len(data) for data in versions)
+
+    print(f'{len(versions)} versions, {len(versions[-1])} B each (latest); full copies: {full_copies / 1024:.0f} KiB')
+    print(f'{"codec":<6} {"stored":>10} {"ratio":>7} {"snapshots":>10} {"backup":>10} {"restore avg":>12} {"max":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in CODECS:
+            stats, append_time, restore_times = measure_history(versions, codec, directory)
+
+            print(
+                    f'{codec:<6} {stats["stored_bytes"] / 1024:>6.0f} KiB {full_copies / stats["stored_bytes"]:>6.0f}x '
+                    f'{stats["snapshots"]:>10} {append_time * 1e3:>7.2f} ms {statistics.mean(restore_times) * 1e3:>9.2f} ms '
+                    f'{max(restore_times) * 1e3:>6.2f} ms'
+                    )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Measure the memory footprint of configuration factories with tracemalloc.
+
+    python -m benchmarks.memory
+
+For each configuration system, a fresh factory is created on a throwaway config file, reset to its defaults, written
+to and read from (so its merged view is built), and the memory it still holds is reported next to that of a plain
+`ConfigParser` loaded from the same file.
+"""
+import configparser
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from benchmarks.harness import quiet
+
+
+SYSTEMS = ('core', 'developer_mode')
+
+
+def footprint(build):
+    """
+    Get the traced memory still held by the object a function builds.
+
+    Parameters:
+        build (Callable):
+            Builds the object.
+
+    Returns:
+        Tuple[int, object]:
+            The bytes held, and the object (keep it alive until you are done measuring).
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        obj = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    return after - before, obj
+
+
+def build_factory(system, config_dir):
+    from inspyre_fire.config import ConfigFactory
+
+    factory = ConfigFactory(system, auto_load=True, config_dir_path=config_dir, persistent=False)
+    factory.reset_to_defaults(skip_save=False)
+
+    for key in factory.defaults:
+        getattr(factory, key, None)
+
+    return factory
+
+
+def build_parser(file_path):
+    parser = configparser.ConfigParser()
+    parser.read(file_path)
+
+    return parser
+
+
+def main():
+    if 'XDG_CONFIG_HOME' not in os.environ:
+        os.environ['XDG_CONFIG_HOME'] = tempfile.mkdtemp(prefix='inspyre-fire-memory-')
+
+    with quiet():
+        import inspyre_fire.config
+
+    print(f'{"system":<16} {"factory":>10} {"ConfigParser":>14}')
+
+    for system in SYSTEMS:
+        with tempfile.TemporaryDirectory() as config_dir, quiet():
+            size, factory = footprint(lambda: build_factory(system, config_dir))
+            parser_size, parser = footprint(lambda: build_parser(factory.config_file_path))
+
+        print(f'{system:<16} {size:>8} B {parser_size:>12} B')
+
+        del factory, parser
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
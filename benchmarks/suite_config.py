@@ -0,0 +1,235 @@
+"""
+Benchmarks for the configuration system: attribute access on ConfigFactory, rebuilding its layered view, saving and loading INI files, backups
+and their delta-chain history, ConfigSpec loading, type conversion and error construction, and section-level access to a 100k-key INI file.
+
+Every benchmark works on a throwaway config directory.
+"""
+import configparser
+import itertools
+import tempfile
+from pathlib import Path
+from inspyre_fire.config import ConfigFactory
+from inspyre_fire.config.errors import InvalidConfigSystemError
+from inspyre_fire.config.history import SNAPSHOT_INTERVAL, BackupHistory
+from inspyre_fire.config.ini import IniFile
+from inspyre_fire.config.layers import LayeredConfig
+from inspyre_fire.config.spec import CONFIG_SYSTEM_NAMES, ConfigSpec
+from inspyre_fire.config.utils.types import convert_str_to_type
+from benchmarks.harness import benchmark
+from benchmarks.history import synthetic_edits
+
+
+def make_factory(**kwargs):
+    temp_dir = tempfile.TemporaryDirectory()
+    factory = ConfigFactory('core', auto_load=True, config_dir_path=temp_dir.name, **kwargs)
+
+    return factory, temp_dir
+
+
+def make_large_ini(sections=1000, keys=100):
+    """Write an INI file of `sections` device sections with `keys` options each (100k keys by default)."""
+    temp_dir = tempfile.TemporaryDirectory()
+    file_path = Path(temp_dir.name, 'devices.ini')
+
+    with open(file_path, 'w') as f:
+        for section in range(sections):
+            f.write(f'[device-{section}]\n')
+            f.writelines(f'option_{key} = value-{section}-{key}\n' for key in range(keys))
+            f.write('\n')
+
+    return file_path, temp_dir
+
+
+@benchmark('config')
+def bench_factory_attribute_read():
+    factory, temp_dir = make_factory()
+
+    return (lambda: factory.fire_tv_port), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_attribute_read_overridden():
+    factory, temp_dir = make_factory()
+    factory.override(fire_tv_port='6000')
+
+    def teardown():
+        factory.clear_overrides()
+        temp_dir.cleanup()
+
+    return (lambda: factory.fire_tv_port), teardown
+
+
+@benchmark('config')
+def bench_layers_rebuild():
+    layers = LayeredConfig('core', ConfigSpec('core'), environ={'INSPYRE_FIRE_CORE_FIRE_TV_HOST': '10.0.0.5'})
+    ports = iter(range(1 << 30))
+
+    def rebuild():
+        layers.override(fire_tv_port=str(next(ports)))
+        layers.values
+
+    return rebuild
+
+
+@benchmark('config')
+def bench_factory_attribute_write():
+    factory, temp_dir = make_factory()
+    values = iter(range(1 << 30))
+
+    def write():
+        factory.fire_tv_port = str(next(values))
+
+    return write, temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_attribute_write_no_autosave():
+    factory, temp_dir = make_factory(skip_auto_saving=True)
+    values = iter(range(1 << 30))
+
+    def write():
+        factory.fire_tv_port = str(next(values))
+
+    return write, temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_save_config():
+    factory, temp_dir = make_factory()
+
+    return (lambda: factory.save_config(skip_backup=True)), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_load_config():
+    factory, temp_dir = make_factory()
+
+    return factory.load_config, temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_backup_config():
+    factory, temp_dir = make_factory()
+    backup_dir = Path(temp_dir.name, 'backups')
+
+    return (lambda: factory.backup_config(backup_dir, 'bench', overwrite=True)), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_factory_backup_config_full_copy():
+    factory, temp_dir = make_factory()
+    backup_dir = Path(temp_dir.name, 'backups')
+
+    return (lambda: factory.backup_config(backup_dir, 'bench', overwrite=True, history=False)), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_history_append():
+    temp_dir = tempfile.TemporaryDirectory()
+    history = BackupHistory(Path(temp_dir.name, 'bench.history'))
+    versions = itertools.cycle(synthetic_edits(versions=64))
+
+    return (lambda: history.append(next(versions))), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_history_restore_longest_chain():
+    temp_dir = tempfile.TemporaryDirectory()
+    history = BackupHistory(Path(temp_dir.name, 'bench.history'))
+
+    for data in synthetic_edits(versions=1024):
+        history.append(data)
+
+    # The last version before each snapshot needs the most deltas; alternate so nothing is served from the cache.
+    versions = itertools.cycle([SNAPSHOT_INTERVAL - 1, 2 * SNAPSHOT_INTERVAL - 1])
+
+    return (lambda: history.read(next(versions))), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_spec_load():
+    spec = ConfigSpec('core')
+
+    return spec._load_spec_from_file
+
+
+@benchmark('config')
+def bench_spec_extract_defaults():
+    spec = ConfigSpec('core')
+
+    return spec._extract_defaults
+
+
+@benchmark('config')
+def bench_convert_str_to_type():
+    cases = [('5555', 'int'), ('true', 'bool'), ('1.5', 'float'), ('~/.android/adbkey', 'path'), ('host', 'str')]
+
+    def convert():
+        for value, type_name in cases:
+            convert_str_to_type(value, type_name)
+
+    return convert
+
+
+@benchmark('config')
+def bench_error_construction_rendered():
+    return lambda: InvalidConfigSystemError('bogus', CONFIG_SYSTEM_NAMES)
+
+
+@benchmark('config')
+def bench_ini_100k_configparser_load():
+    file_path, temp_dir = make_large_ini()
+
+    return (lambda: configparser.ConfigParser().read(file_path)), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_ini_100k_index():
+    file_path, temp_dir = make_large_ini()
+
+    return (lambda: IniFile(file_path).index), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_ini_100k_read_section():
+    file_path, temp_dir = make_large_ini()
+    ini_file = IniFile(file_path)
+
+    return (lambda: ini_file.read_section('device-500')), temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_ini_100k_write_middle_section():
+    file_path, temp_dir = make_large_ini()
+    ini_file = IniFile(file_path)
+    values = iter(range(1 << 30))
+
+    def write():
+        ini_file.write_sections({'device-500': {'option_0': next(values)}})
+
+    return write, temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_ini_100k_write_last_section():
+    file_path, temp_dir = make_large_ini()
+    ini_file = IniFile(file_path)
+    values = iter(range(1 << 30))
+
+    def write():
+        ini_file.write_sections({'device-999': {'option_0': next(values)}})
+
+    return write, temp_dir.cleanup
+
+
+@benchmark('config')
+def bench_ini_100k_configparser_write():
+    file_path, temp_dir = make_large_ini()
+    parser = configparser.ConfigParser()
+    parser.read(file_path)
+
+    def write():
+        with open(file_path, 'w') as f:
+            parser.write(f)
+
+    return write, temp_dir.cleanup
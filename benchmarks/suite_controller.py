@@ -0,0 +1,60 @@
+"""
+Benchmarks for controller round trips against the local ADB stand-in in :mod:`benchmarks.fake_adb`.
+
+The stand-in is run with no simulated latency, so these measure the controller's own overhead plus the cost of
+running a local shell.
+"""
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.errors import DeviceTimeoutError
+from inspyre_fire.controller.parsers import iter_lines, parse_pm_list_packages
+from benchmarks.fake_adb import FakeAdbDevice
+from benchmarks.harness import benchmark
+
+
+def make_controller():
+    controller = Controller(host='127.0.0.1', port=5555, adbkey='', device_factory=lambda: FakeAdbDevice(latency=0))
+    controller.connect()
+
+    return controller
+
+
+@benchmark('controller')
+def bench_shell_round_trip():
+    controller = make_controller()
+
+    return (lambda: controller.shell('echo ok')), controller.close
+
+
+@benchmark('controller')
+def bench_batch_of_ten():
+    controller = make_controller()
+    commands = [f'echo {i}' for i in range(10)]
+
+    return (lambda: controller.batch(commands).run()), controller.close
+
+
+@benchmark('controller')
+def bench_exec_out_64k():
+    controller = make_controller()
+
+    return (lambda: controller.exec_out('head -c 65536 /dev/zero')), controller.close
+
+
+@benchmark('controller')
+def bench_state_cache_hit():
+    controller = make_controller()
+    controller.state.get('power')
+
+    return (lambda: controller.state.get('power')), controller.close
+
+
+@benchmark('controller')
+def bench_parse_pm_list_packages():
+    output = '\n'.join(f'package:com.example.app{i} versionCode:{i} uid:{10000 + i}' for i in range(500))
+
+    return lambda: parse_pm_list_packages(iter_lines([output]))
+
+
+@benchmark('controller')
+def bench_error_construction_unrendered():
+    return lambda: DeviceTimeoutError('127.0.0.1:5555', 5.0, skip_render=True)
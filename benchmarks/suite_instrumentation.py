@@ -0,0 +1,47 @@
+"""
+Benchmarks for the overhead the instrumentation hooks add to every instrumented call, with recording off and on.
+"""
+from inspyre_fire.instrumentation import INSTRUMENTATION, timed, timer
+from benchmarks.harness import benchmark
+
+
+def noop():
+    pass
+
+
+timed_noop = timed('bench.noop')(noop)
+
+
+def with_recording(enabled, function):
+    previous = INSTRUMENTATION.enabled
+    INSTRUMENTATION.enabled = enabled
+
+    def teardown():
+        INSTRUMENTATION.enabled = previous
+        INSTRUMENTATION.reset()
+
+    return function, teardown
+
+
+@benchmark('instrumentation')
+def bench_plain_call():
+    return noop
+
+
+@benchmark('instrumentation')
+def bench_timed_call_disabled():
+    return with_recording(False, timed_noop)
+
+
+@benchmark('instrumentation')
+def bench_timed_call_enabled():
+    return with_recording(True, timed_noop)
+
+
+@benchmark('instrumentation')
+def bench_timer_block_disabled():
+    def block():
+        with timer('bench.block'):
+            pass
+
+    return with_recording(False, block)
@@ -39,3 +39,16 @@ if LOGGER_CONFIG.config.get('USER', 'log_level', fallback=None) and LOGGER_CONFI
     from inspyre_fire.log_engine import ROOT_LOGGER
     log_level = LOGGER_CONFIG.config.get('USER', 'log_level')
     ROOT_LOGGER.set_level(console_level=log_level)
+
+
+def _apply_log_level(changes):
+    from inspyre_fire.log_engine import ROOT_LOGGER
+
+    log_level = changes['log_level'][1]
+
+    if log_level:
+        ROOT_LOGGER.set_level(console_level=log_level)
+
+
+# Follow later changes to the log level (reloads, edits, overrides) without reinitializing anything else.
+LOGGER_CONFIG.subscribe('log_level', _apply_log_level)
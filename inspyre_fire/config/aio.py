@@ -0,0 +1,112 @@
+"""
+Run configuration file I/O off the event loop.
+
+Blocking config I/O is handed to a small thread pool dedicated to it, so it neither stalls the event loop nor queues
+behind unrelated work in the loop's default executor. Writes to the same file are serialized with a per-file lock,
+which the synchronous API takes as well.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+
+IO_WORKERS = 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_file_locks: Dict[Path, threading.RLock] = {}
+_file_locks_lock = threading.Lock()
+
+
+def file_lock(file_path: Union[str, Path]) -> threading.RLock:
+    """
+    Get the lock that serializes writes to a file.
+
+    Parameters:
+        file_path (Union[str, Path]):
+            The file.
+
+    Returns:
+        threading.RLock:
+            The lock shared by every writer of that file.
+    """
+    file_path = Path(file_path).expanduser().resolve().absolute()
+
+    with _file_locks_lock:
+        lock = _file_locks.get(file_path)
+
+        if lock is None:
+            lock = _file_locks[file_path] = threading.RLock()
+
+        return lock
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool that runs configuration file I/O, creating it on first use.
+
+    Returns:
+        ThreadPoolExecutor:
+            The executor.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='config-io')
+
+        return _executor
+
+
+async def run_io(func: Callable, *args, **kwargs):
+    """
+    Run a blocking function on the configuration I/O executor and wait for it without blocking the event loop.
+
+    Parameters:
+        func (Callable):
+            The function.
+
+        *args:
+            Its positional arguments.
+
+        **kwargs:
+            Its keyword arguments.
+
+    Returns:
+        Whatever the function returns.
+    """
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_io_executor(wait: Optional[bool] = True) -> None:
+    """
+    Shut down the configuration I/O executor. A new one is created if it is needed again.
+
+    Parameters:
+        wait (bool):
+            If True, wait for queued I/O to finish.
+
+    Returns:
+        None
+    """
+    global _executor
+
+    with _executor_lock:
+        executor, _executor = _executor, None
+
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+__all__ = [
+        'IO_WORKERS',
+        'file_lock',
+        'get_io_executor',
+        'run_io',
+        'shutdown_io_executor',
+        ]
@@ -20,6 +20,9 @@ FILE_SYSTEM_DEFAULTS = {
                         'alternate_dirs': DEFAULT_DIRS.user_config_dir.joinpath('alternate_dirs_config.ini'),
                         },
                 'cache': DEFAULT_DIRS.user_cache_dir.joinpath('cache.ini'),
+                'inventory': DEFAULT_DIRS.user_config_dir.joinpath('devices.json'),
+                'discovery': DEFAULT_DIRS.user_cache_dir.joinpath('discovered_devices.json'),
+                'daemon_socket': DEFAULT_DIRS.user_runtime_dir.joinpath('config.sock'),
 
                 },
         }
@@ -0,0 +1,818 @@
+"""
+A local config daemon that owns every configuration system and serves it over a Unix domain socket.
+
+One daemon process parses the config files and is their only writer; other processes run their
+:class:`~inspyre_fire.config.factory.ConfigFactory` in remote mode (`ConfigFactory('core', remote=True)`), keeping a
+local copy of the file values that the daemon updates by pushing every change.
+
+    python -m inspyre_fire.config.daemon [--socket PATH]
+
+Wire format: each frame is a 9-byte header (`>BII`: opcode, request id, payload length) followed by the payload, a
+sequence of tagged values (None, bool, int, str, list and dict). Pushed notifications use request id 0.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from warnings import warn
+from inspyre_fire.config.aio import file_lock, run_io
+from inspyre_fire.config.constants import CONFIG_SYSTEM_NAMES, FILE_SYSTEM_DEFAULTS
+from inspyre_fire.config.errors import ConfigDaemonError
+
+
+DEFAULT_SOCKET_PATH = FILE_SYSTEM_DEFAULTS['files']['daemon_socket']
+DEFAULT_TIMEOUT = 5.0
+
+HEADER = struct.Struct('>BII')
+LENGTH = struct.Struct('>I')
+INTEGER = struct.Struct('>q')
+
+OP_FETCH = 0x01
+OP_SET = 0x02
+OP_SAVE = 0x03
+OP_RELOAD = 0x04
+OP_WATCH = 0x05
+OP_UNWATCH = 0x06
+OP_OK = 0x80
+OP_ERROR = 0x81
+OP_CHANGED = 0x82
+
+
+# -- Codec --------------------------------------------------------------------------------------------------------
+
+
+def _encode(value, parts: list) -> None:
+    if value is None:
+        parts.append(b'N')
+    elif value is True:
+        parts.append(b'T')
+    elif value is False:
+        parts.append(b'F')
+    elif isinstance(value, int):
+        parts.append(b'i' + INTEGER.pack(value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        parts.append(b's' + LENGTH.pack(len(data)) + data)
+    elif isinstance(value, dict):
+        parts.append(b'd' + LENGTH.pack(len(value)))
+
+        for key, item in value.items():
+            _encode(key, parts)
+            _encode(item, parts)
+    elif isinstance(value, (list, tuple)):
+        parts.append(b'l' + LENGTH.pack(len(value)))
+
+        for item in value:
+            _encode(item, parts)
+    else:
+        # Paths and other scalars travel as their string form.
+        _encode(str(value), parts)
+
+
+def _decode(data: bytes, offset: int) -> Tuple[object, int]:
+    tag = data[offset:offset + 1]
+    offset += 1
+
+    if tag == b'N':
+        return None, offset
+
+    if tag == b'T':
+        return True, offset
+
+    if tag == b'F':
+        return False, offset
+
+    if tag == b'i':
+        return INTEGER.unpack_from(data, offset)[0], offset + INTEGER.size
+
+    if tag == b's':
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    if tag in (b'd', b'l'):
+        count = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        items = []
+
+        for _ in range(count * 2 if tag == b'd' else count):
+            item, offset = _decode(data, offset)
+            items.append(item)
+
+        if tag == b'd':
+            return dict(zip(items[::2], items[1::2])), offset
+
+        return items, offset
+
+    raise ValueError(f'Invalid value tag {tag!r} at offset {offset - 1}.')
+
+
+def encode_frame(opcode: int, request_id: int, *values) -> bytes:
+    """
+    Encode a frame.
+
+    Parameters:
+        opcode (int):
+            The operation (one of the `OP_*` constants).
+
+        request_id (int):
+            The id that pairs a response with its request; 0 for pushed notifications.
+
+        *values:
+            The payload values.
+
+    Returns:
+        bytes:
+            The frame.
+    """
+    parts = []
+
+    for value in values:
+        _encode(value, parts)
+
+    payload = b''.join(parts)
+
+    return HEADER.pack(opcode, request_id, len(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> list:
+    """
+    Decode the values of a frame payload.
+
+    Parameters:
+        payload (bytes):
+            The payload (the frame without its header).
+
+    Returns:
+        list:
+            The values.
+    """
+    values = []
+    offset = 0
+
+    while offset < len(payload):
+        value, offset = _decode(payload, offset)
+        values.append(value)
+
+    return values
+
+
+# -- Server -------------------------------------------------------------------------------------------------------
+
+
+class ConfigDaemon:
+    """
+    Serve every configuration system over a Unix domain socket.
+
+    Reads are answered from the daemon's parsed configuration; writes are applied (and saved) by the daemon alone,
+    one at a time per file. Clients that watch a system receive its file values whenever they change.
+    """
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, systems: Optional[List[str]] = None):
+        """
+        Initialize a ConfigDaemon object.
+
+        Parameters:
+            socket_path (Union[str, Path]):
+                Where to listen. Defaults to :data:`DEFAULT_SOCKET_PATH`.
+
+            systems (List[str]):
+                The configuration systems to serve. Defaults to all of them.
+        """
+        self.__socket_path = Path(socket_path or DEFAULT_SOCKET_PATH).expanduser().absolute()
+        self.__systems = [system.lower() for system in (systems or CONFIG_SYSTEM_NAMES)]
+        self.__factories = {}
+        self.__watchers: Dict[str, set] = {system: set() for system in self.__systems}
+        self.__sent: Dict[str, dict] = {}
+        self.__clients = set()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__server = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__started = threading.Event()
+        self.__error: Optional[BaseException] = None
+
+    @property
+    def clients(self) -> int:
+        """
+        Get the number of connected clients.
+
+        Returns:
+            int:
+                The count.
+        """
+        return len(self.__clients)
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the daemon is accepting connections.
+
+        Returns:
+            bool:
+                True if it is, False otherwise.
+        """
+        return self.__server is not None and self.__server.is_serving()
+
+    @property
+    def socket_path(self) -> Path:
+        """
+        Get the path of the socket the daemon listens on.
+
+        Returns:
+            Path:
+                The path.
+        """
+        return self.__socket_path
+
+    def factory(self, system: str):
+        """
+        Get the factory the daemon serves a configuration system from.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            ConfigFactory:
+                The factory.
+        """
+        from inspyre_fire.config.factory import ConfigFactory
+
+        system = system.lower()
+
+        if system not in self.__systems:
+            raise ConfigDaemonError(f"The daemon does not serve the '{system}' configuration system.")
+
+        factory = self.__factories.get(system)
+
+        if factory is None:
+            # Reuse a factory that is already configured (the logger's, say) rather than re-initializing it.
+            factory = ConfigFactory._registry.get(system) or ConfigFactory(system, auto_load=True)
+            factory.subscribe(None, lambda changes, system=system: self._changed(system))
+            self.__factories[system] = factory
+
+        return factory
+
+    def run(self) -> None:
+        """
+        Serve until interrupted.
+
+        Returns:
+            None
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    async def serve(self) -> None:
+        """
+        Serve on the running event loop until :meth:`stop` is called.
+
+        Returns:
+            None
+        """
+        self._claim_socket()
+        self.__loop = asyncio.get_running_loop()
+
+        for system in self.__systems:
+            self.factory(system)
+
+        self.__server = await asyncio.start_unix_server(self._handle, path=str(self.__socket_path))
+        os.chmod(self.__socket_path, 0o600)
+
+        if threading.current_thread() is threading.main_thread():
+            # Shut down cleanly (and remove the socket) when the service manager stops us.
+            self.__loop.add_signal_handler(signal.SIGTERM, self.stop)
+
+        self.__started.set()
+
+        try:
+            async with self.__server:
+                await self.__server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.__socket_path.unlink(missing_ok=True)
+            self.__started.clear()
+
+    def start(self, timeout: Optional[float] = DEFAULT_TIMEOUT) -> None:
+        """
+        Serve on a background thread.
+
+        Parameters:
+            timeout (float):
+                How long to wait for the socket to be ready (in seconds).
+
+        Returns:
+            None
+        """
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+
+        self.__error = None
+        self.__thread = threading.Thread(target=self._serve_in_thread, name='config-daemon', daemon=True)
+        self.__thread.start()
+
+        if not self.__started.wait(timeout):
+            raise ConfigDaemonError('The daemon did not start in time.', self.__socket_path)
+
+        if self.__error is not None:
+            raise self.__error
+
+    def stop(self) -> None:
+        """
+        Stop serving and remove the socket.
+
+        Returns:
+            None
+        """
+        if self.__server is None or self.__loop is None:
+            return
+
+        def close():
+            self.__server.close()
+
+            for writer in list(self.__clients):
+                writer.close()
+
+        self.__loop.call_soon_threadsafe(close)
+
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(DEFAULT_TIMEOUT)
+
+    def _changed(self, system: str) -> None:
+        # Called on the factory's dispatch thread.
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self._push, system)
+
+    def _claim_socket(self) -> None:
+        self.__socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if not self.__socket_path.exists():
+            return
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            probe.connect(str(self.__socket_path))
+        except OSError:
+            # Left behind by a daemon that did not shut down cleanly.
+            self.__socket_path.unlink()
+        else:
+            raise ConfigDaemonError('Another daemon is already listening.', self.__socket_path)
+        finally:
+            probe.close()
+
+    @staticmethod
+    def _locked(factory, function: Callable, *args):
+        # Requests run on the shared I/O executor, so two clients can reach the same factory at once; holding the
+        # file's lock keeps every change to its ConfigParser, and the save that follows, in one piece.
+        with file_lock(factory.config_file_path):
+            return function(*args)
+
+    async def _execute(self, opcode: int, args: list, writer) -> tuple:
+        system = args[0]
+        factory = self.factory(system)
+
+        if opcode == OP_FETCH:
+            return (factory.layers.layer('file'),)
+
+        if opcode == OP_SET:
+            _, key, value = args
+
+            if key not in factory.defaults:
+                raise ConfigDaemonError(f"'{key}' is not a key of the '{system}' configuration system.")
+
+            await run_io(self._locked, factory, setattr, factory, key, value)
+
+            return (factory.layers.layer('file'),)
+
+        if opcode == OP_SAVE:
+            await factory.asave()
+
+            return ()
+
+        if opcode == OP_RELOAD:
+            await run_io(self._locked, factory, factory.load_config)
+
+            return (factory.layers.layer('file'),)
+
+        if opcode == OP_WATCH:
+            self.__watchers[factory.config_system].add(writer)
+
+            return (factory.layers.layer('file'),)
+
+        if opcode == OP_UNWATCH:
+            self.__watchers[factory.config_system].discard(writer)
+
+            return ()
+
+        raise ConfigDaemonError(f'Unknown opcode: {opcode:#04x}')
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__clients.add(writer)
+
+        try:
+            while True:
+                opcode, request_id, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+                args = decode_payload(await reader.readexactly(length))
+
+                try:
+                    response = encode_frame(OP_OK, request_id, *await self._execute(opcode, args, writer))
+                except Exception as e:
+                    reason = e.reason if isinstance(e, ConfigDaemonError) else f'{type(e).__name__}: {e}'
+                    response = encode_frame(OP_ERROR, request_id, reason)
+
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.__clients.discard(writer)
+
+            for watchers in self.__watchers.values():
+                watchers.discard(writer)
+
+            writer.close()
+
+    def _push(self, system: str) -> None:
+        values = self.__factories[system].layers.layer('file')
+
+        if self.__sent.get(system) == values:
+            return
+
+        self.__sent[system] = values
+        frame = encode_frame(OP_CHANGED, 0, system, values)
+
+        for writer in list(self.__watchers[system]):
+            if not writer.is_closing():
+                writer.write(frame)
+
+    def _serve_in_thread(self) -> None:
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            # Hand the failure to start(), which is waiting for the socket.
+            self.__error = e
+            self.__started.set()
+
+    def __repr__(self):
+        return f'<ConfigDaemon: {self.__socket_path} | {len(self.__clients)} clients | @{hex(id(self))}>'
+
+
+# -- Client -------------------------------------------------------------------------------------------------------
+
+
+class ConfigClient:
+    """
+    A connection to a config daemon, shared by the remote-mode factories of a process.
+
+    Requests may be made from any thread; responses and pushed changes are read on a background thread.
+    """
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        Initialize a ConfigClient object, and connect.
+
+        Parameters:
+            socket_path (Union[str, Path]):
+                The daemon's socket. Defaults to :data:`DEFAULT_SOCKET_PATH`.
+
+            timeout (float):
+                How long to wait for a response (in seconds).
+        """
+        self.__socket_path = Path(socket_path or DEFAULT_SOCKET_PATH).expanduser().absolute()
+        self.__timeout = timeout
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            self.__socket.connect(str(self.__socket_path))
+        except OSError as e:
+            self.__socket.close()
+
+            raise ConfigDaemonError(f'Could not connect: {e}', self.__socket_path) from e
+
+        self.__ids = itertools.count(1)
+        self.__pending: Dict[int, Future] = {}
+        self.__watchers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.__lock = threading.Lock()
+        self.__send_lock = threading.Lock()
+        self.__closed = False
+        self.__reader = threading.Thread(target=self._read_loop, name='config-client', daemon=True)
+        self.__reader.start()
+
+    @property
+    def closed(self) -> bool:
+        """
+        Check if the connection is closed.
+
+        Returns:
+            bool:
+                True if it is, False otherwise.
+        """
+        return self.__closed
+
+    @property
+    def socket_path(self) -> Path:
+        """
+        Get the daemon's socket path.
+
+        Returns:
+            Path:
+                The path.
+        """
+        return self.__socket_path
+
+    def close(self) -> None:
+        """
+        Close the connection.
+
+        Returns:
+            None
+        """
+        self.__closed = True
+
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.__socket.close()
+
+    def fetch(self, system: str) -> Dict[str, str]:
+        """
+        Get the file values of a configuration system.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            Dict[str, str]:
+                The raw values that differ from the spec defaults.
+        """
+        return self.request(OP_FETCH, system)[0]
+
+    def reload(self, system: str) -> Dict[str, str]:
+        """
+        Make the daemon reload a configuration system from its file.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            Dict[str, str]:
+                The file values after the reload.
+        """
+        return self.request(OP_RELOAD, system)[0]
+
+    def request(self, opcode: int, *args) -> list:
+        """
+        Send a request and wait for its response.
+
+        Parameters:
+            opcode (int):
+                The operation (one of the `OP_*` constants).
+
+            *args:
+                Its arguments.
+
+        Returns:
+            list:
+                The response values.
+        """
+        if self.__closed:
+            raise ConfigDaemonError('The connection is closed.', self.__socket_path)
+
+        future = Future()
+
+        with self.__lock:
+            request_id = next(self.__ids)
+            self.__pending[request_id] = future
+
+        try:
+            with self.__send_lock:
+                self.__socket.sendall(encode_frame(opcode, request_id, *args))
+
+            return future.result(self.__timeout)
+        except OSError as e:
+            raise ConfigDaemonError(f'The connection failed: {e}', self.__socket_path) from e
+        finally:
+            with self.__lock:
+                self.__pending.pop(request_id, None)
+
+    def save(self, system: str) -> None:
+        """
+        Make the daemon save a configuration system to its file.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            None
+        """
+        self.request(OP_SAVE, system)
+
+    def set(self, system: str, key: str, value: str) -> Dict[str, str]:
+        """
+        Set a value; the daemon applies and saves it.
+
+        Parameters:
+            system (str):
+                The system name.
+
+            key (str):
+                The configuration key.
+
+            value (str):
+                The new value.
+
+        Returns:
+            Dict[str, str]:
+                The file values after the write.
+        """
+        return self.request(OP_SET, system, key, value)[0]
+
+    def unwatch(self, system: str, callback: Callable[[dict], None]) -> None:
+        """
+        Stop calling a function added with :meth:`watch`.
+
+        Parameters:
+            system (str):
+                The system name.
+
+            callback (Callable[[dict], None]):
+                The function.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            callbacks = self.__watchers.get(system, [])
+
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+            last = not callbacks
+
+        if last and not self.__closed:
+            self.request(OP_UNWATCH, system)
+
+    def watch(self, system: str, callback: Callable[[dict], None]) -> Dict[str, str]:
+        """
+        Call a function with the file values of a configuration system whenever they change.
+
+        Parameters:
+            system (str):
+                The system name.
+
+            callback (Callable[[dict], None]):
+                Called on the client's reader thread with the new file values.
+
+        Returns:
+            Dict[str, str]:
+                The current file values.
+        """
+        with self.__lock:
+            self.__watchers.setdefault(system, []).append(callback)
+
+        return self.request(OP_WATCH, system)[0]
+
+    def _read_exactly(self, size: int) -> bytes:
+        chunks = []
+
+        while size:
+            chunk = self.__socket.recv(size)
+
+            if not chunk:
+                raise ConnectionError('The daemon closed the connection.')
+
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b''.join(chunks)
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                opcode, request_id, length = HEADER.unpack(self._read_exactly(HEADER.size))
+                values = decode_payload(self._read_exactly(length))
+
+                if opcode == OP_CHANGED:
+                    system, file_values = values
+
+                    with self.__lock:
+                        callbacks = list(self.__watchers.get(system, ()))
+
+                    for callback in callbacks:
+                        # A failing callback must not take the shared connection down with it.
+                        try:
+                            callback(file_values)
+                        except Exception as e:
+                            warn(f'Config daemon watch callback {callback!r} raised {e!r}.')
+
+                    continue
+
+                with self.__lock:
+                    future = self.__pending.get(request_id)
+
+                if future is None:
+                    continue
+
+                if opcode == OP_ERROR:
+                    future.set_exception(ConfigDaemonError(values[0] if values else None, self.__socket_path))
+                else:
+                    future.set_result(values)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.__closed = True
+
+            with self.__lock:
+                pending = list(self.__pending.values())
+
+            for future in pending:
+                if not future.done():
+                    future.set_exception(ConfigDaemonError('The daemon closed the connection.', self.__socket_path))
+
+    def __repr__(self):
+        state = 'closed' if self.__closed else 'connected'
+
+        return f'<ConfigClient: {self.__socket_path} | {state} | @{hex(id(self))}>'
+
+
+_clients: Dict[Path, ConfigClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(socket_path: Optional[Union[str, Path]] = None) -> ConfigClient:
+    """
+    Get this process's connection to a config daemon, connecting (or reconnecting) if needed.
+
+    Parameters:
+        socket_path (Union[str, Path]):
+            The daemon's socket. Defaults to :data:`DEFAULT_SOCKET_PATH`.
+
+    Returns:
+        ConfigClient:
+            The shared client.
+    """
+    socket_path = Path(socket_path or DEFAULT_SOCKET_PATH).expanduser().absolute()
+
+    with _clients_lock:
+        client = _clients.get(socket_path)
+
+        if client is None or client.closed:
+            client = _clients[socket_path] = ConfigClient(socket_path)
+
+        return client
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run a config daemon from the command line.
+
+    Parameters:
+        argv (List[str]):
+            The arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int:
+            The exit status.
+    """
+    parser = argparse.ArgumentParser(prog='python -m inspyre_fire.config.daemon', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--socket', type=Path, default=DEFAULT_SOCKET_PATH, help='where to listen (default: %(default)s)')
+    parser.add_argument('systems', nargs='*', help='the configuration systems to serve (default: all)')
+    args = parser.parse_args(argv)
+
+    daemon = ConfigDaemon(args.socket, args.systems or None)
+    print(f'Serving {", ".join(args.systems or CONFIG_SYSTEM_NAMES)} on {daemon.socket_path}')
+    daemon.run()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+__all__ = [
+        'ConfigClient',
+        'ConfigDaemon',
+        'DEFAULT_SOCKET_PATH',
+        'decode_payload',
+        'encode_frame',
+        'get_client',
+        ]
@@ -125,3 +125,79 @@ class ConfigBackupDirectoryNonExistentError(ConfigError):
 
     def __str__(self):
         return f'ConfigBackupDirectoryNonExistentError: {self._additional_info}'
+
+
+class ConfigDaemonError(ConfigError):
+    """
+    Raised when the config daemon rejects a request, or cannot be reached.
+    """
+
+    def __init__(self, reason=None, socket_path=None):
+        self._reason = reason
+        self._socket_path = socket_path
+        self._additional_info = 'The config daemon request failed.'
+
+        if reason:
+            self._additional_info += f'\nReason: {reason}'
+
+        if socket_path:
+            self._additional_info += f'\nSocket: {socket_path}'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    @property
+    def reason(self):
+        return self._reason
+
+    @property
+    def socket_path(self):
+        return self._socket_path
+
+    def __str__(self):
+        return f'ConfigDaemonError: {self._additional_info}'
+
+
+class ConfigEditorNotFoundError(ConfigError):
+    """
+    Raised when no program is available to open a configuration file or directory.
+    """
+
+    def __init__(self, command=None):
+        self._command = command
+        self._additional_info = 'No editor was found to open the configuration with.'
+
+        if command:
+            self._additional_info += f'\nCommand: {command}'
+
+        self._additional_info += '\nSet the VISUAL or EDITOR environment variable to choose one.'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info)
+
+    @property
+    def command(self):
+        return self._command
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'ConfigEditorNotFoundError: {self._additional_info}'
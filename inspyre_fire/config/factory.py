@@ -1,13 +1,25 @@
 import configparser
 import os
+import shutil
+import threading
 import time
+from datetime import datetime
 from inspyre_toolbox.syntactic_sweets.classes.decorators.type_validation import validate_type
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, Iterable, Optional, Union
 from warnings import warn
 from inspyre_fire.config.constants import CONFIG_SPECS, CONFIG_SYSTEM_NAMES, SPEC_FILE_PATHS, CONFIG_SYSTEM_MAP, FILE_SYSTEM_DEFAULTS
 from inspyre_fire.config.utils import wait_for_changes
+from inspyre_fire.config.utils.editor import launch_editor
+from inspyre_fire.config.aio import file_lock, run_io
+from inspyre_fire.config.history import HISTORY_EXTENSION, BackupHistory, get_backup_history
+from inspyre_fire.config.ini import IniFile, get_ini_file
+from inspyre_fire.config.layers import LayeredConfig
+from inspyre_fire.config.registry import InstanceRegistry
+from inspyre_fire.config.spec import intern_key
+from inspyre_fire.config.subscriptions import ChangeDispatcher, Changes, ChangeStream, Subscription
 from inspyre_fire.config.utils.types import convert_str_to_type, TYPE_MAPPING
+from inspyre_fire.instrumentation import timed
 from inspyre_fire.config.errors import (
 ConfigBackupDirectoryNonExistentError, ConfigDirectoryNonExistentError, InvalidConfigSystemError
     )
@@ -15,28 +27,68 @@ ConfigBackupDirectoryNonExistentError, ConfigDirectoryNonExistentError, InvalidC
 
 
 class ConfigFactory:
-    _instances = {}
+    _registry = InstanceRegistry()
+    _instances = _registry.by_system
     _initializing = set()
 
     @classmethod
     def get_config_system_by_instance_id(cls, instance_id):
-        for config_system, instance in cls._instances.items():
-            if instance_id(instance) == instance_id:
-                return config_system
+        return cls._registry.system_of(instance_id)
 
     @classmethod
     def find_instance_by_id(cls, target_id):
-        for instance in cls._instances.values():
-            if id(instance) == target_id:
-                return instance
+        return cls._registry.by_id(target_id)
+
+    @classmethod
+    def find_instance_by_path(cls, file_path: Union[str, Path]):
+        """
+        Find the live factory that reads a given config file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path to the config file.
+
+        Returns:
+            ConfigFactory:
+                The factory, or None if no live factory reads that file.
+        """
+        return cls._registry.by_path(file_path)
+
+    @classmethod
+    def instance_stats(cls) -> dict:
+        """
+        Get the live, pinned, created and collected instance counts, and an estimate of the memory the live instances
+        hold.
+
+        Returns:
+            dict:
+                The metrics.
+        """
+        return cls._registry.stats()
+
+    @classmethod
+    def release(cls, config_system: str) -> None:
+        """
+        Stop keeping a persistent instance alive, so it is garbage-collected once nothing else refers to it.
+
+        Parameters:
+            config_system (str):
+                The name of the configuration system.
+
+        Returns:
+            None
+        """
+        cls._registry.release(config_system)
 
     def __new__(cls, config_system: str, *args, **kwargs):
         config_system = config_system.lower()
-        if config_system not in cls._instances:
+        instance = cls._registry.get(config_system)
+
+        if instance is None:
             instance = super().__new__(cls)
-            cls._instances[config_system] = instance
+            cls._registry.register(config_system, instance, persistent=False)
 
-        return cls._instances[config_system]
+        return instance
 
     def __init__(
             self,
@@ -45,6 +97,8 @@ class ConfigFactory:
             skip_auto_saving: Optional[bool] = False,
             config_dir_path: Optional[Union[str, Path]] = FILE_SYSTEM_DEFAULTS['dirs']['config'],
             skip_reload_on_change: Optional[bool] = False,
+            persistent: Optional[bool] = True,
+            remote: Optional[Union[bool, str, Path]] = None,
             ):
         """
         Initialize a ConfigFactory object.
@@ -53,6 +107,16 @@ class ConfigFactory:
             config_system (str):
                 The name of the configuration system to use. Must be one of the keys in :attr:`CONFIG_SYSTEMS`.
 
+            persistent (bool):
+                If True (the default), the instance is kept alive for the life of the process, like a singleton. If
+                False, it is garbage-collected as soon as nothing refers to it.
+
+            remote (Union[bool, str, Path]):
+                If set, read and write the configuration through a config daemon (see
+                :mod:`inspyre_fire.config.daemon`) instead of the file: True for the daemon on the default socket, or
+                the path of its socket. The daemon pushes every change to the file values; environment variables and
+                overrides stay local to this process.
+
         """
         self._initialized = False
         self._initialize_attributes(
@@ -61,9 +125,13 @@ class ConfigFactory:
                 skip_auto_saving,
                 config_dir_path,
                 skip_reload_on_change,
+                remote,
             )
         self._initialized = True
 
+        if persistent:
+            ConfigFactory._registry.pin(self)
+
 
     def _initialize_attributes(
             self,
@@ -72,6 +140,7 @@ class ConfigFactory:
             skip_auto_saving: Optional[bool] = False,
             config_dir_path: Optional[Union[str, Path]] = FILE_SYSTEM_DEFAULTS['dirs']['config'],
             skip_reload_on_change: Optional[bool] = False,
+            remote: Optional[Union[bool, str, Path]] = None,
         ):
         def get_config_systems():
             from inspyre_fire.config import CONFIG_SYSTEMS
@@ -88,8 +157,29 @@ class ConfigFactory:
 
         self.__config_systems = get_config_systems()
         self.__config = configparser.ConfigParser()
+        # Share key strings with the spec and every other parser, instead of one copy per parser.
+        self.__config.optionxform = intern_key
         self.__config_spec = CONFIG_SPECS[self.__config_system]
 
+        # Re-initializing a factory keeps its overrides and subscribers.
+        layers = self.__dict__.get('_ConfigFactory__layers')
+
+        if layers is None:
+            self.__layers = LayeredConfig(self.__config_system, self.__config_spec)
+        else:
+            layers.refresh_environment()
+
+        self.__dispatcher = self.__dict__.get('_ConfigFactory__dispatcher')
+        # ...and stays connected to its daemon.
+        self.__client = self.__dict__.get('_ConfigFactory__client')
+
+        ConfigFactory._registry.index_path(self, self.config_file_path)
+
+        if remote or self.__client is not None:
+            self._connect(None if remote in (None, True) else remote)
+
+            return
+
         if auto_load:
             self.load_config_if_exists()
 
@@ -132,6 +222,14 @@ class ConfigFactory:
             return True
 
     def __getattr__(self, item):
+        layers = self.__dict__.get('_ConfigFactory__layers')
+
+        if layers is not None and self.__dict__.get('_initialized'):
+            values = layers.values
+
+            if item in values:
+                return values[item]
+
         section_name = self.determine_section()
         self._check_section(section_name)
         if not self._initialized:
@@ -160,22 +258,41 @@ class ConfigFactory:
 
 
     def __setattr__(self, key, value):
-        if key in {'_initialized', '_instances', '_initializing'} or not self._initialized:
+        if key in {'_initialized', '_instances', '_initializing', '_registry'} or not self._initialized:
             return object.__setattr__(self, key, value)
         elif key in self.__dict__:
             self.__dict__[key] = value
             return
+        elif self.__client is not None and key in self.defaults:
+            # The daemon is the only writer; it applies, saves and pushes the change.
+            self.__layers.set_layer('file', self._remote_client().set(self.__config_system, key, value))
+            return
         elif key in self.__dict__['_ConfigFactory__config'].defaults():
+            config = self.__dict__['_ConfigFactory__config']
             section_name = self.determine_section()
             self._check_section(section_name)
-            self.__dict__['_ConfigFactory__config'].set(section_name, key, value)
+
+            # A value equal to the default is stored once, in DEFAULT, rather than repeated in the section.
+            if config.defaults().get(key) == value:
+                config.remove_option(section_name, key)
+            else:
+                config.set(section_name, key, value)
+
             self.__config_changed = True
+            self.__layers.update_layer('file', {key: None if self.defaults.get(key) == value else value})
 
         if key in self.config.defaults():
             if self.__config_changed and self.__auto_save:
                 self.save_config()
                 self.load_config()
 
+    def _change_dispatcher(self) -> ChangeDispatcher:
+        if self.__dispatcher is None:
+            self.__dispatcher = ChangeDispatcher(f'config-{self.__config_system}')
+            self.__layers.add_listener(self.__dispatcher.publish)
+
+        return self.__dispatcher
+
     def _check_section(self, section: str = 'USER', do_not_create: bool = False):
         """
         Check if the specified section exists in the config object.
@@ -200,6 +317,110 @@ class ConfigFactory:
 
         return self.config.has_section(section)
 
+    def _sections_to_save(self) -> dict:
+        """
+        Get the raw values of every section in the parsed configuration, as they should be written to disk.
+
+        Options that only repeat the DEFAULT value are left out of their section; they resolve to the same value.
+
+        Returns:
+            dict:
+                The option values of each section, keyed by section name.
+        """
+        config = self.__config
+        defaults = config.defaults()
+        sections = {'DEFAULT': dict(defaults)}
+
+        for section in config.sections():
+            sections[section] = {
+                    key: value
+                    for key, value in config.items(section, raw=True)
+                    if key not in defaults or defaults[key] != value
+                    }
+
+        return sections
+
+    def _compact_section(self, section_name: str) -> None:
+        """
+        Remove the options of a section that only repeat their DEFAULT value; they resolve to the same value without
+        their own copy.
+
+        Parameters:
+            section_name (str):
+                The section.
+
+        Returns:
+            None
+        """
+        config = self.__config
+
+        if not config.has_section(section_name):
+            return
+
+        for key, default in config.defaults().items():
+            if config.get(section_name, key, raw=True) == default:
+                config.remove_option(section_name, key)
+
+    def _connect(self, socket_path: Optional[Union[str, Path]] = None) -> None:
+        from inspyre_fire.config.daemon import get_client
+
+        client = get_client(socket_path or (self.__client and self.__client.socket_path))
+
+        if client is self.__client:
+            values = client.fetch(self.__config_system)
+        else:
+            if self.__client is not None:
+                self.__client.unwatch(self.__config_system, self._receive_file_layer)
+
+            values = client.watch(self.__config_system, self._receive_file_layer)
+            self.__client = client
+
+        self.__layers.set_layer('file', values)
+        self.__loaded_config = True
+
+    def _follow_editor(self, process, reload: bool) -> None:
+        from inspyre_fire.config.utils.watch import EDIT_MODIFIED, wait_for_edit
+
+        # Reload on every save until the editor exits; a desktop opener's editor cannot be followed past one save.
+        while wait_for_edit(self.config_file_path, process=process, stdin=None) == EDIT_MODIFIED:
+            self.__file_modified = True
+
+            if reload:
+                self.load_config()
+
+            if process is None or process.poll() is not None:
+                return
+
+    def _receive_file_layer(self, values: dict) -> None:
+        # Called on the daemon client's reader thread.
+        self.__layers.set_layer('file', values)
+
+    def _remote_client(self):
+        # Reconnect (and watch again) if the connection to the daemon was lost.
+        if self.__client.closed:
+            self._connect()
+
+        return self.__client
+
+    def _sync_file_layer(self) -> None:
+        """
+        Copy the values of the parsed configuration that differ from the spec defaults into the file layer of
+        :attr:`layers`.
+
+        Returns:
+            None
+        """
+        config = self.__config
+        section_name = self.determine_section()
+        defaults = self.defaults or {}
+
+        if config.has_section(section_name):
+            items = config.items(section_name)
+        else:
+            items = config.defaults().items()
+
+        self.__layers.set_layer('file', {key: value for key, value in items if defaults.get(key) != value})
+
     @property
     def config(self):
         """
@@ -226,6 +447,7 @@ class ConfigFactory:
             None
         """
         self.__config = new
+        self._sync_file_layer()
 
     @property
     def config_changed(self) -> bool:
@@ -427,6 +649,29 @@ class ConfigFactory:
         else:
             return {}
 
+    @property
+    def ini_file(self) -> IniFile:
+        """
+        Get the indexed view of the configuration file, for reading or rewriting single sections of large files.
+
+        Returns:
+            IniFile:
+                The shared IniFile for :attr:`config_file_path`.
+        """
+        return get_ini_file(self.config_file_path)
+
+    @property
+    def layers(self) -> LayeredConfig:
+        """
+        Get the layered sources of this configuration: spec defaults, the INI file, environment variables and
+        programmatic overrides, in order of precedence.
+
+        Returns:
+            LayeredConfig:
+                The layers and their merged view.
+        """
+        return self.__layers
+
     @property
     def loaded_config(self) -> bool:
         """
@@ -471,6 +716,17 @@ class ConfigFactory:
     config_loaded = property(lambda self: self.loaded_config)
     loaded = property(lambda self: self.loaded_config)
 
+    @property
+    def remote(self) -> Optional[Path]:
+        """
+        Get the socket of the config daemon this factory reads and writes through, if it is in remote mode.
+
+        Returns:
+            Optional[Path]:
+                The socket path, or None if the factory uses the configuration file directly.
+        """
+        return None if self.__client is None else self.__client.socket_path
+
     @property
     def user_config_section_name(self) -> str:
         """
@@ -482,17 +738,80 @@ class ConfigFactory:
         """
         return 'USER' if not self.__is_cache_config else 'CACHE'
 
+    async def abackup(self, **kwargs) -> None:
+        """
+        Back up the configuration file without blocking the event loop.
+
+        Parameters:
+            **kwargs:
+                The arguments of :meth:`backup_config`.
+
+        Returns:
+            None
+        """
+        await run_io(self.backup_config, **kwargs)
+
+    async def aload(self) -> None:
+        """
+        Load the configuration from the INI file without blocking the event loop.
+
+        Returns:
+            None
+        """
+        await run_io(self.load_config)
+
+    async def arestore(
+            self,
+            backup_file: Union[str, Path] = None,
+            timestamp: Optional[Union[float, datetime]] = None,
+            ) -> None:
+        """
+        Restore the configuration from a backup file without blocking the event loop.
+
+        Parameters:
+            backup_file (Union[str, Path]):
+                The path to the backup file (or backup history).
+
+            timestamp (Union[float, datetime]):
+                For a backup history, the time to restore the configuration as of.
+
+        Returns:
+            None
+        """
+        await run_io(self.restore_config_from_backup, backup_file, timestamp)
+
+    async def asave(self, skip_backup: Optional[bool] = False) -> None:
+        """
+        Save the configuration to the INI file without blocking the event loop.
+
+        Saves of the same file are serialized, whether they come from this method or from :meth:`save_config`.
+
+        Parameters:
+            skip_backup (bool):
+                If True, do not back up the current file first.
+
+        Returns:
+            None
+        """
+        await run_io(self.save_config, skip_backup=skip_backup)
+
+    @timed('config.backup')
     def backup_config(
             self,
             backup_dir: Optional[Union[str, Path]] = FILE_SYSTEM_DEFAULTS['dirs']['config'] / 'backups',
             backup_name: Optional[str] = None,
             backup_ext: Optional[str] = '.bak',
             do_not_create_dir: Optional[bool] = False,
-            overwrite: Optional[bool] = False
+            overwrite: Optional[bool] = False,
+            history: Optional[bool] = True,
             ) -> None:
         """
         Backup the configuration file.
 
+        By default the file is added as a new version to its compressed backup history (see
+        :meth:`backup_history`), which stores only what changed since the previous backup. Pass `history=False` for a
+        full copy instead.
+
         Parameters:
 
             backup_dir (Union[str, Path]):
@@ -511,6 +830,11 @@ class ConfigFactory:
 
             overwrite:
 
+            history (bool):
+                If True (the default), add a version to the backup history named after `backup_name` (or the
+                configuration file) instead of writing a full copy. `backup_ext` and `overwrite` only apply to full
+                copies.
+
         Returns:
 
         """
@@ -528,6 +852,15 @@ class ConfigFactory:
                     "Set `do_not_create_dir` to `False` to create the directory."
                     )
 
+        if history:
+            with file_lock(self.config_file_path):
+                data = self.config_file_path.read_bytes()
+
+            if self.backup_history(backup_dir, backup_name).append(data) is not None:
+                print('Created backup')
+
+            return
+
         # Determine the name of the backup file.
         if not backup_name:
             backup_name = self.config_file_path.stem
@@ -542,13 +875,62 @@ class ConfigFactory:
         if not overwrite and backup_file_path.exists():
             raise FileExistsError(f"Backup file already exists: {backup_file_path}")
 
-        # Otherwise, backup the configuration file.
-        with open(self.config_file_path, 'r') as config_file:
-            with open(backup_file_path, 'w') as backup_file:
-                backup_file.write(config_file.read())
+        # Otherwise, backup the configuration file (streamed, so large files are never held in memory).
+        shutil.copyfile(self.config_file_path, backup_file_path)
 
         print('Created backup')
 
+    def backup_history(
+            self,
+            backup_dir: Optional[Union[str, Path]] = FILE_SYSTEM_DEFAULTS['dirs']['config'] / 'backups',
+            backup_name: Optional[str] = None,
+            ) -> BackupHistory:
+        """
+        Get the compressed backup history of the configuration file.
+
+        Parameters:
+            backup_dir (Union[str, Path]):
+                The directory the history is kept in.
+
+            backup_name (str):
+                The name of the history. Defaults to the name of the configuration file.
+
+        Returns:
+            BackupHistory:
+                The history, shared with every other caller in this process.
+        """
+        return get_backup_history(Path(backup_dir, f'{backup_name or self.config_file_path.stem}{HISTORY_EXTENSION}'))
+
+    def changes(self, keys: Optional[Union[str, Iterable[str]]] = None) -> ChangeStream:
+        """
+        Watch configuration changes from a coroutine.
+
+        Must be called with an event loop running. Each iteration of the returned stream yields the changes (as
+        passed to :meth:`subscribe` callbacks) made since the previous one.
+
+        Parameters:
+            keys (Union[str, Iterable[str]]):
+                The key (or keys) to watch, or None to watch every key.
+
+        Returns:
+            ChangeStream:
+                The async iterator; close it (or use it as an async context manager) to stop watching.
+        """
+        return ChangeStream(self._change_dispatcher(), keys)
+
+    def clear_overrides(self, *keys: str) -> None:
+        """
+        Remove programmatic overrides set with :meth:`override`.
+
+        Parameters:
+            *keys (str):
+                The keys to remove the overrides of. If none are given, every override is removed.
+
+        Returns:
+            None
+        """
+        self.__layers.clear_overrides(*keys)
+
     def create_config_directory(self, fail_if_exists=False) -> None:
         """
         Create the parent directory for the configuration (ini) file.
@@ -597,6 +979,23 @@ class ConfigFactory:
             return 'CACHE'
         return 'USER'
 
+    def flush_subscriptions(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every pending change notification has been delivered to the subscribers.
+
+        Parameters:
+            timeout (float):
+                The maximum time to wait (in seconds). If None, wait indefinitely.
+
+        Returns:
+            bool:
+                True if everything was delivered, False if the timeout expired first.
+        """
+        if self.__dispatcher is None:
+            return True
+
+        return self.__dispatcher.flush(timeout)
+
     def generate_config(self) -> None:
         """
         Generate a ConfigParser object from the configuration specification.
@@ -610,7 +1009,9 @@ class ConfigFactory:
         if not self.defaults:
             raise ValueError("No defaults found in configuration specification.")
         self.config['DEFAULT'] = self.defaults
+        self._sync_file_layer()
 
+    @timed('config.load')
     def load_config(self) -> None:
         """
         Load the configuration from the INI file.
@@ -618,10 +1019,22 @@ class ConfigFactory:
         Returns:
             None
         """
-        self.config.read(self.config_file_path)
+        if self.__client is not None:
+            self.__layers.set_layer('file', self._remote_client().reload(self.__config_system))
+            self.__loaded_config = True
+
+            return
+
+        ini_file = self.ini_file
+        sections = ['DEFAULT', self.determine_section(), *self.config.sections()]
+
+        # Only the sections this factory uses are parsed; the rest of the file is never read.
+        self.config.read_dict(ini_file.read_sections(list(dict.fromkeys(sections))))
+        self._compact_section(self.determine_section())
         self.__loaded_config = True
 
         self.sync_config_with_spec()
+        self._sync_file_layer()
 
     def load_config_if_exists(self):
         """
@@ -677,18 +1090,18 @@ class ConfigFactory:
             None
 
         """
-        directory = str(self.config_file_path.parent)
-        os.startfile(directory)
+        launch_editor(self.config_file_path.parent, directory=True)
 
     def open_config_file(
             self,
             skip_backup: Optional[bool] = False,
             skip_wait_for_changes: Optional[bool] = False,
-            skip_reload_on_change: Optional[bool] = not reload_file_on_change
-            ) -> None:
+            skip_reload_on_change: Optional[bool] = not reload_file_on_change,
+            background: Optional[bool] = False,
+            ) -> Optional[threading.Thread]:
         """
-        Open the configuration file in the default text editor. Optionally, backup the configuration file, wait for
-        changes, and reload the configuration on change.
+        Open the configuration file in the user's editor (`$VISUAL`, `$EDITOR`, or the desktop's default). Optionally,
+        backup the configuration file, wait for changes, and reload the configuration on change.
 
         Parameters:
             skip_backup (bool):
@@ -702,23 +1115,68 @@ class ConfigFactory:
                 If True, the system will not reload the configuration file if it is changed. Default is the opposite of
                 the value of `reload_file_on_change`.
 
+            background (bool):
+                If True, return as soon as the editor is open, and reload the configuration on a background thread
+                each time the file is saved, until the editor exits. Default is False.
+
         Returns:
-            None
+            Optional[threading.Thread]:
+                In background mode, the thread that follows the editor (join it to wait for the editor to exit);
+                otherwise None.
         """
 
         if not skip_backup:
             self.backup_config()
 
+        if background:
+            thread = threading.Thread(
+                    target=self._follow_editor,
+                    args=(launch_editor(self.config_file_path), not skip_reload_on_change),
+                    name=f'config-{self.__config_system}-editor',
+                    daemon=True,
+                    )
+            thread.start()
+
+            return thread
+
         if not skip_wait_for_changes:
             self.__file_modified = wait_for_changes(self)
         else:
-            config_fp_str = str(self.config_file_path)
-            os.startfile(config_fp_str)
+            launch_editor(self.config_file_path)
             return
 
         if self.config_file_modified and not skip_reload_on_change:
             self.load_config()
 
+    def override(self, **values) -> None:
+        """
+        Override configuration values for the life of the process, without touching the INI file.
+
+        Overrides take precedence over the INI file and environment variables. Values may be given as strings (they
+        are converted to the type in the specification) or already typed.
+
+        Parameters:
+            **values:
+                The values to override, keyed by configuration key.
+
+        Returns:
+            None
+        """
+        self.__layers.override(**values)
+
+    def refresh_environment(self) -> bool:
+        """
+        Re-read the `INSPYRE_FIRE_<SYSTEM>_<KEY>` environment variables.
+
+        The environment is read when the factory is created; call this after changing it at runtime.
+
+        Returns:
+            bool:
+                True if any value changed, False otherwise.
+        """
+        return self.__layers.refresh_environment()
+
+    @timed('config.reload')
     def reload_config(self) -> None:
         """
         Reload the configuration from the INI file.
@@ -735,33 +1193,59 @@ class ConfigFactory:
         Returns:
             None
         """
-        self.config['USER'] = self.config['DEFAULT']
+        # An empty section resolves every option to its DEFAULT value, without a copy of each.
+        self.config.remove_section('USER')
+        self.config.add_section('USER')
+        self._sync_file_layer()
+
         if not skip_save:
             self.save_config()
 
-    def restore_config_from_backup(self, backup_file: Union[str, Path] = None) -> None:
+    @timed('config.restore')
+    def restore_config_from_backup(
+            self,
+            backup_file: Union[str, Path] = None,
+            timestamp: Optional[Union[float, datetime]] = None,
+            ) -> None:
         """
         Restore the configuration from a backup file.
 
         Parameters:
             backup_file (Union[str, Path]):
-                The path to the backup file to restore from, if no backup file is provided, the system will choose the
-                most recent backup file for restoration.
+                The path to the backup file (a full copy or a backup history) to restore from, if no backup file is
+                provided, the system will restore from the default backup history (see :meth:`backup_history`).
+
+            timestamp (Union[float, datetime]):
+                For a backup history, restore the version that was current at this time (seconds since the epoch, or
+                a datetime). If None, restore the most recent version.
 
         Returns:
             None
         """
-        backup_file = Path(backup_file)
+        backup_file = Path(backup_file) if backup_file is not None else self.backup_history().file_path
 
         if not backup_file.exists():
             raise FileNotFoundError(f"Backup file does not exist: {backup_file}")
 
-        with open(backup_file, 'r') as backup:
-            with open(self.config_file_path, 'w') as config:
-                config.write(backup.read())
+        # Write the backup next to the config file, then swap it in, so a failed copy never leaves a partial file.
+        temp_path = self.config_file_path.with_name(f'{self.config_file_name}.restore')
+
+        with file_lock(self.config_file_path):
+            if backup_file.suffix == HISTORY_EXTENSION:
+                history = get_backup_history(backup_file)
+                temp_path.write_bytes(history.read() if timestamp is None else history.read_at(timestamp))
+            else:
+                shutil.copyfile(backup_file, temp_path)
+
+            os.replace(temp_path, self.config_file_path)
+
+        # Loading merges into the parsed sections; drop them so keys the backup does not have do not survive.
+        for section in self.config.sections():
+            self.config.remove_section(section)
 
         self.load_config()
 
+    @timed('config.save')
     def save_config(self, skip_backup: Optional[bool] = False) -> None:
         """
         Save the configuration to an INI file.
@@ -770,7 +1254,15 @@ class ConfigFactory:
             None
         """
 
-        if self.config_file_path:
+        if self.__client is not None:
+            self._remote_client().save(self.__config_system)
+
+            return
+
+        if not self.config_file_path:
+            return
+
+        with file_lock(self.config_file_path):
             print(f'Saving configuration to {self.config_file_path}')
             try:
                 print(f'Checking if directory exists: {self.config_file_path.parent}')
@@ -794,13 +1286,12 @@ class ConfigFactory:
                     except FileExistsError as e:
                         warn(f"FileExistsError: {e} - Skipping backup.")
 
-                print('Deleting existing configuration file...')
+                print('Writing changed sections...')
 
-                self.delete_config_file()
-
-            with open(str(self.config_file_path), 'w') as configfile:
-                self.config.write(configfile)
-                configfile.close()
+                self.ini_file.write_sections(self._sections_to_save())
+            else:
+                with open(str(self.config_file_path), 'w') as configfile:
+                    self.config.write(configfile)
 
             if self.config_changed:
                 self.config_changed = False
@@ -837,6 +1328,28 @@ class ConfigFactory:
             if new != old:
                 ad.config = ''
 
+    def subscribe(self, keys: Optional[Union[str, Iterable[str]]], callback: Callable[[Changes], None]) -> Subscription:
+        """
+        Get notified when configuration values change.
+
+        Whenever the configuration changes (on a reload, an attribute write, an override or an environment refresh),
+        the old and new values are compared key by key. The callback is called, on a background thread, with the
+        changed keys it subscribed to. Changes made while a notification is pending are coalesced into one call.
+
+        Parameters:
+            keys (Union[str, Iterable[str]]):
+                The key (or keys) to watch, or None to watch every key.
+
+            callback (Callable[[Changes], None]):
+                Called with an `(old, new)` pair for each watched key that changed, keyed by configuration key.
+
+        Returns:
+            Subscription:
+                The subscription; pass it to :meth:`unsubscribe` (or call its `cancel` method) to stop receiving
+                changes.
+        """
+        return self._change_dispatcher().subscribe(keys, callback)
+
     def sync_config_with_spec(self):
         """
         Synchronize the configuration with the configuration specification.
@@ -848,3 +1361,16 @@ class ConfigFactory:
             warn("Configuration specification and configuration file do not match. Synchronizing...")
             self.generate_config()
             self.save_config()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stop a subscription made with :meth:`subscribe`.
+
+        Parameters:
+            subscription (Subscription):
+                The subscription.
+
+        Returns:
+            None
+        """
+        subscription.cancel()
@@ -0,0 +1,434 @@
+"""
+Compressed version history for configuration backups.
+
+A :class:`BackupHistory` keeps every backed-up version of a file in one append-only history file. Most versions are
+stored as a compressed line-level delta against the version before them; every `snapshot_interval` versions (or
+whenever a delta would not be smaller) a compressed full snapshot is stored instead, so rebuilding any version never
+applies more than `snapshot_interval - 1` deltas.
+
+Each record is a header (`>BdII`: flags, timestamp, uncompressed size, payload size) followed by its payload. A delta
+is a sequence of operations: `C` copies a run of lines of the previous version, `I` inserts new lines.
+"""
+import bisect
+import difflib
+import functools
+import lzma
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+
+HISTORY_EXTENSION = '.history'
+SNAPSHOT_INTERVAL = 32
+
+CODECS = {
+        'zlib': (0x00, lambda data: zlib.compress(data, 9), zlib.decompress),
+        'lzma': (0x10, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+        }
+
+HEADER = struct.Struct('>BdII')
+COPY = struct.Struct('>cII')
+INSERT = struct.Struct('>cI')
+LENGTH = struct.Struct('>I')
+
+_DELTA = 0x01
+_CODEC_MASK = 0xF0
+_DECOMPRESSORS = {flag: decompress for flag, _, decompress in CODECS.values()}
+
+
+def encode_delta(old: List[bytes], new: List[bytes]) -> bytes:
+    """
+    Encode the line-level difference between two versions.
+
+    Parameters:
+        old (List[bytes]):
+            The lines of the previous version (line endings included).
+
+        new (List[bytes]):
+            The lines of the new version.
+
+    Returns:
+        bytes:
+            The (uncompressed) delta.
+    """
+    parts = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            parts.append(COPY.pack(b'C', i1, i2 - i1))
+        elif j2 > j1:
+            parts.append(INSERT.pack(b'I', j2 - j1))
+
+            for line in new[j1:j2]:
+                parts.append(LENGTH.pack(len(line)))
+                parts.append(line)
+
+    return b''.join(parts)
+
+
+def apply_delta(old: List[bytes], delta: bytes) -> List[bytes]:
+    """
+    Rebuild a version from the previous one and its delta.
+
+    Parameters:
+        old (List[bytes]):
+            The lines of the previous version.
+
+        delta (bytes):
+            The (uncompressed) delta, as returned by :func:`encode_delta`.
+
+    Returns:
+        List[bytes]:
+            The lines of the new version.
+    """
+    new = []
+    offset = 0
+
+    while offset < len(delta):
+        if delta[offset:offset + 1] == b'C':
+            _, start, count = COPY.unpack_from(delta, offset)
+            offset += COPY.size
+            new.extend(old[start:start + count])
+            continue
+
+        _, count = INSERT.unpack_from(delta, offset)
+        offset += INSERT.size
+
+        for _ in range(count):
+            length = LENGTH.unpack_from(delta, offset)[0]
+            offset += LENGTH.size
+            new.append(delta[offset:offset + length])
+            offset += length
+
+    return new
+
+
+class BackupHistory:
+    """
+    The compressed version history of one file.
+    """
+
+    def __init__(
+            self,
+            file_path: Union[str, Path],
+            compression: Optional[str] = 'zlib',
+            snapshot_interval: Optional[int] = SNAPSHOT_INTERVAL,
+            ):
+        """
+        Initialize a BackupHistory object.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The history file. It does not have to exist yet.
+
+            compression (str):
+                The codec for new records: 'zlib' (fast) or 'lzma' (smaller). Records written with either can always
+                be read.
+
+            snapshot_interval (int):
+                The most versions between two full snapshots.
+        """
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression '{compression}'. Choose one of: {', '.join(CODECS)}")
+
+        if snapshot_interval < 1:
+            raise ValueError('The snapshot interval must be at least 1.')
+
+        self.__file_path = Path(file_path).expanduser().absolute()
+        self.__compression = compression
+        self.__snapshot_interval = snapshot_interval
+        # (offset, flags, timestamp, size, payload size) of each version.
+        self.__records: List[Tuple[int, int, float, int, int]] = []
+        self.__timestamps: List[float] = []
+        self.__end = 0
+        self.__signature = None
+        self.__cache: Optional[Tuple[int, List[bytes]]] = None
+        self.__lock = threading.RLock()
+
+    @property
+    def compression(self) -> str:
+        """
+        Get the codec new records are compressed with.
+
+        Returns:
+            str:
+                'zlib' or 'lzma'.
+        """
+        return self.__compression
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Get the path of the history file.
+
+        Returns:
+            Path:
+                The path.
+        """
+        return self.__file_path
+
+    def append(self, data: bytes, timestamp: Optional[float] = None) -> Optional[int]:
+        """
+        Add a version.
+
+        Parameters:
+            data (bytes):
+                The contents of the file.
+
+            timestamp (float):
+                When the version was made (seconds since the epoch). Defaults to now; timestamps never go backwards.
+
+        Returns:
+            Optional[int]:
+                The new version number, or None if the data is the same as the latest version.
+        """
+        with self.__lock:
+            self._refresh()
+            count = len(self.__records)
+            lines = data.splitlines(keepends=True)
+            flag, compress, _ = CODECS[self.__compression]
+
+            if count and self._lines(count - 1) == lines:
+                return None
+
+            timestamp = time.time() if timestamp is None else float(timestamp)
+
+            if self.__timestamps:
+                timestamp = max(timestamp, self.__timestamps[-1])
+
+            flags, payload = flag, None
+
+            if count and count - self._snapshot_before(count - 1) < self.__snapshot_interval:
+                delta = compress(encode_delta(self._lines(count - 1), lines))
+
+                # A snapshot is only compressed (to compare) when the delta is not obviously smaller.
+                if len(delta) * 2 < len(data) or len(delta) < len(payload := compress(data)):
+                    flags, payload = flag | _DELTA, delta
+
+            if payload is None:
+                payload = compress(data)
+
+            record = HEADER.pack(flags, timestamp, len(data), len(payload)) + payload
+            self.__file_path.parent.mkdir(parents=True, exist_ok=True)
+
+            with open(self.__file_path, 'ab') as f:
+                # Drop a record cut short by a crash before appending after it.
+                f.truncate(self.__end)
+                f.seek(self.__end)
+                f.write(record)
+
+            self.__records.append((self.__end, flags, timestamp, len(data), len(payload)))
+            self.__timestamps.append(timestamp)
+            self.__end += len(record)
+            self.__signature = self._signature()
+            self.__cache = (count, lines)
+
+            return count
+
+    def read(self, version: Optional[int] = -1) -> bytes:
+        """
+        Rebuild a version.
+
+        Parameters:
+            version (int):
+                The version number; negative numbers count back from the latest version. Default is the latest.
+
+        Returns:
+            bytes:
+                The contents of the file at that version.
+
+        Raises:
+            IndexError:
+                If there is no such version.
+        """
+        with self.__lock:
+            self._refresh()
+            count = len(self.__records)
+
+            if not -count <= version < count:
+                raise IndexError(f'Version {version} is not in the history ({count} versions).')
+
+            return b''.join(self._lines(version % count))
+
+    def read_at(self, timestamp: Union[float, datetime]) -> bytes:
+        """
+        Rebuild the version that was current at a given time.
+
+        Parameters:
+            timestamp (Union[float, datetime]):
+                The time (seconds since the epoch, or a datetime).
+
+        Returns:
+            bytes:
+                The contents of the file at that time.
+
+        Raises:
+            LookupError:
+                If the history starts after that time.
+        """
+        return self.read(self.version_at(timestamp))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the size of the history.
+
+        Returns:
+            Dict[str, int]:
+                The number of versions and snapshots, the total size of the versions uncompressed, and the size of the
+                history file.
+        """
+        with self.__lock:
+            self._refresh()
+
+            return {
+                    'versions':     len(self.__records),
+                    'snapshots':    sum(1 for record in self.__records if not record[1] & _DELTA),
+                    'raw_bytes':    sum(record[3] for record in self.__records),
+                    'stored_bytes': self.__end,
+                    }
+
+    def timestamps(self) -> List[float]:
+        """
+        Get the timestamp of each version.
+
+        Returns:
+            List[float]:
+                The timestamps, oldest first.
+        """
+        with self.__lock:
+            self._refresh()
+
+            return list(self.__timestamps)
+
+    def version_at(self, timestamp: Union[float, datetime]) -> int:
+        """
+        Find the version that was current at a given time.
+
+        Parameters:
+            timestamp (Union[float, datetime]):
+                The time (seconds since the epoch, or a datetime).
+
+        Returns:
+            int:
+                The number of the latest version made at or before that time.
+
+        Raises:
+            LookupError:
+                If the history starts after that time.
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+
+        with self.__lock:
+            self._refresh()
+            version = bisect.bisect_right(self.__timestamps, timestamp) - 1
+
+            if version < 0:
+                raise LookupError(f'The history of {self.__file_path.name} has no version from before {timestamp}.')
+
+            return version
+
+    def _lines(self, version: int) -> List[bytes]:
+        if self.__cache is not None and self.__cache[0] == version:
+            return self.__cache[1]
+
+        start = self._snapshot_before(version)
+        lines = None
+
+        # Continue from the cached version if it is on the way.
+        if self.__cache is not None and start <= self.__cache[0] < version:
+            start, lines = self.__cache[0] + 1, self.__cache[1]
+
+        with open(self.__file_path, 'rb') as f:
+            for number in range(start, version + 1):
+                offset, flags, _, _, size = self.__records[number]
+                f.seek(offset + HEADER.size)
+                data = _DECOMPRESSORS[flags & _CODEC_MASK](f.read(size))
+                lines = apply_delta(lines, data) if flags & _DELTA else data.splitlines(keepends=True)
+
+        self.__cache = (version, lines)
+
+        return lines
+
+    def _refresh(self) -> None:
+        signature = self._signature()
+
+        if signature == self.__signature:
+            return
+
+        self.__records, self.__timestamps, self.__end, self.__cache = [], [], 0, None
+
+        if signature is not None:
+            # The history is compressed, so one read of it is cheaper than a seek per record.
+            data = self.__file_path.read_bytes()
+
+            while self.__end + HEADER.size <= len(data):
+                flags, timestamp, raw_size, payload_size = HEADER.unpack_from(data, self.__end)
+
+                if self.__end + HEADER.size + payload_size > len(data):
+                    break
+
+                self.__records.append((self.__end, flags, timestamp, raw_size, payload_size))
+                self.__timestamps.append(timestamp)
+                self.__end += HEADER.size + payload_size
+
+        self.__signature = signature
+
+    def _signature(self):
+        try:
+            stat = self.__file_path.stat()
+        except FileNotFoundError:
+            return None
+
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _snapshot_before(self, version: int) -> int:
+        while self.__records[version][1] & _DELTA:
+            version -= 1
+
+        return version
+
+    def __len__(self):
+        with self.__lock:
+            self._refresh()
+
+            return len(self.__records)
+
+    def __repr__(self):
+        return f'<BackupHistory: {self.__file_path} | {len(self.__records)} versions | @{hex(id(self))}>'
+
+
+@functools.lru_cache(maxsize=64)
+def _get_backup_history(file_path: Path) -> BackupHistory:
+    return BackupHistory(file_path)
+
+
+def get_backup_history(file_path: Union[str, Path]) -> BackupHistory:
+    """
+    Get a shared :class:`BackupHistory` for a path, so its index and latest version are reused between backups.
+
+    Parameters:
+        file_path (Union[str, Path]):
+            The history file.
+
+    Returns:
+        BackupHistory:
+            The shared instance.
+    """
+    return _get_backup_history(Path(file_path))
+
+
+__all__ = [
+        'BackupHistory',
+        'CODECS',
+        'HISTORY_EXTENSION',
+        'SNAPSHOT_INTERVAL',
+        'apply_delta',
+        'encode_delta',
+        'get_backup_history',
+        ]
@@ -0,0 +1,468 @@
+"""
+Streaming access to large INI files.
+
+:class:`IniFile` scans a file once for the byte offsets of its section headers, then reads single sections on demand
+and rewrites only the sections that changed: unchanged byte ranges are copied by the kernel (`copy_file_range` or
+`sendfile`, where available) instead of being parsed and re-serialized. The index is rebuilt only when the file
+changes on disk.
+
+The parser follows the `configparser` defaults: `=` or `:` delimiters, full-line `#`/`;` comments, indented
+continuation lines and lower-cased keys.
+"""
+import configparser
+import functools
+import os
+import re
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+
+ENCODING = 'utf-8'
+SECTION_PATTERN = re.compile(rb'\[(?P<name>.+)\]')
+OPTION_PATTERN = re.compile(r'(?P<key>.*?)\s*[=:]\s*(?P<value>.*)$')
+COMMENT_PREFIXES = ('#', ';')
+
+
+def _copy_range(source, destination, offset: int, count: int) -> None:
+    """
+    Copy `count` bytes at `offset` of one open file to the current position of another, in the kernel if possible.
+    """
+    destination.flush()
+    source_fd, destination_fd = source.fileno(), destination.fileno()
+
+    for copy in ('copy_file_range', 'sendfile'):
+        if count <= 0 or not hasattr(os, copy):
+            continue
+
+        try:
+            while count > 0:
+                if copy == 'copy_file_range':
+                    copied = os.copy_file_range(source_fd, destination_fd, count, offset)
+                else:
+                    copied = os.sendfile(destination_fd, source_fd, offset, count)
+
+                if not copied:
+                    break
+
+                offset += copied
+                count -= copied
+        except OSError:
+            # Not supported for this pair of files; fall through to the next method.
+            continue
+
+    if count > 0:
+        source.seek(offset)
+
+        while count > 0:
+            chunk = source.read(min(count, shutil.COPY_BUFSIZE))
+
+            if not chunk:
+                break
+
+            destination.write(chunk)
+            count -= len(chunk)
+
+    destination.flush()
+
+
+def render_section(name: str, values: Mapping[str, object]) -> bytes:
+    """
+    Serialize a section the way `configparser.ConfigParser.write` does.
+
+    Parameters:
+        name (str):
+            The section name.
+
+        values (Mapping[str, object]):
+            The option values, keyed by option name.
+
+    Returns:
+        bytes:
+            The encoded section, including its trailing blank line.
+    """
+    lines = [f'[{name}]']
+
+    for key, value in values.items():
+        value = str(value).replace('\n', '\n\t')
+        lines.append(f'{key} = {value}')
+
+    return ('\n'.join(lines) + '\n\n').encode(ENCODING)
+
+
+class IniFile:
+    """
+    An INI file with a byte-offset index of its sections.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        Initialize an IniFile object.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path to the INI file. It does not have to exist yet.
+        """
+        self.__file_path = Path(file_path).expanduser().resolve().absolute()
+        self.__index: Dict[str, Tuple[int, int]] = {}
+        self.__signature = None
+        self.__lock = threading.RLock()
+        self.__scans = 0
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Get the path to the INI file.
+
+        Returns:
+            Path:
+                The path.
+        """
+        return self.__file_path
+
+    @property
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Get the section index, rescanning the file first if it changed on disk.
+
+        Returns:
+            Dict[str, Tuple[int, int]]:
+                The `(start, end)` byte offsets of each section (header included), in file order.
+        """
+        with self.__lock:
+            signature = self._signature()
+
+            if signature != self.__signature:
+                self.__index = self._scan() if signature is not None else {}
+                self.__signature = signature
+
+            return self.__index
+
+    @property
+    def scans(self) -> int:
+        """
+        Get the number of times the file has been scanned for its index.
+
+        Returns:
+            int:
+                The scan count.
+        """
+        return self.__scans
+
+    def has_section(self, name: str) -> bool:
+        """
+        Check whether the file has a section.
+
+        Parameters:
+            name (str):
+                The section name.
+
+        Returns:
+            bool:
+                True if it does, False otherwise.
+        """
+        return name in self.index
+
+    def read_section(self, name: str) -> Dict[str, str]:
+        """
+        Read one section, without parsing the rest of the file.
+
+        Parameters:
+            name (str):
+                The section name.
+
+        Returns:
+            Dict[str, str]:
+                The option values, keyed by (lower-cased) option name. Empty if there is no such section.
+        """
+        return self.read_sections([name]).get(name, {})
+
+    def read_sections(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Read several sections.
+
+        Parameters:
+            names (List[str]):
+                The sections to read. If None, read every section.
+
+        Returns:
+            Dict[str, Dict[str, str]]:
+                The values of each section that exists, keyed by section name.
+        """
+        sections = {}
+
+        with self.__lock:
+            index = self.index
+            spans = [(name, index[name]) for name in (index if names is None else names) if name in index]
+
+            if not spans:
+                return sections
+
+            with open(self.__file_path, 'rb') as f:
+                for name, (start, end) in spans:
+                    f.seek(start)
+                    sections[name] = f.read(end - start)
+
+        return {name: self._parse(data.decode(ENCODING).splitlines()[1:]) for name, data in sections.items()}
+
+    def sections(self) -> List[str]:
+        """
+        Get the section names, in file order.
+
+        Returns:
+            List[str]:
+                The names.
+        """
+        return list(self.index)
+
+    def write_sections(self, updates: Mapping[str, Optional[Mapping[str, object]]]) -> List[str]:
+        """
+        Write the sections that changed, leaving every other byte of the file as it was.
+
+        Sections are compared with their current contents first; unchanged ones are skipped. If every changed section
+        is at the end of the file, the file is rewritten in place from the first of them; otherwise a new file is
+        assembled from kernel-copied ranges of the old one and atomically swapped in.
+
+        Parameters:
+            updates (Mapping[str, Optional[Mapping[str, object]]]):
+                The new values of each section, keyed by section name. None removes the section. Sections that do
+                not exist yet are appended.
+
+        Returns:
+            List[str]:
+                The names of the sections that were written or removed.
+        """
+        with self.__lock:
+            index = self.index
+            changed = {}
+
+            for name, values in updates.items():
+                if values is None:
+                    if name in index:
+                        changed[name] = None
+                    continue
+
+                values = {str(key).lower(): str(value) for key, value in values.items()}
+
+                if name not in index or self.read_section(name) != values:
+                    changed[name] = values
+
+            if not changed:
+                return []
+
+            # The writers know the new layout, so the file does not have to be rescanned.
+            self.__signature = None
+
+            if not index:
+                self.__index = self._write_new(changed)
+            else:
+                self.__index = self._write_changed(index, changed)
+
+            self.__signature = self._signature()
+
+            return list(changed)
+
+    def _parse(self, lines: List[str]) -> Dict[str, str]:
+        values = {}
+        key = None
+        key_indent = 0
+
+        for line_number, line in enumerate(lines, 2):
+            stripped = line.strip()
+
+            if not stripped or stripped.startswith(COMMENT_PREFIXES):
+                # A blank line or comment ends a multi-line value.
+                key = None if not stripped else key
+                continue
+
+            indent = len(line) - len(line.lstrip())
+
+            if key is not None and indent > key_indent:
+                values[key] = f'{values[key]}\n{stripped}'
+                continue
+
+            match = OPTION_PATTERN.match(stripped)
+
+            if match is None:
+                error = configparser.ParsingError(str(self.__file_path))
+                error.append(line_number, line)
+
+                raise error
+
+            key = sys.intern(match.group('key').strip().lower())
+            key_indent = indent
+            values[key] = match.group('value').strip()
+
+        return values
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        index = {}
+        name = None
+        start = offset = 0
+
+        with open(self.__file_path, 'rb') as f:
+            for line in f:
+                match = SECTION_PATTERN.match(line) if line[:1] == b'[' else None
+
+                if match is not None:
+                    if name is not None:
+                        index[name] = (start, offset)
+
+                    name = match.group('name').decode(ENCODING)
+                    start = offset
+
+                    if name in index:
+                        raise configparser.DuplicateSectionError(name, str(self.__file_path))
+
+                offset += len(line)
+
+        if name is not None:
+            index[name] = (start, offset)
+
+        self.__scans += 1
+
+        return index
+
+    def _signature(self):
+        try:
+            stat = self.__file_path.stat()
+        except FileNotFoundError:
+            return None
+
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _write_changed(self, index: Dict[str, Tuple[int, int]], changed: dict) -> Dict[str, Tuple[int, int]]:
+        appended = [
+                (name, render_section(name, values))
+                for name, values in changed.items()
+                if name not in index and values is not None
+                ]
+        size = max(end for _, end in index.values())
+        first = min((index[name][0] for name in index if name in changed), default=size)
+        new_index = {}
+
+        if all(name in changed for name, (start, _) in index.items() if start >= first):
+            # Everything from the first changed section on is rewritten anyway: do it in place.
+            rewritten = [
+                    (name, render_section(name, changed[name]))
+                    for name, (start, _) in index.items()
+                    if start >= first and changed[name] is not None
+                    ]
+            new_index = {name: span for name, span in index.items() if span[0] < first}
+
+            with open(self.__file_path, 'r+b') as f:
+                f.seek(first)
+
+                if first == size and size:
+                    f.seek(size - 1)
+
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+
+                position = f.tell()
+
+                for name, data in rewritten + appended:
+                    f.write(data)
+                    new_index[name] = (position, position + len(data))
+                    position += len(data)
+
+                f.truncate()
+
+            return new_index
+
+        temp_path = self.__file_path.with_name(f'{self.__file_path.name}.tmp')
+
+        try:
+            with open(self.__file_path, 'rb') as source, open(temp_path, 'wb') as destination:
+                position = shift = 0
+
+                for name, (start, end) in index.items():
+                    if name not in changed:
+                        new_index[name] = (start + shift, end + shift)
+                        continue
+
+                    _copy_range(source, destination, position, start - position)
+                    position = end
+
+                    if changed[name] is None:
+                        shift -= end - start
+                        continue
+
+                    data = render_section(name, changed[name])
+                    destination.write(data)
+                    new_index[name] = (start + shift, start + shift + len(data))
+                    shift += len(data) - (end - start)
+
+                _copy_range(source, destination, position, size - position)
+                position = size + shift
+
+                if appended:
+                    source.seek(size - 1)
+
+                    if source.read(1) != b'\n':
+                        destination.write(b'\n')
+                        position += 1
+
+                for name, data in appended:
+                    destination.write(data)
+                    new_index[name] = (position, position + len(data))
+                    position += len(data)
+
+            shutil.copymode(self.__file_path, temp_path)
+            os.replace(temp_path, self.__file_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+        return new_index
+
+    def _write_new(self, changed: dict) -> Dict[str, Tuple[int, int]]:
+        new_index = {}
+
+        with open(self.__file_path, 'ab') as f:
+            if f.tell():
+                # The file exists but has no sections (only comments, say).
+                f.write(b'\n')
+
+            position = f.tell()
+
+            for name, values in changed.items():
+                if values is not None:
+                    data = render_section(name, values)
+                    f.write(data)
+                    new_index[name] = (position, position + len(data))
+                    position += len(data)
+
+        return new_index
+
+    def __repr__(self):
+        return f'<IniFile: {self.__file_path} | {len(self.__index)} sections indexed | @{hex(id(self))}>'
+
+
+@functools.lru_cache(maxsize=64)
+def _get_ini_file(file_path: Path) -> IniFile:
+    # Keyed on the path as given: resolving it costs more than the read it would save.
+    return IniFile(file_path)
+
+
+def get_ini_file(file_path: Union[str, Path]) -> IniFile:
+    """
+    Get a shared :class:`IniFile` for a path, so its index is reused between callers.
+
+    Parameters:
+        file_path (Union[str, Path]):
+            The path to the INI file.
+
+    Returns:
+        IniFile:
+            The shared instance.
+    """
+    return _get_ini_file(Path(file_path))
+
+
+__all__ = [
+        'IniFile',
+        'get_ini_file',
+        'render_section',
+        ]
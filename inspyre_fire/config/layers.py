@@ -0,0 +1,416 @@
+"""
+Layered configuration sources, merged into one flattened, typed lookup table.
+
+The layers, lowest precedence first, are:
+
+    defaults     the default values from the configuration specification;
+    file         the values read from the INI file;
+    environment  `INSPYRE_FIRE_<SYSTEM>_<KEY>` environment variables, e.g. `INSPYRE_FIRE_CORE_FIRE_TV_HOST`;
+    overrides    values set programmatically, for the life of the process.
+
+The merged table is built on the first read after a layer changes, so a read is a single dict lookup no matter how
+many layers contribute to it.
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Mapping, Optional
+from warnings import warn
+from inspyre_fire.config.subscriptions import diff
+from inspyre_fire.config.utils.types import convert_str_to_type, TYPE_MAPPING
+
+
+ENV_PREFIX = 'INSPYRE_FIRE'
+LAYERS = ('defaults', 'file', 'environment', 'overrides')
+
+
+def environment_variable(config_system: str, key: str) -> str:
+    """
+    Get the name of the environment variable that overrides a configuration value.
+
+    Parameters:
+        config_system (str):
+            The name of the configuration system.
+
+        key (str):
+            The configuration key.
+
+    Returns:
+        str:
+            The variable name, e.g. 'INSPYRE_FIRE_CORE_FIRE_TV_HOST'.
+    """
+    return f'{ENV_PREFIX}_{config_system}_{key}'.upper()
+
+
+class LayeredConfig:
+    """
+    The layered sources of one configuration system, and the typed view merged from them.
+
+    The defaults layer is the specification's own defaults dict (shared, never copied), and the layer a value comes
+    from is looked up on demand rather than stored per key.
+    """
+    __slots__ = (
+            '_LayeredConfig__config_system',
+            '_LayeredConfig__spec',
+            '_LayeredConfig__environ',
+            '_LayeredConfig__prefix',
+            '_LayeredConfig__layers',
+            '_LayeredConfig__view',
+            '_LayeredConfig__builds',
+            '_LayeredConfig__lock',
+            '_LayeredConfig__listeners',
+            )
+
+    def __init__(self, config_system: str, spec, environ: Optional[Mapping[str, str]] = None):
+        """
+        Initialize a LayeredConfig object.
+
+        Parameters:
+            config_system (str):
+                The name of the configuration system.
+
+            spec (ConfigSpec):
+                The configuration specification; provides the defaults layer and the type of each key.
+
+            environ (Mapping[str, str]):
+                The environment to read overrides from. Defaults to `os.environ`.
+        """
+        self.__config_system = config_system.lower()
+        self.__spec = spec
+        self.__environ = os.environ if environ is None else environ
+        self.__prefix = environment_variable(self.__config_system, '')
+        self.__layers: Dict[str, Dict[str, str]] = {name: {} for name in LAYERS}
+        self.__layers['defaults'] = spec.defaults or {}
+        self.__view: Optional[dict] = None
+        self.__builds = 0
+        self.__lock = threading.RLock()
+        self.__listeners: List[Callable[[dict], None]] = []
+
+        self.refresh_environment()
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        """
+        Call a function with the key-level diff of the merged view whenever a layer changes.
+
+        While there are listeners, the view is rebuilt as soon as a layer changes instead of on the next read.
+
+        Parameters:
+            listener (Callable[[dict], None]):
+                Called (with the layers locked, so it should return quickly) with an `(old, new)` pair for every key
+                whose typed value changed.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.values
+            self.__listeners.append(listener)
+
+    @property
+    def builds(self) -> int:
+        """
+        Get the number of times the merged view has been built.
+
+        Returns:
+            int:
+                The build count.
+        """
+        return self.__builds
+
+    @property
+    def config_system(self) -> str:
+        """
+        Get the name of the configuration system.
+
+        Returns:
+            str:
+                The system name.
+        """
+        return self.__config_system
+
+    @property
+    def values(self) -> dict:
+        """
+        Get the merged, typed view of every layer, building it first if a layer has changed since the last build.
+
+        Returns:
+            dict:
+                The values, keyed by configuration key. Do not modify it.
+        """
+        view = self.__view
+
+        if view is None:
+            view = self._build()
+
+        return view
+
+    def clear_overrides(self, *keys: str) -> None:
+        """
+        Remove programmatic overrides.
+
+        Parameters:
+            *keys (str):
+                The keys to remove the overrides of. If none are given, every override is removed.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            overrides = dict(self.__layers['overrides'])
+
+            if keys:
+                for key in keys:
+                    overrides.pop(key.lower(), None)
+            else:
+                overrides.clear()
+
+            self.set_layer('overrides', overrides)
+
+    def get(self, key: str, default=None):
+        """
+        Get a value from the merged view.
+
+        Parameters:
+            key (str):
+                The configuration key.
+
+            default:
+                What to return if no layer has the key.
+
+        Returns:
+            The typed value, or `default`.
+        """
+        return self.values.get(key, default)
+
+    def layer(self, name: str) -> Dict[str, str]:
+        """
+        Get a copy of the raw values of a layer.
+
+        Parameters:
+            name (str):
+                One of :data:`LAYERS`.
+
+        Returns:
+            Dict[str, str]:
+                The raw values, keyed by configuration key.
+        """
+        self._check_layer(name)
+
+        return dict(self.__layers[name])
+
+    def override(self, **values) -> None:
+        """
+        Set programmatic overrides. They take precedence over every other layer until cleared.
+
+        Parameters:
+            **values:
+                The values to override, keyed by configuration key.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            overrides = dict(self.__layers['overrides'])
+            overrides.update({key.lower(): value for key, value in values.items()})
+            self.set_layer('overrides', overrides)
+
+    def refresh_environment(self) -> bool:
+        """
+        Re-read the environment layer from the environment.
+
+        Only variables named after a key of the specification are used; any other variable with this system's prefix
+        is most likely a typo, so it is reported with a warning and ignored.
+
+        Returns:
+            bool:
+                True if the environment layer changed, False otherwise.
+        """
+        prefix = self.__prefix
+        known = (self.__spec.spec or {}).keys() | (self.__spec.defaults or {}).keys()
+        values = {}
+
+        for name, value in self.__environ.items():
+            if not name.startswith(prefix):
+                continue
+
+            key = name[len(prefix):].lower()
+
+            if key in known:
+                values[key] = value
+            else:
+                warn(f"Ignoring environment variable '{name}': '{key}' is not a key of the "
+                     f"'{self.__config_system}' configuration system.")
+
+        return self.set_layer('environment', values)
+
+    def remove_listener(self, listener: Callable[[dict], None]) -> None:
+        """
+        Stop calling a listener added with :meth:`add_listener`.
+
+        Parameters:
+            listener (Callable[[dict], None]):
+                The listener.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            if listener in self.__listeners:
+                self.__listeners.remove(listener)
+
+    def set_layer(self, name: str, values: Mapping[str, str]) -> bool:
+        """
+        Replace the values of a layer. The merged view is only invalidated if the values actually differ.
+
+        Parameters:
+            name (str):
+                One of :data:`LAYERS`.
+
+            values (Mapping[str, str]):
+                The new raw values, keyed by configuration key.
+
+        Returns:
+            bool:
+                True if the layer changed, False otherwise.
+        """
+        self._check_layer(name)
+        values = dict(values)
+
+        with self.__lock:
+            if values == self.__layers[name]:
+                return False
+
+            self.__layers[name] = values
+            self._invalidate()
+
+        return True
+
+    def source_of(self, key: str) -> Optional[str]:
+        """
+        Get the layer a value in the merged view comes from.
+
+        Parameters:
+            key (str):
+                The configuration key.
+
+        Returns:
+            str:
+                The layer name, or None if no layer has the key.
+        """
+        layers = self.__layers
+
+        for name in reversed(LAYERS):
+            if key in layers[name]:
+                return name
+
+        return None
+
+    def update_layer(self, name: str, values: Mapping[str, str]) -> bool:
+        """
+        Update some of the values of a layer, keeping the rest.
+
+        Parameters:
+            name (str):
+                One of :data:`LAYERS`.
+
+            values (Mapping[str, str]):
+                The raw values to set, keyed by configuration key. A value of None removes the key from the layer.
+
+        Returns:
+            bool:
+                True if the layer changed, False otherwise.
+        """
+        self._check_layer(name)
+
+        with self.__lock:
+            layer = self.__layers[name]
+
+            unchanged = all(
+                    key not in layer if value is None else layer.get(key) == value
+                    for key, value in values.items()
+                    )
+
+            if unchanged:
+                return False
+
+            layer = {**layer, **values}
+
+            for key, value in values.items():
+                if value is None:
+                    del layer[key]
+
+            self.__layers[name] = layer
+            self._invalidate()
+
+        return True
+
+    def _build(self) -> dict:
+        with self.__lock:
+            if self.__view is not None:
+                return self.__view
+
+            spec = self.__spec.spec or {}
+            merged = {}
+
+            for name in LAYERS:
+                for key, value in self.__layers[name].items():
+                    merged[key] = (value, name)
+
+            view = {
+                    key: self._convert(key, value, spec.get(key, {}).get('type'), name)
+                    for key, (value, name) in merged.items()
+                    }
+
+            self.__view = view
+            self.__builds += 1
+
+            return view
+
+    def _invalidate(self) -> None:
+        old = self.__view
+        self.__view = None
+
+        if not self.__listeners:
+            return
+
+        # Listeners keep the view built, so `old` is the view every listener last saw.
+        changes = diff(old or {}, self._build())
+
+        if changes:
+            for listener in list(self.__listeners):
+                listener(changes)
+
+    def _check_layer(self, name: str) -> None:
+        if name not in LAYERS:
+            raise ValueError(f"Invalid layer: '{name}'. Valid layers: {list(LAYERS)}")
+
+    def _convert(self, key: str, value, type_name: Optional[str], source: str):
+        if not isinstance(value, str):
+            # Programmatic overrides may already be typed.
+            return value
+
+        if value == '':
+            return None
+
+        if type_name not in TYPE_MAPPING:
+            return value
+
+        try:
+            return convert_str_to_type(value, type_name)
+        except (TypeError, ValueError):
+            warn(f"Could not convert '{key}' ({source} layer) to {type_name}: {value!r}. Using the raw value.")
+
+            return value
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __repr__(self):
+        return f'<LayeredConfig: {self.__config_system} | {len(self.values)} keys | @{hex(id(self))}>'
+
+
+__all__ = [
+        'ENV_PREFIX',
+        'LAYERS',
+        'LayeredConfig',
+        'environment_variable',
+        ]
@@ -0,0 +1,240 @@
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+def approximate_size(instance) -> int:
+    """
+    Estimate the memory held by a configuration factory: the object, its attribute dict and the keys and values of its
+    parsed configuration.
+
+    Parameters:
+        instance (ConfigFactory):
+            The factory.
+
+    Returns:
+        int:
+            The estimate, in bytes.
+    """
+    size = sys.getsizeof(instance) + sys.getsizeof(vars(instance))
+    parser = vars(instance).get('_ConfigFactory__config')
+
+    if parser is None:
+        return size
+
+    defaults = parser.defaults()
+    size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in defaults.items())
+
+    for section in parser.sections():
+        for key, value in parser.items(section, raw=True):
+            # Every section also lists the DEFAULT values, which were already counted above.
+            if defaults.get(key) is not value:
+                size += sys.getsizeof(key) + sys.getsizeof(value)
+
+    return size
+
+
+class InstanceRegistry:
+    """
+    Index configuration factories by system name, object id and config file path.
+
+    Entries are weak references, so a factory that nothing else refers to can be garbage-collected; its entries
+    disappear with it. Factories registered as persistent are additionally held by a strong reference (the historical
+    singleton behaviour) until they are released.
+    """
+
+    def __init__(self):
+        self.__by_system = weakref.WeakValueDictionary()
+        self.__by_id = weakref.WeakValueDictionary()
+        self.__by_path = weakref.WeakValueDictionary()
+        self.__systems: Dict[int, str] = {}
+        self.__paths: Dict[int, Path] = {}
+        self.__pinned = {}
+        self.__created = 0
+        self.__collected = 0
+        self.__lock = threading.RLock()
+
+    @property
+    def by_system(self) -> weakref.WeakValueDictionary:
+        """
+        Get the live factories, keyed by system name.
+
+        Returns:
+            weakref.WeakValueDictionary:
+                The factories.
+        """
+        return self.__by_system
+
+    def _forget(self, instance_id: int, system: str) -> None:
+        with self.__lock:
+            self.__collected += 1
+            self.__systems.pop(instance_id, None)
+            self.__paths.pop(instance_id, None)
+
+    def get(self, system: str):
+        """
+        Get the live factory of a configuration system.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            ConfigFactory:
+                The factory, or None if there is none.
+        """
+        return self.__by_system.get(system.lower())
+
+    def by_id(self, instance_id: int):
+        """
+        Get a live factory by its object id.
+
+        Parameters:
+            instance_id (int):
+                The `id()` of the factory.
+
+        Returns:
+            ConfigFactory:
+                The factory, or None if there is none.
+        """
+        return self.__by_id.get(instance_id)
+
+    def by_path(self, file_path: Union[str, Path]):
+        """
+        Get the live factory that reads a config file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The config file path.
+
+        Returns:
+            ConfigFactory:
+                The factory, or None if there is none.
+        """
+        return self.__by_path.get(Path(file_path).expanduser().resolve().absolute())
+
+    def index_path(self, instance, file_path: Optional[Union[str, Path]]) -> None:
+        """
+        Record (or update) the config file path of a registered factory.
+
+        Parameters:
+            instance (ConfigFactory):
+                The factory.
+
+            file_path (Union[str, Path]):
+                Its config file path, or None to remove it from the path index.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            old = self.__paths.pop(id(instance), None)
+
+            if old is not None and self.__by_path.get(old) is instance:
+                del self.__by_path[old]
+
+            if file_path is None:
+                return
+
+            file_path = Path(file_path).expanduser().resolve().absolute()
+            self.__paths[id(instance)] = file_path
+            self.__by_path[file_path] = instance
+
+    def pin(self, instance) -> None:
+        """
+        Hold a strong reference to a registered factory, so it lives until released.
+
+        Parameters:
+            instance (ConfigFactory):
+                The factory.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__pinned[self.__systems[id(instance)]] = instance
+
+    def register(self, system: str, instance, persistent: Optional[bool] = True) -> None:
+        """
+        Register a new factory.
+
+        Parameters:
+            system (str):
+                The system name.
+
+            instance (ConfigFactory):
+                The factory.
+
+            persistent (bool):
+                If True, the registry keeps the factory alive until :meth:`release` is called.
+
+        Returns:
+            None
+        """
+        system = system.lower()
+
+        with self.__lock:
+            self.__by_system[system] = instance
+            self.__by_id[id(instance)] = instance
+            self.__systems[id(instance)] = system
+            self.__created += 1
+            weakref.finalize(instance, self._forget, id(instance), system)
+
+            if persistent:
+                self.__pinned[system] = instance
+
+    def release(self, system: str) -> None:
+        """
+        Drop the strong reference to a persistent factory, so it can be collected once nothing else refers to it.
+
+        Parameters:
+            system (str):
+                The system name.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__pinned.pop(system.lower(), None)
+
+    def stats(self) -> dict:
+        """
+        Get the live, pinned, created and collected factory counts, and an estimate of the memory held by the live
+        factories.
+
+        Returns:
+            dict:
+                The metrics.
+        """
+        with self.__lock:
+            live = list(self.__by_id.values())
+
+            return {
+                    'live':              len(live),
+                    'pinned':            len(self.__pinned),
+                    'created':           self.__created,
+                    'collected':         self.__collected,
+                    'approximate_bytes': sum(approximate_size(instance) for instance in live),
+                    }
+
+    def system_of(self, instance_id: int) -> Optional[str]:
+        """
+        Get the system name of a live factory by its object id.
+
+        Parameters:
+            instance_id (int):
+                The `id()` of the factory.
+
+        Returns:
+            str:
+                The system name, or None if there is no such factory.
+        """
+        return self.__systems.get(instance_id)
+
+    def __contains__(self, system):
+        return system.lower() in self.__by_system
+
+    def __len__(self):
+        return len(self.__by_id)
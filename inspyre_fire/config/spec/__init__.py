@@ -1,9 +1,29 @@
 import json
+import sys
 from dataclasses import dataclass, asdict
 from pathlib import Path
+from inspyre_fire.instrumentation import timed
 
 
 
+def intern_key(option: str) -> str:
+    """
+    Normalize an option name the way `configparser` does (lower-case), and intern it, so every parser and
+    specification holding the key shares one string.
+
+    Can be used as the `optionxform` of a `configparser.ConfigParser`.
+
+    Parameters:
+        option (str):
+            The option name.
+
+    Returns:
+        str:
+            The interned, lower-cased name.
+    """
+    return sys.intern(option.lower())
+
+
 def get_file_dir():
     return Path(__file__).parent
 
@@ -117,6 +137,7 @@ class ConfigSpec:
 
         return self.__spec
 
+    @timed('config.spec.load')
     def _load_spec_from_file(self) -> dict:
         """
         Load the JSON file containing the configuration specification.
@@ -126,7 +147,7 @@ class ConfigSpec:
         """
 
         with open(self.file_path, 'r') as f:
-            return json.load(f)
+            return {intern_key(key): entry for key, entry in json.load(f).items()}
 
     def _extract_defaults(self) -> dict:
         """
@@ -173,5 +194,6 @@ if not are_specs_loaded():
 __all__ = [
         'ConfigSpec',
         'CONFIG_SPECS',
+        'intern_key',
 
         ]
@@ -0,0 +1,384 @@
+"""
+Key-level change notifications for configuration factories.
+
+A :class:`ChangeDispatcher` receives diffs of a factory's merged configuration (`{key: (old, new)}`) and hands them to
+the subscribers of the changed keys on a dedicated thread, so the code that changed the configuration never waits for
+them. Diffs published while a dispatch is pending are coalesced: each subscriber sees a key once, with the value it
+had before the first change and after the last one, and keys that changed back to their original value are dropped.
+"""
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from warnings import warn
+
+
+Changes = Dict[str, Tuple[object, object]]
+"""A configuration diff: `(old, new)` value pairs, keyed by configuration key."""
+
+_MISSING = object()
+
+
+def diff(old: dict, new: dict) -> Changes:
+    """
+    Compute the key-level diff between two configuration views.
+
+    Parameters:
+        old (dict):
+            The previous values.
+
+        new (dict):
+            The current values.
+
+    Returns:
+        Changes:
+            An `(old, new)` pair for every key whose value differs; a key missing from a view has the value None.
+    """
+    changes = {}
+
+    for key in old.keys() | new.keys():
+        before = old.get(key, _MISSING)
+        after = new.get(key, _MISSING)
+
+        if before != after:
+            changes[key] = (None if before is _MISSING else before, None if after is _MISSING else after)
+
+    return changes
+
+
+def merge(pending: Changes, changes: Changes) -> Changes:
+    """
+    Coalesce a diff into a pending one, in place: each key keeps its oldest old value and its newest new value, and
+    keys that changed back to their original value are dropped.
+
+    Parameters:
+        pending (Changes):
+            The pending diff; updated in place.
+
+        changes (Changes):
+            The newer diff.
+
+    Returns:
+        Changes:
+            The pending diff.
+    """
+    for key, (old, new) in changes.items():
+        if key in pending:
+            old = pending[key][0]
+
+        if old == new:
+            pending.pop(key, None)
+        else:
+            pending[key] = (old, new)
+
+    return pending
+
+
+class ChangeStream:
+    """
+    An async iterator over configuration diffs, for use on an event loop.
+
+    Each iteration yields everything that changed since the previous one, coalesced; it waits if nothing has. The
+    stream ends when it is closed.
+
+        async with factory.changes('log_level') as changes:
+            async for diff in changes:
+                ...
+    """
+
+    def __init__(self, dispatcher, keys: Optional[Iterable[str]] = None):
+        """
+        Initialize a ChangeStream object. Must be called with an event loop running.
+
+        Parameters:
+            dispatcher (ChangeDispatcher):
+                The dispatcher to subscribe to.
+
+            keys (Iterable[str]):
+                The keys to watch, or None to watch every key.
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__pending: Changes = {}
+        self.__ready = asyncio.Event()
+        self.__closed = False
+        self.__subscription = dispatcher.subscribe(keys, self._receive)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the stream has been closed."""
+        return self.__closed
+
+    def close(self) -> None:
+        """
+        Stop watching. Changes already received can still be consumed; then the iteration ends.
+
+        Returns:
+            None
+        """
+        self.__closed = True
+        self.__subscription.cancel()
+        self.__ready.set()
+
+    async def aclose(self) -> None:
+        """
+        Stop watching (the coroutine form of :meth:`close`).
+
+        Returns:
+            None
+        """
+        self.close()
+
+    def _merge(self, changes: Changes) -> None:
+        merge(self.__pending, changes)
+
+        if self.__pending:
+            self.__ready.set()
+
+    def _receive(self, changes: Changes) -> None:
+        # Runs on the dispatch thread; hand the diff over to the loop.
+        try:
+            self.__loop.call_soon_threadsafe(self._merge, changes)
+        except RuntimeError:
+            # The loop is closed; nobody is listening any more.
+            self.__subscription.cancel()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Changes:
+        while not self.__pending:
+            if self.__closed:
+                raise StopAsyncIteration
+
+            self.__ready.clear()
+            await self.__ready.wait()
+
+        changes, self.__pending = self.__pending, {}
+
+        return changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Subscription:
+    """
+    A callback registered for changes to some (or all) configuration keys.
+    """
+    __slots__ = ('keys', 'callback', '_dispatcher', '__weakref__')
+
+    def __init__(self, keys: Optional[frozenset], callback: Callable[[Changes], None], dispatcher):
+        self.keys = keys
+        self.callback = callback
+        self._dispatcher = dispatcher
+
+    @property
+    def active(self) -> bool:
+        """Whether the subscription still receives changes."""
+        return self._dispatcher is not None
+
+    def cancel(self) -> None:
+        """
+        Stop receiving changes.
+
+        Returns:
+            None
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.unsubscribe(self)
+
+    def select(self, changes: Changes) -> Changes:
+        if self.keys is None:
+            return changes
+
+        return {key: change for key, change in changes.items() if key in self.keys}
+
+    def __repr__(self):
+        keys = 'all keys' if self.keys is None else sorted(self.keys)
+
+        return f'<Subscription: {keys} -> {getattr(self.callback, "__qualname__", self.callback)!r}>'
+
+
+class ChangeDispatcher:
+    """
+    Coalesce configuration diffs and deliver them to subscribers on a background thread.
+    """
+
+    def __init__(self, name: Optional[str] = 'config'):
+        """
+        Initialize a ChangeDispatcher object.
+
+        Parameters:
+            name (str):
+                A name for the dispatch thread.
+        """
+        self.__name = name
+        self.__subscriptions: List[Subscription] = []
+        self.__pending: Changes = {}
+        self.__dispatching = False
+        self.__condition = threading.Condition()
+        self.__thread: Optional[threading.Thread] = None
+        self.__dispatched = 0
+        self.__published = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        Get the number of diffs published, the number of batches dispatched and the number of subscriptions.
+
+        Returns:
+            dict:
+                The counts.
+        """
+        with self.__condition:
+            return {
+                    'published':     self.__published,
+                    'dispatched':    self.__dispatched,
+                    'subscriptions': len(self.__subscriptions),
+                    }
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        """
+        Get the active subscriptions.
+
+        Returns:
+            List[Subscription]:
+                A copy of the subscription list.
+        """
+        with self.__condition:
+            return list(self.__subscriptions)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every published diff has been delivered.
+
+        Parameters:
+            timeout (float):
+                The maximum time to wait (in seconds). If None, wait indefinitely.
+
+        Returns:
+            bool:
+                True if everything was delivered, False if the timeout expired first.
+        """
+        if threading.current_thread() is self.__thread:
+            # Called from a callback; waiting would deadlock.
+            return not self.__pending
+
+        with self.__condition:
+            return self.__condition.wait_for(lambda: not self.__pending and not self.__dispatching, timeout)
+
+    def publish(self, changes: Changes) -> None:
+        """
+        Queue a diff for delivery. Returns immediately.
+
+        Parameters:
+            changes (Changes):
+                The diff.
+
+        Returns:
+            None
+        """
+        if not changes:
+            return
+
+        with self.__condition:
+            if not self.__subscriptions:
+                return
+
+            merge(self.__pending, changes)
+            self.__published += 1
+            self._ensure_thread()
+            self.__condition.notify_all()
+
+    def subscribe(
+            self,
+            keys: Optional[Iterable[str]],
+            callback: Callable[[Changes], None],
+            ) -> Subscription:
+        """
+        Register a callback for changes to some configuration keys.
+
+        Parameters:
+            keys (Iterable[str]):
+                The keys to watch, or None to watch every key. A single key may be passed as a string.
+
+            callback (Callable[[Changes], None]):
+                Called on the dispatch thread with the `(old, new)` values of the watched keys that changed.
+
+        Returns:
+            Subscription:
+                The subscription; call :meth:`Subscription.cancel` to stop receiving changes.
+        """
+        if not callable(callback):
+            raise TypeError(f'The callback must be callable, not {type(callback).__name__}.')
+
+        if isinstance(keys, str):
+            keys = (keys,)
+
+        subscription = Subscription(None if keys is None else frozenset(key.lower() for key in keys), callback, self)
+
+        with self.__condition:
+            self.__subscriptions.append(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a subscription.
+
+        Parameters:
+            subscription (Subscription):
+                The subscription.
+
+        Returns:
+            None
+        """
+        with self.__condition:
+            if subscription in self.__subscriptions:
+                self.__subscriptions.remove(subscription)
+
+            subscription._dispatcher = None
+
+    def _ensure_thread(self) -> None:
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = threading.Thread(target=self._run, name=f'{self.__name}-changes', daemon=True)
+            self.__thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self.__condition:
+                self.__dispatching = False
+                self.__condition.notify_all()
+                self.__condition.wait_for(lambda: self.__pending)
+
+                changes, self.__pending = self.__pending, {}
+                subscriptions = list(self.__subscriptions)
+                self.__dispatching = True
+                self.__dispatched += 1
+
+            for subscription in subscriptions:
+                selected = subscription.select(changes)
+
+                if not selected or not subscription.active:
+                    continue
+
+                try:
+                    subscription.callback(selected)
+                except Exception as e:
+                    warn(f'Configuration change callback {subscription!r} raised {e!r}.')
+
+    def __repr__(self):
+        return f'<ChangeDispatcher: {self.__name} | {len(self.__subscriptions)} subscriptions | @{hex(id(self))}>'
+
+
+__all__ = [
+        'ChangeDispatcher',
+        'ChangeStream',
+        'Changes',
+        'Subscription',
+        'diff',
+        'merge',
+        ]
@@ -1,10 +1,10 @@
 import os
-import threading
+import sys
 import time
 from pathlib import Path
 from typing import Union
-import keyboard
 from inspyre_toolbox.path_man import provision_path
+from inspyre_fire.instrumentation import count, timed
 import re
 
 
@@ -78,80 +78,48 @@ def has_changed(file_path, last_modified_time):
         return False
 
 
+@timed('config.watch')
 def wait_for_changes(config_factory, interval=1):
     """
-    Waits for changes to the file at the given path or until the user presses Enter.
+    Opens the configuration file in the user's editor and waits until it is saved with changes, the editor exits, or
+    (if the editor does not run in this terminal) the user presses Enter.
 
     Args:
         config_factory (ConfigFactory):
             The ConfigFactory object that contains the file path to monitor.
 
         interval (Union[int, float]):
-            The interval in seconds to check for changes.
+            The interval in seconds to check for changes, where they cannot be watched for.
 
     Returns:
         bool: True if the file was modified, False if the user pressed Enter without modification.
     """
+    from inspyre_fire.config.utils.editor import launch_editor
+    from inspyre_fire.config.utils.watch import EDIT_MODIFIED, wait_for_edit
+
     cf = config_factory
     file_path = cf.config_file_path
     if isinstance(file_path, str):
         file_path = Path(file_path).expanduser().resolve().absolute()
 
-    interval = float(interval)
-
-    try:
-        last_modified_time = os.path.getmtime(file_path)
-    except FileNotFoundError:
+    if not file_path.exists():
         print(f"File not found: {file_path}")
         return False
 
-    fp_str = str(file_path)
-
-    # Open the file in the default editor
-    os.startfile(fp_str)
-
-    modification_detected = threading.Event()
-    enter_pressed = threading.Event()
-
-    def check_modifications():
-        nonlocal last_modified_time
-        while not modification_detected.is_set() and not enter_pressed.is_set():
-            if enter_pressed.is_set():
-                break
-            try:
-                current_modified_time = os.path.getmtime(file_path)
-            except FileNotFoundError:
-                print(f"File not found: {file_path}")
-                return
-            if current_modified_time != last_modified_time:
-                print(f"File has been modified at: {time.ctime(current_modified_time)}")
-                config_factory._ConfigFactory__file_modified = True
-                modification_detected.set()
-            else:
-                time.sleep(interval)
-                print("No changes detected, continuing to monitor...")
-
-    def on_press(event):
-        if keyboard.is_pressed('enter') and keyboard.is_pressed('esc'):
-            print("Enter and ESC keys pressed.")
-            enter_pressed.set()
-            keyboard.unhook_all()  # Unhook all the keyboard hooks
-            return False  # Stop the listener
-
-    checker_thread = threading.Thread(target=check_modifications)
-    checker_thread.start()
-
-    keyboard.on_press(on_press)
-
-    # Join the threads but only if neither event is set yet
-    while not modification_detected.is_set() and not enter_pressed.is_set():
-        time.sleep(0.1)
-
-    # Ensure the checker thread is joined before exiting
-    checker_thread.join()
+    process = launch_editor(file_path)
 
-    print("Exiting wait_for_changes...")
+    if process is None:
+        print("Waiting for changes; press Enter to stop waiting...")
+
+    # A terminal editor reads the keyboard itself; its exit ends the wait instead.
+    stdin = sys.stdin if process is None else None
 
+    if wait_for_edit(file_path, process=process, stdin=stdin, interval=float(interval)) == EDIT_MODIFIED:
+        print(f"File has been modified at: {time.ctime(os.path.getmtime(file_path))}")
+        config_factory._ConfigFactory__file_modified = True
+        count('config.watch.changes')
+
+    print("Exiting wait_for_changes...")
 
     return config_factory._ConfigFactory__file_modified
 
@@ -181,12 +149,14 @@ def search_file_for_user_line(file_path):
         str: The line containing the user's name.
     """
     from warnings import warn
+    from inspyre_fire.config.ini import get_ini_file
+
     try:
-        with open(file_path, 'r') as file:
-            for line in file:
-                if '[USER]' in line:
-                    return line.strip()
-        return None
+        if not Path(file_path).exists():
+            raise FileNotFoundError(file_path)
+
+        # The section index is cached per file and only rebuilt when the file changes.
+        return '[USER]' if get_ini_file(file_path).has_section('USER') else None
     except FileNotFoundError:
         warn(f'File not found: {file_path}')
     except Exception as e:
@@ -0,0 +1,106 @@
+"""
+Open configuration files and directories in the user's editor, on any platform.
+
+The editor is chosen the way command-line tools conventionally do: `$VISUAL`, then `$EDITOR`, then the desktop's
+opener (`xdg-open` on Linux and the BSDs, `open` on macOS, Notepad or Explorer on Windows). Editors started from
+`$VISUAL`/`$EDITOR`, `open -W` and Notepad run until the user is done, so their process is tracked; desktop openers
+hand the file to another program and exit at once, so only saves can tell that the user is done.
+"""
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+from inspyre_fire.config.errors import ConfigEditorNotFoundError
+
+
+EDITOR_VARIABLES = ('VISUAL', 'EDITOR')
+
+
+def _opener(directory: bool) -> Tuple[List[str], bool]:
+    if sys.platform == 'darwin':
+        # `-W` waits until the editor quits; `-t` picks the default text editor.
+        return (['open'], False) if directory else (['open', '-W', '-t'], True)
+
+    if os.name == 'nt':
+        return (['explorer'], False) if directory else (['notepad'], True)
+
+    return ['xdg-open'], False
+
+
+def editor_command(path: Union[str, Path], directory: Optional[bool] = False) -> Tuple[List[str], bool]:
+    """
+    Get the command that opens a file (or directory) for the user.
+
+    Parameters:
+        path (Union[str, Path]):
+            The file or directory.
+
+        directory (bool):
+            If True, open the path in a file manager rather than an editor.
+
+    Returns:
+        Tuple[List[str], bool]:
+            The command, and whether it runs until the user is done editing.
+
+    Raises:
+        ConfigEditorNotFoundError:
+            If the program the command needs is not installed.
+    """
+    command, waits = None, False
+
+    if not directory:
+        for variable in EDITOR_VARIABLES:
+            if os.environ.get(variable, '').strip():
+                command, waits = shlex.split(os.environ[variable], posix=os.name != 'nt'), True
+                break
+
+    if command is None:
+        command, waits = _opener(directory)
+
+    if shutil.which(command[0]) is None:
+        raise ConfigEditorNotFoundError(shlex.join(command))
+
+    return [*command, str(path)], waits
+
+
+def launch_editor(path: Union[str, Path], directory: Optional[bool] = False) -> Optional[subprocess.Popen]:
+    """
+    Open a file (or directory) for the user, without waiting.
+
+    Parameters:
+        path (Union[str, Path]):
+            The file or directory.
+
+        directory (bool):
+            If True, open the path in a file manager rather than an editor.
+
+    Returns:
+        Optional[subprocess.Popen]:
+            The editor process if it runs until the user is done editing; None if the file was handed to a desktop
+            opener.
+    """
+    command, waits = editor_command(path, directory)
+
+    if waits:
+        # Terminal editors need our terminal.
+        return subprocess.Popen(command)
+
+    subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            )
+
+    return None
+
+
+__all__ = [
+        'EDITOR_VARIABLES',
+        'editor_command',
+        'launch_editor',
+        ]
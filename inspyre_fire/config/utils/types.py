@@ -44,6 +44,9 @@ def bool_lookup(value):
         bool:
             The boolean value that corresponds to the given value.
     """
+    if isinstance(value, str):
+        value = value.strip().lower()
+
     return BOOLEAN_VALUES.get(value)
 
 
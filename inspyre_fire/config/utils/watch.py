@@ -0,0 +1,267 @@
+"""
+Wait for a configuration file to be edited, without threads or keyboard hooks.
+
+:func:`wait_for_edit` runs one `selectors` loop over every event that can end the wait: a save of the file, the exit
+of the editor process and a line on stdin (pressing Enter cancels). Where the platform can deliver those as file
+descriptors (inotify and pidfd on Linux) the loop sleeps in the kernel until one of them fires; anything it cannot
+watch that way is polled once per interval instead.
+"""
+import ctypes
+import ctypes.util
+import os
+import selectors
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+
+EDIT_CANCELLED = 'cancelled'
+EDIT_EXITED = 'exited'
+EDIT_MODIFIED = 'modified'
+EDIT_TIMEOUT = 'timeout'
+
+# From <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatch:
+    """
+    An inotify watch on the directory of a file, reporting when the file is saved.
+
+    Editors save either by rewriting the file or by renaming a new file over it, so the directory is watched for both
+    (`IN_CLOSE_WRITE` and `IN_MOVED_TO`) and events for other files are ignored.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        Initialize an InotifyWatch object.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The file to watch.
+
+        Raises:
+            OSError:
+                If inotify is not available, or the watch cannot be added.
+        """
+        libc = _libc()
+
+        if libc is None or not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this platform.')
+
+        self.__name = os.fsencode(Path(file_path).name)
+        self.__fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        directory = os.fsencode(str(Path(file_path).parent))
+
+        if libc.inotify_add_watch(self.__fd, directory, IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.__fd)
+
+            raise OSError(errno, 'inotify_add_watch failed', directory)
+
+    def close(self) -> None:
+        """
+        Remove the watch.
+
+        Returns:
+            None
+        """
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def fileno(self) -> int:
+        return self.__fd
+
+    def saved(self) -> bool:
+        """
+        Drain the pending events.
+
+        Returns:
+            bool:
+                True if any of them was a save of the watched file, False otherwise.
+        """
+        saved = False
+
+        while True:
+            try:
+                data = os.read(self.__fd, 4096)
+            except BlockingIOError:
+                return saved
+
+            offset = 0
+
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if name == self.__name:
+                    saved = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        return ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+
+
+def _open_process(process) -> Optional[int]:
+    if process is None or not hasattr(os, 'pidfd_open'):
+        return None
+
+    try:
+        return os.pidfd_open(process.pid)
+    except OSError:
+        # Already reaped, or the kernel is too old.
+        return None
+
+
+def _signature(file_path: Path):
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stdin_selectable(stdin) -> bool:
+    if stdin is None or os.name == 'nt':
+        return False
+
+    try:
+        stdin.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+    return True
+
+
+def wait_for_edit(
+        file_path: Union[str, Path],
+        process=None,
+        stdin=sys.stdin,
+        interval: Optional[float] = 1.0,
+        timeout: Optional[float] = None,
+        ) -> str:
+    """
+    Wait until a file is saved with new contents, the editor exits, or the user presses Enter.
+
+    Parameters:
+        file_path (Union[str, Path]):
+            The file being edited.
+
+        process (subprocess.Popen):
+            The editor process, if it is known.
+
+        stdin (TextIO):
+            Where to read the cancelling Enter from; None to not listen for it.
+
+        interval (float):
+            How often to check what cannot be watched through a file descriptor (in seconds).
+
+        timeout (float):
+            The longest to wait (in seconds). If None, wait indefinitely.
+
+    Returns:
+        str:
+            :data:`EDIT_MODIFIED`, :data:`EDIT_EXITED` (the editor exited without a change), :data:`EDIT_CANCELLED` or
+            :data:`EDIT_TIMEOUT`.
+    """
+    file_path = Path(file_path)
+    original = _signature(file_path)
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    try:
+        watch = InotifyWatch(file_path)
+    except OSError:
+        watch = None
+
+    process_fd = _open_process(process)
+    selector = selectors.DefaultSelector()
+
+    try:
+        if watch is not None:
+            selector.register(watch, selectors.EVENT_READ, EDIT_MODIFIED)
+
+        if process_fd is not None:
+            selector.register(process_fd, selectors.EVENT_READ, EDIT_EXITED)
+
+        if _stdin_selectable(stdin):
+            selector.register(stdin, selectors.EVENT_READ, EDIT_CANCELLED)
+
+        # Block until an event fires if everything is watched; otherwise wake up to poll what is not.
+        polling = watch is None or (process is not None and process_fd is None)
+
+        while True:
+            wait = interval if polling else None
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    return EDIT_TIMEOUT
+
+                wait = remaining if wait is None else min(wait, remaining)
+
+            if selector.get_map():
+                ready = [key.data for key, _ in selector.select(wait)]
+            else:
+                # Nothing to select on (e.g. Windows without a console); just poll.
+                time.sleep(wait)
+                ready = []
+
+            if EDIT_CANCELLED in ready:
+                if stdin.readline():
+                    return EDIT_CANCELLED
+
+                # End of input; there is nobody left to press Enter.
+                selector.unregister(stdin)
+
+            if (watch is None or EDIT_MODIFIED in ready and watch.saved()) and _signature(file_path) != original:
+                return EDIT_MODIFIED
+
+            if process is not None and (EDIT_EXITED in ready or process_fd is None) and process.poll() is not None:
+                # A last save may have landed together with the exit.
+                return EDIT_MODIFIED if _signature(file_path) != original else EDIT_EXITED
+    finally:
+        selector.close()
+
+        if watch is not None:
+            watch.close()
+
+        if process_fd is not None:
+            os.close(process_fd)
+
+
+__all__ = [
+        'EDIT_CANCELLED',
+        'EDIT_EXITED',
+        'EDIT_MODIFIED',
+        'EDIT_TIMEOUT',
+        'InotifyWatch',
+        'wait_for_edit',
+        ]
@@ -1,9 +1,745 @@
-import os
+import shlex
+import time
+import weakref
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
 from adb_shell.adb_device import AdbDeviceTcp
-from adb_shell.auth.sign_pythonrsa import PythonRSASigner
-from adb_shell.auth.keygen import keygen
+from inspyre_fire.controller.auth import HandshakeTiming, KeyManager
+from inspyre_fire.controller.batch import ShellBatch
+from inspyre_fire.controller.errors import DeviceConnectionError, DeviceNotConnectedError
+from inspyre_fire.controller.keys import DEFAULT_HOLD_DURATION, KeyInputSession
+from inspyre_fire.controller.logcat import DEFAULT_BUFFER_SIZE, LogcatStream, build_logcat_command
+from inspyre_fire.controller.macros import MacroRecorder
+from inspyre_fire.controller.parsers import PackageInfo, iter_lines, parse_dumpsys_packages
+from inspyre_fire.controller.scheduler import CommandScheduler
+from inspyre_fire.controller.screen import ScreenCapture
+from inspyre_fire.controller.state import DeviceStateCache
+from inspyre_fire.controller.transfer import TransferManager, TransferStats
+from inspyre_fire.instrumentation import timed
+
+
+DEFAULT_PORT = 5555
+DEFAULT_TRANSPORT_TIMEOUT = 9.0
+DEFAULT_AUTH_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 10.0
+
+
+def get_core_config():
+    """
+    Get the core configuration system.
+
+    Imported lazily so that importing the controller does not force the configuration files to be loaded.
+
+    Returns:
+        ConfigFactory:
+            The core configuration system.
+    """
+    from inspyre_fire.config import ConfigFactory
+
+    return ConfigFactory('core', auto_load=True)
 
 
 class Controller:
-    def __init__(self):
-        pass
+    """
+    Control a single Fire TV device over ADB.
+
+    Any connection detail that is not passed in is read from the core configuration system
+    (`fire_tv_host`, `fire_tv_port` and `fire_tv_adbkey`).
+    """
+
+    def __init__(
+            self,
+            host: Optional[str] = None,
+            port: Optional[int] = None,
+            adbkey: Optional[Union[str, Path]] = None,
+            name: Optional[str] = None,
+            transport_timeout: Optional[float] = DEFAULT_TRANSPORT_TIMEOUT,
+            auth_timeout: Optional[float] = DEFAULT_AUTH_TIMEOUT,
+            auto_connect: Optional[bool] = False,
+            device=None,
+            device_factory: Optional[Callable[[], object]] = None,
+            ):
+        """
+        Initialize a Controller object.
+
+        Parameters:
+            host (str):
+                The IP address (or host name) of the Fire TV device. Defaults to `fire_tv_host` from the core config.
+
+            port (int):
+                The ADB port of the device. Defaults to `fire_tv_port` from the core config.
+
+            adbkey (Union[str, Path]):
+                The path to the private ADB key. Defaults to `fire_tv_adbkey` from the core config.
+
+            name (str):
+                A friendly name for the device. Defaults to `host:port`.
+
+            transport_timeout (float):
+                The timeout (in seconds) for the underlying TCP transport.
+
+            auth_timeout (float):
+                The timeout (in seconds) for the ADB authentication handshake.
+
+            auto_connect (bool):
+                If True, connect to the device immediately.
+
+            device:
+                An already-constructed ADB device exposing the `AdbDeviceTcp` interface. Mostly useful for local
+                stand-ins; when provided, `host` and `port` are only used for naming.
+
+            device_factory (Callable[[], object]):
+                Builds a new, unconnected ADB device object. Used for the controller's own connection if `device` is
+                not given, and for the separate connections opened by :meth:`open_connection`. Defaults to an
+                `AdbDeviceTcp` for `host` and `port`.
+        """
+        if host is None or port is None or adbkey is None:
+            core = get_core_config()
+            host = host if host is not None else getattr(core, 'fire_tv_host', None)
+            port = port if port is not None else getattr(core, 'fire_tv_port', None)
+            adbkey = adbkey if adbkey is not None else getattr(core, 'fire_tv_adbkey', None)
+
+        self.__host = host
+        self.__port = int(port or DEFAULT_PORT)
+        self.__adbkey = Path(adbkey).expanduser().resolve().absolute() if adbkey else None
+        self.__name = name or f'{self.__host}:{self.__port}'
+        self.__transport_timeout = transport_timeout
+        self.__auth_timeout = auth_timeout
+        self.__device = device
+        self.__device_factory = device_factory
+        self.__connected = False
+        self.__key_session = None
+        self.__last_handshake = None
+        self.__scheduler = None
+        self.__screen = None
+        self.__transfers = None
+        self.__state = None
+        self.__streams = weakref.WeakSet()
+
+        if auto_connect:
+            self.connect()
+
+    @property
+    def adbkey(self) -> Optional[Path]:
+        """
+        Get the path to the private ADB key.
+
+        Returns:
+            Path:
+                The path to the private ADB key, or None if one was not configured.
+        """
+        return self.__adbkey
+
+    @property
+    def connected(self) -> bool:
+        """
+        Check if the controller is connected to the device.
+
+        Returns:
+            bool:
+                True if the controller is connected, False otherwise.
+        """
+        return self.__connected and self.__device is not None and self.__device.available
+
+    @property
+    def device(self):
+        """
+        Get the underlying ADB device object.
+
+        Returns:
+            AdbDeviceTcp:
+                The ADB device, or None if it has not been created yet.
+        """
+        return self.__device
+
+    @property
+    def host(self) -> Optional[str]:
+        """
+        Get the host of the device.
+
+        Returns:
+            str:
+                The host of the device.
+        """
+        return self.__host
+
+    @property
+    def keys(self) -> KeyInputSession:
+        """
+        Get the key input session, starting one with the default backend on first access.
+
+        Returns:
+            KeyInputSession:
+                The key input session.
+        """
+        if self.__key_session is None:
+            self.__key_session = KeyInputSession(self)
+
+        return self.__key_session
+
+    @property
+    def key_manager(self) -> Optional[KeyManager]:
+        """
+        Get the process-wide key manager for the configured ADB key.
+
+        Returns:
+            KeyManager:
+                The key manager, or None if no key was configured.
+        """
+        if not self.__adbkey:
+            return None
+
+        return KeyManager(self.__adbkey)
+
+    @property
+    def last_handshake(self) -> Optional[HandshakeTiming]:
+        """
+        Get the timing of the most recent successful connection.
+
+        Returns:
+            HandshakeTiming:
+                The timing, or None if the controller has not connected yet.
+        """
+        return self.__last_handshake
+
+    @property
+    def name(self) -> str:
+        """
+        Get the friendly name of the device.
+
+        Returns:
+            str:
+                The friendly name of the device.
+        """
+        return self.__name
+
+    @property
+    def port(self) -> int:
+        """
+        Get the ADB port of the device.
+
+        Returns:
+            int:
+                The ADB port of the device.
+        """
+        return self.__port
+
+    @property
+    def scheduler(self) -> CommandScheduler:
+        """
+        Get the command scheduler, starting one with the default rate limit on first access.
+
+        Only commands sent through the scheduler are paced; :meth:`shell` and the other subsystems bypass it.
+
+        Returns:
+            CommandScheduler:
+                The command scheduler.
+        """
+        if self.__scheduler is None:
+            self.__scheduler = CommandScheduler(self)
+
+        return self.__scheduler
+
+    @property
+    def screen(self) -> ScreenCapture:
+        """
+        Get the screen capture subsystem, creating it with default settings on first access.
+
+        Returns:
+            ScreenCapture:
+                The screen capture subsystem.
+        """
+        if self.__screen is None:
+            self.__screen = ScreenCapture(self)
+
+        return self.__screen
+
+    @property
+    def state(self) -> DeviceStateCache:
+        """
+        Get the device state cache, creating it with default TTLs on first access.
+
+        Returns:
+            DeviceStateCache:
+                The device state cache.
+        """
+        if self.__state is None:
+            self.__state = DeviceStateCache(self)
+
+        return self.__state
+
+    @property
+    def transfers(self) -> TransferManager:
+        """
+        Get the transfer manager, creating it with default settings on first access.
+
+        Returns:
+            TransferManager:
+                The transfer manager.
+        """
+        if self.__transfers is None:
+            self.__transfers = TransferManager(self)
+
+        return self.__transfers
+
+    def batch(self, commands: Optional[Iterable[str]] = None, stop_on_error: Optional[bool] = False) -> ShellBatch:
+        """
+        Start a batch of shell commands that runs in a single shell invocation.
+
+        Parameters:
+            commands (Iterable[str]):
+                Commands to queue straight away.
+
+            stop_on_error (bool):
+                If True, the batch stops at the first command that exits with a non-zero status.
+
+        Returns:
+            ShellBatch:
+                The batch. Call :meth:`ShellBatch.run` (or use it as a context manager) to run it.
+        """
+        return ShellBatch(self, commands, stop_on_error=stop_on_error)
+
+    def close(self) -> None:
+        """
+        Close the connection to the device.
+
+        Returns:
+            None
+        """
+        for stream in list(self.__streams):
+            stream.stop()
+
+        if self.__key_session is not None:
+            self.__key_session.stop(flush=self.connected)
+            self.__key_session = None
+
+        if self.__scheduler is not None:
+            self.__scheduler.stop()
+            self.__scheduler = None
+
+        if self.__state is not None:
+            self.__state.stop()
+
+        if self.__device is not None:
+            self.__device.close()
+
+        self.__connected = False
+
+    @timed('controller.connect')
+    def connect(self, timeout: Optional[float] = None) -> None:
+        """
+        Connect (and authenticate) to the device.
+
+        Parameters:
+            timeout (float):
+                The timeout (in seconds) for the authentication handshake. Defaults to the controller's `auth_timeout`.
+
+        Returns:
+            None
+
+        Raises:
+            DeviceConnectionError:
+                Raised when the device could not be reached or refused authentication.
+        """
+        if self.__device is None:
+            self.__device = self._new_device()
+
+        start = time.perf_counter()
+        key_manager = self.key_manager
+        warm = key_manager is not None and key_manager.cached
+        rsa_keys = [key_manager.signer] if key_manager is not None else None
+        signer_time = time.perf_counter() - start
+
+        try:
+            self.__device.connect(
+                    rsa_keys=rsa_keys,
+                    auth_timeout_s=timeout if timeout is not None else self.__auth_timeout
+                    )
+        except Exception as e:
+            self.__connected = False
+            raise DeviceConnectionError(self.__name, e) from e
+
+        self.__last_handshake = HandshakeTiming(time.perf_counter() - start, signer_time, warm)
+        self.__connected = True
+
+    def _new_device(self):
+        if self.__device_factory is not None:
+            return self.__device_factory()
+
+        if not self.__host:
+            raise DeviceConnectionError(self.__name, 'No host configured. Set `fire_tv_host` in the core config.')
+
+        return AdbDeviceTcp(self.__host, self.__port, default_transport_timeout_s=self.__transport_timeout)
+
+    @timed('controller.exec_out')
+    def exec_out(self, command: str, timeout: Optional[float] = None, decode: Optional[bool] = False):
+        """
+        Run a command on the device without a terminal, so binary output arrives unmodified.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            timeout (float):
+                The total time (in seconds) to allow the command to run. If None, there is no limit.
+
+            decode (bool):
+                If True, the output is decoded to a string.
+
+        Returns:
+            Union[bytes, str]:
+                The output of the command.
+
+        Raises:
+            DeviceNotConnectedError:
+                Raised when the controller is not connected.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        output = self.__device.exec_out(command, read_timeout_s=DEFAULT_READ_TIMEOUT, timeout_s=timeout, decode=decode)
+
+        if self.__state is not None:
+            self.__state.observe_command(command)
+
+        return output
+
+    def key_input(
+            self,
+            backend: Optional[str] = 'input',
+            device_node: Optional[str] = None,
+            hold_duration: Optional[float] = DEFAULT_HOLD_DURATION,
+            ) -> KeyInputSession:
+        """
+        Replace the key input session with one using the given backend.
+
+        Parameters:
+            backend (str):
+                Either 'input' or 'sendevent'. See :class:`KeyInputSession`.
+
+            device_node (str):
+                The input device node written by the 'sendevent' backend, e.g. '/dev/input/event0'.
+
+            hold_duration (float):
+                How long (in seconds) a held key stays down with the 'sendevent' backend.
+
+        Returns:
+            KeyInputSession:
+                The new key input session.
+        """
+        session = KeyInputSession(self, backend, device_node, hold_duration)
+
+        if self.__key_session is not None:
+            self.__key_session.stop()
+
+        self.__key_session = session
+
+        return session
+
+    def press(self, key: Union[int, str], repeat: Optional[int] = 1, hold: Optional[bool] = False) -> None:
+        """
+        Queue a remote-control key press. Key presses are sent in order by the key input session.
+
+        Parameters:
+            key (Union[int, str]):
+                A keycode, a friendly name (e.g. 'home', 'select') or a `KEYCODE_*` name.
+
+            repeat (int):
+                How many times to press the key.
+
+            hold (bool):
+                If True, the key is held down (a long press) instead of tapped.
+
+        Returns:
+            None
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        self.keys.press(key, repeat, hold)
+
+    def launch_app(self, package: str) -> str:
+        """
+        Launch an app by its package name.
+
+        Parameters:
+            package (str):
+                The package to launch, e.g. 'com.netflix.ninja'.
+
+        Returns:
+            str:
+                The output of the launch command.
+        """
+        return self.shell(f'monkey -p {shlex.quote(package)} -c android.intent.category.LAUNCHER 1')
+
+    def open_connection(self, timeout: Optional[float] = None):
+        """
+        Open a separate, authenticated connection to the device.
+
+        Long-running streams use one of their own, so closing them (or a stalled read on them) never affects the
+        controller's shared connection. The caller owns the connection and must close it.
+
+        Parameters:
+            timeout (float):
+                The timeout (in seconds) for the authentication handshake. Defaults to the controller's `auth_timeout`.
+
+        Returns:
+            AdbDeviceTcp:
+                The connected ADB device object.
+
+        Raises:
+            DeviceConnectionError:
+                Raised when the device could not be reached or refused authentication.
+        """
+        device = self._new_device()
+        key_manager = self.key_manager
+
+        try:
+            device.connect(
+                    rsa_keys=[key_manager.signer] if key_manager is not None else None,
+                    auth_timeout_s=timeout if timeout is not None else self.__auth_timeout
+                    )
+        except Exception as e:
+            raise DeviceConnectionError(self.__name, e) from e
+
+        return device
+
+    def package_index(self, packages: Optional[Iterable[str]] = None) -> Dict[str, PackageInfo]:
+        """
+        Get the version and uid of installed packages, parsed from `dumpsys package` as it streams in.
+
+        Parameters:
+            packages (Iterable[str]):
+                Only look up these packages, with one `dumpsys package <name>` each so the device never dumps the
+                others. If None, every package is indexed.
+
+        Returns:
+            Dict[str, PackageInfo]:
+                The index, keyed by package name.
+        """
+        if packages is None:
+            return parse_dumpsys_packages(self.stream_lines('dumpsys package packages'))
+
+        packages = list(packages)
+
+        if not packages:
+            return {}
+
+        command = '; '.join(f'dumpsys package {shlex.quote(package)}' for package in packages)
+
+        return parse_dumpsys_packages(self.stream_lines(command), packages)
+
+    def pull(self, device_path: str, local_path: Union[str, Path], resume: Optional[bool] = True) -> TransferStats:
+        """
+        Pull a file from the device in resumable, checksummed chunks. See :meth:`TransferManager.pull`.
+
+        Parameters:
+            device_path (str):
+                The file to pull.
+
+            local_path (Union[str, Path]):
+                Where to write it locally.
+
+            resume (bool):
+                If True, continue from a partial file left by an earlier, interrupted pull.
+
+        Returns:
+            TransferStats:
+                The transfer's statistics.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        return self.transfers.pull(device_path, local_path, resume)
+
+    def push(self, local_path: Union[str, Path], device_path: str, resume: Optional[bool] = True) -> TransferStats:
+        """
+        Push a file to the device in resumable, checksummed chunks. See :meth:`TransferManager.push`.
+
+        Parameters:
+            local_path (Union[str, Path]):
+                The file to push.
+
+            device_path (str):
+                Where to write it on the device.
+
+            resume (bool):
+                If True, continue from a partial file left on the device by an earlier, interrupted push.
+
+        Returns:
+            TransferStats:
+                The transfer's statistics.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        return self.transfers.push(local_path, device_path, resume)
+
+    def record_macro(self, name: str, forward: Optional[bool] = True) -> MacroRecorder:
+        """
+        Start recording a macro of key presses.
+
+        Parameters:
+            name (str):
+                The name of the macro.
+
+            forward (bool):
+                If True, every recorded press is also sent to this device.
+
+        Returns:
+            MacroRecorder:
+                The recorder. Call :meth:`MacroRecorder.press` to record presses, and read the result from
+                :attr:`MacroRecorder.macro`.
+        """
+        return MacroRecorder(name, self if forward else None)
+
+    @timed('controller.shell')
+    def shell(self, command: str, timeout: Optional[float] = None, decode: Optional[bool] = True):
+        """
+        Run a shell command on the device.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            timeout (float):
+                The total time (in seconds) to allow the command to run. If None, there is no limit.
+
+            decode (bool):
+                If True, the output is decoded to a string.
+
+        Returns:
+            Union[str, bytes]:
+                The output of the command.
+
+        Raises:
+            DeviceNotConnectedError:
+                Raised when the controller is not connected.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        output = self.__device.shell(command, read_timeout_s=DEFAULT_READ_TIMEOUT, timeout_s=timeout, decode=decode)
+
+        if self.__state is not None:
+            self.__state.observe_command(command)
+
+        return output
+
+    def stream_logcat(
+            self,
+            tags: Optional[Iterable[str]] = None,
+            priority: Optional[str] = 'V',
+            buffers: Optional[Iterable[str]] = None,
+            tail: Optional[int] = None,
+            buffer_size: Optional[int] = DEFAULT_BUFFER_SIZE,
+            overflow: Optional[str] = 'drop_oldest',
+            ) -> LogcatStream:
+        """
+        Tail the device's logcat.
+
+        Tag and priority filters are applied by `logcat` on the device, so filtered-out lines are never sent. The
+        stream reads over a connection of its own (see :meth:`open_connection`), and is stopped when the controller
+        is closed.
+
+        Parameters:
+            tags (Iterable[str]):
+                Only include these tags. If None, every tag is included.
+
+            priority (str):
+                The lowest priority to include; one of 'V', 'D', 'I', 'W', 'E', 'F' or 'S'.
+
+            buffers (Iterable[str]):
+                The log buffers to read (e.g. 'main', 'system', 'crash').
+
+            tail (int):
+                Start with this many of the most recent lines instead of the whole buffer.
+
+            buffer_size (int):
+                The largest number of records held in memory at once.
+
+            overflow (str):
+                What to do when the consumer falls behind: 'drop_oldest' or 'block'. See :class:`LogcatStream`.
+
+        Returns:
+            LogcatStream:
+                The running stream. Iterate over it (synchronously or with `async for`) to consume records.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        command = build_logcat_command(tags, priority, buffers, tail)
+        stream = LogcatStream(self, command, buffer_size=buffer_size, overflow=overflow)
+        self.__streams.add(stream)
+
+        return stream
+
+    def stream_lines(self, command: str, read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT) -> Iterator[str]:
+        """
+        Run a shell command on the device and yield its output line by line as it arrives.
+
+        Closing the returned generator early stops reading, but adb-shell does not end the command on the device, which
+        keeps sending the rest of its output. Narrow long outputs on the device (e.g. with `grep -m` or `head`) so the
+        command ends by itself.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            read_timeout (float):
+                How long (in seconds) to wait for each piece of output.
+
+        Returns:
+            Iterator[str]:
+                The lines of output, without line terminators.
+        """
+        return iter_lines(self.streaming_shell(command, read_timeout=read_timeout))
+
+    def streaming_shell(
+            self,
+            command: str,
+            read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+            decode: Optional[bool] = True,
+            ) -> Iterator[Union[str, bytes]]:
+        """
+        Run a shell command on the device and yield its output as it arrives.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            read_timeout (float):
+                How long (in seconds) to wait for each piece of output.
+
+            decode (bool):
+                If True, the output is decoded to strings.
+
+        Yields:
+            Union[str, bytes]:
+                Chunks of output, in the sizes the device sent them.
+
+        Raises:
+            DeviceNotConnectedError:
+                Raised when the controller is not connected.
+        """
+        if not self.connected:
+            raise DeviceNotConnectedError(self.__name)
+
+        try:
+            yield from self.__device.streaming_shell(command, read_timeout_s=read_timeout, decode=decode)
+        finally:
+            # The command may have changed device state, however the stream ended.
+            if self.__state is not None:
+                self.__state.observe_command(command)
+
+    def __enter__(self):
+        if not self.connected:
+            self.connect()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'<Controller: {self.__name} | connected={self.connected} | @{hex(id(self))}>'
@@ -0,0 +1,200 @@
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+from adb_shell.auth.keygen import keygen
+from adb_shell.auth.sign_pythonrsa import PythonRSASigner
+
+
+class KeyManager:
+    """
+    Manage an ADB key pair and the RSA signer built from it.
+
+    There is one KeyManager per key path for the whole process. The key pair is generated the first time it is needed
+    if it does not exist, and the signer is parsed from it once and then shared by every connection and reconnect
+    that uses the same key.
+    """
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __new__(cls, key_path: Union[str, Path]):
+        key_path = Path(key_path).expanduser().resolve().absolute()
+
+        with cls._lock:
+            if key_path not in cls._instances:
+                instance = super().__new__(cls)
+                cls._instances[key_path] = instance
+
+            return cls._instances[key_path]
+
+    def __init__(self, key_path: Union[str, Path]):
+        """
+        Initialize a KeyManager object.
+
+        Parameters:
+            key_path (Union[str, Path]):
+                The path to the private key. The public key is expected alongside it with a `.pub` suffix.
+        """
+        if hasattr(self, '_initialized'):
+            return
+
+        self._initialized = True
+        self.__key_path = Path(key_path).expanduser().resolve().absolute()
+        self.__signer = None
+        self.__lock = threading.Lock()
+        self.__generated = False
+        self.__load_time = None
+        self.__hits = 0
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Forget every cached signer, so the next connection parses its key again.
+
+        Returns:
+            None
+        """
+        with cls._lock:
+            for instance in cls._instances.values():
+                instance.reload(lazy=True)
+
+    @property
+    def cached(self) -> bool:
+        """
+        Check if the signer has been loaded.
+
+        Returns:
+            bool:
+                True if the signer is cached (warm), False otherwise.
+        """
+        return self.__signer is not None
+
+    @property
+    def generated(self) -> bool:
+        """
+        Check if this manager generated the key pair.
+
+        Returns:
+            bool:
+                True if the key pair did not exist and was generated, False otherwise.
+        """
+        return self.__generated
+
+    @property
+    def hits(self) -> int:
+        """
+        Get the number of times the cached signer was reused.
+
+        Returns:
+            int:
+                The number of cache hits.
+        """
+        return self.__hits
+
+    @property
+    def key_path(self) -> Path:
+        """
+        Get the path to the private key.
+
+        Returns:
+            Path:
+                The path to the private key.
+        """
+        return self.__key_path
+
+    @property
+    def load_time(self) -> Optional[float]:
+        """
+        Get the time (in seconds) it took to generate (if needed) and parse the key pair.
+
+        Returns:
+            float:
+                The cold load time, or None if the signer has not been loaded.
+        """
+        return self.__load_time
+
+    @property
+    def public_key_path(self) -> Path:
+        """
+        Get the path to the public key.
+
+        Returns:
+            Path:
+                The path to the public key.
+        """
+        return self.__key_path.with_name(f'{self.__key_path.name}.pub')
+
+    @property
+    def signer(self) -> PythonRSASigner:
+        """
+        Get the signer, loading it on first access.
+
+        Returns:
+            PythonRSASigner:
+                The signer for the key pair.
+        """
+        signer = self.__signer
+
+        if signer is not None:
+            self.__hits += 1
+            return signer
+
+        with self.__lock:
+            if self.__signer is None:
+                start = time.perf_counter()
+                self.ensure_key()
+                self.__signer = PythonRSASigner.FromRSAKeyPath(str(self.__key_path))
+                self.__load_time = time.perf_counter() - start
+            else:
+                self.__hits += 1
+
+        return self.__signer
+
+    def ensure_key(self) -> bool:
+        """
+        Generate the key pair if either half of it is missing.
+
+        Returns:
+            bool:
+                True if the key pair was generated, False if it already existed.
+        """
+        if self.__key_path.exists() and self.public_key_path.exists():
+            return False
+
+        self.__key_path.parent.mkdir(parents=True, exist_ok=True)
+        keygen(str(self.__key_path))
+        self.__generated = True
+
+        return True
+
+    def reload(self, lazy: Optional[bool] = False) -> None:
+        """
+        Drop the cached signer, e.g. after the key pair was replaced on disk.
+
+        Parameters:
+            lazy (bool):
+                If True, the key pair is parsed again on next use. Otherwise, it is parsed immediately.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__signer = None
+            self.__load_time = None
+
+        if not lazy:
+            self.signer
+
+    def __repr__(self):
+        return f'<KeyManager: {self.__key_path} | cached={self.cached} | @{hex(id(self))}>'
+
+
+@dataclass(frozen=True)
+class HandshakeTiming:
+    """
+    How long a connection's authentication took, and how much of that went into obtaining the signer.
+    """
+    total: float
+    signer: float
+    warm: bool
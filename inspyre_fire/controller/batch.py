@@ -0,0 +1,258 @@
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+
+MAX_SCRIPT_LENGTH = 4000
+"""
+The longest script (in bytes) sent in a single shell invocation.
+
+Older `adbd` builds cap the payload of the message that opens a shell service at 4096 bytes, so larger batches are
+split across several invocations.
+"""
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """
+    The outcome of a single command run as part of a :class:`ShellBatch`.
+    """
+    command: str
+    output: str
+    exit_code: Optional[int]
+
+    @property
+    def executed(self) -> bool:
+        """True if the command ran (it may be skipped when the batch stops on an error)."""
+        return self.exit_code is not None
+
+    @property
+    def ok(self) -> bool:
+        """True if the command ran and exited with a status of zero."""
+        return self.exit_code == 0
+
+
+class ShellBatch:
+    """
+    Coalesce several shell commands into a single shell invocation.
+
+    Each command is followed by a line holding a per-batch marker and the command's exit status, so a single round
+    trip can be split back into one :class:`BatchResult` per command. Use it directly or as a context manager, in
+    which case the batch runs when the block exits cleanly:
+
+    .. code-block:: python
+
+        with controller.batch() as batch:
+            batch.add('input keyevent 19')
+            batch.add('getprop ro.product.model')
+
+        model = batch.results[1].output
+    """
+
+    def __init__(
+            self,
+            controller,
+            commands: Optional[Iterable[str]] = None,
+            stop_on_error: Optional[bool] = False,
+            max_script_length: Optional[int] = MAX_SCRIPT_LENGTH,
+            ):
+        """
+        Initialize a ShellBatch object.
+
+        Parameters:
+            controller (Controller):
+                The controller to run the batch on.
+
+            commands (Iterable[str]):
+                Commands to queue straight away.
+
+            stop_on_error (bool):
+                If True, the batch stops at the first command that exits with a non-zero status. Commands that did
+                not run are reported with an `exit_code` of None.
+
+            max_script_length (int):
+                The longest script (in bytes) sent in a single shell invocation.
+        """
+        self.__controller = controller
+        self.__commands = []
+        self.__stop_on_error = stop_on_error
+        self.__max_script_length = max_script_length
+        self.__marker = f'__INSPYRE_FIRE_{uuid.uuid4().hex}__'
+        self.__results = []
+
+        self.extend(commands or ())
+
+    @property
+    def commands(self) -> List[str]:
+        """
+        Get the queued commands.
+
+        Returns:
+            List[str]:
+                The queued commands, in order.
+        """
+        return list(self.__commands)
+
+    @property
+    def results(self) -> List[BatchResult]:
+        """
+        Get the results of the last run.
+
+        Returns:
+            List[BatchResult]:
+                One result per command, in the order the commands were added.
+        """
+        return self.__results
+
+    def _wrap(self, command: str) -> str:
+        script = f"{command}\n__rc=$?; printf '\\n{self.__marker}:%d\\n' $__rc\n"
+
+        if self.__stop_on_error:
+            script += '[ $__rc -eq 0 ] || exit $__rc\n'
+
+        return script
+
+    def _build_scripts(self) -> List[List[str]]:
+        """
+        Group the queued commands so that each group's script fits in a single shell invocation.
+
+        Returns:
+            List[List[str]]:
+                The wrapped commands of each group.
+        """
+        groups = []
+        current = []
+        length = 0
+
+        for command in self.__commands:
+            wrapped = self._wrap(command)
+            size = len(wrapped.encode())
+
+            if current and length + size > self.__max_script_length:
+                groups.append(current)
+                current = []
+                length = 0
+
+            current.append(wrapped)
+            length += size
+
+        if current:
+            groups.append(current)
+
+        return groups
+
+    def _split_output(self, commands: List[str], output: str) -> List[BatchResult]:
+        """
+        Split the output of a single invocation back into per-command results.
+
+        Parameters:
+            commands (List[str]):
+                The commands that made up the invocation.
+
+            output (str):
+                The combined output.
+
+        Returns:
+            List[BatchResult]:
+                One result per command. Commands whose marker is missing are reported with an `exit_code` of None.
+        """
+        results = []
+        separator = f'\n{self.__marker}:'
+        rest = output
+
+        for command in commands:
+            head, found, rest = rest.partition(separator)
+
+            if not found:
+                results.append(BatchResult(command, head, None))
+                rest = ''
+                continue
+
+            code, _, rest = rest.partition('\n')
+            results.append(BatchResult(command, head, int(code)))
+
+        return results
+
+    def add(self, command: str) -> int:
+        """
+        Queue a command.
+
+        Parameters:
+            command (str):
+                The command to queue.
+
+        Returns:
+            int:
+                The index the command's result will have in :attr:`results`.
+        """
+        self.__commands.append(command)
+
+        return len(self.__commands) - 1
+
+    def clear(self) -> None:
+        """
+        Remove all queued commands and results.
+
+        Returns:
+            None
+        """
+        self.__commands.clear()
+        self.__results = []
+
+    def extend(self, commands: Iterable[str]) -> None:
+        """
+        Queue several commands.
+
+        Parameters:
+            commands (Iterable[str]):
+                The commands to queue.
+
+        Returns:
+            None
+        """
+        for command in commands:
+            self.add(command)
+
+    def run(self, timeout: Optional[float] = None) -> List[BatchResult]:
+        """
+        Run the queued commands.
+
+        Parameters:
+            timeout (float):
+                The total time (in seconds) to allow each shell invocation to run. If None, there is no limit.
+
+        Returns:
+            List[BatchResult]:
+                One result per command, in the order the commands were added.
+        """
+        results = []
+        stopped = False
+        commands = iter(self.__commands)
+
+        for group in self._build_scripts():
+            group_commands = [next(commands) for _ in group]
+
+            if stopped:
+                results.extend(BatchResult(command, '', None) for command in group_commands)
+                continue
+
+            output = self.__controller.shell(''.join(group), timeout=timeout)
+            group_results = self._split_output(group_commands, output)
+            results.extend(group_results)
+
+            if self.__stop_on_error and not all(result.ok for result in group_results):
+                stopped = True
+
+        self.__results = results
+
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.run()
+
+    def __len__(self):
+        return len(self.__commands)
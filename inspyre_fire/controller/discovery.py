@@ -0,0 +1,483 @@
+import asyncio
+import ipaddress
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+from inspyre_fire.controller import DEFAULT_PORT, Controller, get_core_config
+from inspyre_fire.controller.fleet import DeviceEntry, DeviceInventory
+from inspyre_fire.controller.state import parse_properties
+
+
+DEFAULT_CONCURRENCY = 256
+DEFAULT_FINGERPRINT_CONCURRENCY = 16
+DEFAULT_PROBE_TIMEOUT = 0.5
+DEFAULT_FINGERPRINT_TIMEOUT = 10.0
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+FINGERPRINT_PROPERTIES = {
+        'serial':          'ro.serialno',
+        'manufacturer':    'ro.product.manufacturer',
+        'model':           'ro.product.model',
+        'product':         'ro.product.name',
+        'android_version': 'ro.build.version.release',
+        'build':           'ro.build.display.id',
+        }
+"""The `getprop` properties read from every discovered device, keyed by the field they fill in."""
+
+
+@dataclass(frozen=True)
+class DiscoveredDevice:
+    """
+    A host found listening on an ADB port, and what it reported about itself.
+
+    The fingerprint fields are None when the device could not be fingerprinted (for example, because it has not
+    authorized this machine's ADB key yet).
+    """
+    host: str
+    port: int = DEFAULT_PORT
+    serial: Optional[str] = None
+    manufacturer: Optional[str] = None
+    model: Optional[str] = None
+    product: Optional[str] = None
+    android_version: Optional[str] = None
+    build: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def fingerprinted(self) -> bool:
+        """True if the device answered the `getprop` query."""
+        return self.serial is not None or self.model is not None
+
+    @property
+    def name(self) -> str:
+        """A friendly name: the model and serial number if known, otherwise `host:port`."""
+        if self.model and self.serial:
+            return f'{self.model} ({self.serial})'
+
+        return f'{self.host}:{self.port}'
+
+    def to_entry(self, adbkey: Optional[str] = None) -> DeviceEntry:
+        """
+        Convert the device to an inventory entry.
+
+        Parameters:
+            adbkey (str):
+                The private ADB key to use for the device.
+
+        Returns:
+            DeviceEntry:
+                The entry.
+        """
+        return DeviceEntry(self.name, self.host, self.port, adbkey)
+
+
+def build_fingerprint_command() -> str:
+    """
+    Build a single shell command that prints every fingerprint property in `getprop`'s `[name]: [value]` format.
+
+    Returns:
+        str:
+            The command.
+    """
+    properties = ' '.join(FINGERPRINT_PROPERTIES.values())
+
+    return f'for p in {properties}; do echo "[$p]: [$(getprop $p)]"; done'
+
+
+def expand_targets(targets: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Expand networks (e.g. '192.168.1.0/24') and single addresses into a list of host addresses.
+
+    Parameters:
+        targets (Union[str, Iterable[str]]):
+            A network, an address, or several of either.
+
+    Returns:
+        List[str]:
+            The host addresses, in order, without duplicates.
+    """
+    if isinstance(targets, str):
+        targets = [targets]
+
+    hosts = {}
+
+    for target in targets:
+        network = ipaddress.ip_network(target, strict=False)
+        addresses = [network.network_address] if network.num_addresses == 1 else network.hosts()
+
+        for address in addresses:
+            hosts.setdefault(str(address), None)
+
+    return list(hosts)
+
+
+async def probe(host: str, port: int, timeout: Optional[float] = DEFAULT_PROBE_TIMEOUT) -> bool:
+    """
+    Check whether a host accepts TCP connections on a port.
+
+    Parameters:
+        host (str):
+            The host address.
+
+        port (int):
+            The port.
+
+        timeout (float):
+            How long (in seconds) to wait for the connection.
+
+    Returns:
+        bool:
+            True if the connection was accepted, False otherwise.
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+    writer.close()
+
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+    return True
+
+
+async def scan(
+        hosts: Iterable[str],
+        ports: Iterable[int] = (DEFAULT_PORT,),
+        concurrency: Optional[int] = DEFAULT_CONCURRENCY,
+        timeout: Optional[float] = DEFAULT_PROBE_TIMEOUT,
+        ) -> List[Tuple[str, int]]:
+    """
+    Probe many hosts for open ports concurrently, with at most `concurrency` connection attempts in flight.
+
+    Parameters:
+        hosts (Iterable[str]):
+            The host addresses.
+
+        ports (Iterable[int]):
+            The ports to probe on every host.
+
+        concurrency (int):
+            The largest number of connection attempts in flight at once.
+
+        timeout (float):
+            How long (in seconds) to wait for each connection.
+
+    Returns:
+        List[Tuple[str, int]]:
+            The open `(host, port)` pairs, in the order they were probed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    targets = [(host, port) for host in hosts for port in ports]
+
+    async def bounded(host, port):
+        async with semaphore:
+            return await probe(host, port, timeout)
+
+    results = await asyncio.gather(*(bounded(host, port) for host, port in targets))
+
+    return [target for target, is_open in zip(targets, results) if is_open]
+
+
+class DeviceDiscovery:
+    """
+    Find Fire TV devices on the local network.
+
+    A scan probes every address of a network for an open ADB port with asyncio, keeping at most `concurrency`
+    connection attempts in flight, then connects to each host that answered and reads a handful of `getprop`
+    properties in a single shell call to identify it. The results are cached in the user cache directory, so later
+    runs reuse them instead of rescanning until the cache is older than `cache_ttl` or a different network is asked
+    for.
+    """
+
+    def __init__(
+            self,
+            ports: Optional[Iterable[int]] = (DEFAULT_PORT,),
+            concurrency: Optional[int] = DEFAULT_CONCURRENCY,
+            probe_timeout: Optional[float] = DEFAULT_PROBE_TIMEOUT,
+            fingerprint: Optional[bool] = True,
+            fingerprint_concurrency: Optional[int] = DEFAULT_FINGERPRINT_CONCURRENCY,
+            fingerprint_timeout: Optional[float] = DEFAULT_FINGERPRINT_TIMEOUT,
+            adbkey: Optional[Union[str, Path]] = None,
+            cache_path: Optional[Union[str, Path]] = None,
+            cache_ttl: Optional[float] = DEFAULT_CACHE_TTL,
+            controller_factory: Optional[Callable[[str, int], Controller]] = None,
+            ):
+        """
+        Initialize a DeviceDiscovery object.
+
+        Parameters:
+            ports (Iterable[int]):
+                The ports to probe on every host.
+
+            concurrency (int):
+                The largest number of connection attempts in flight at once.
+
+            probe_timeout (float):
+                How long (in seconds) to wait for each connection attempt.
+
+            fingerprint (bool):
+                If True, connect to every host that answered and identify it with `getprop`.
+
+            fingerprint_concurrency (int):
+                The largest number of devices fingerprinted at once.
+
+            fingerprint_timeout (float):
+                How long (in seconds) to allow for connecting to and fingerprinting a single device.
+
+            adbkey (Union[str, Path]):
+                The private ADB key used to fingerprint devices. Defaults to `fire_tv_adbkey` from the core config.
+
+            cache_path (Union[str, Path]):
+                The cache file. Defaults to `discovered_devices.json` in the user cache directory.
+
+            cache_ttl (float):
+                How long (in seconds) a cached scan is reused. None means forever.
+
+            controller_factory (Callable[[str, int], Controller]):
+                Builds the (unconnected) controller used to fingerprint a host. Defaults to constructing a
+                :class:`Controller`.
+        """
+        if cache_path is None:
+            from inspyre_fire.config.constants import FILE_SYSTEM_DEFAULTS
+
+            cache_path = FILE_SYSTEM_DEFAULTS['files']['discovery']
+
+        if concurrency < 1 or fingerprint_concurrency < 1:
+            raise ValueError('`concurrency` and `fingerprint_concurrency` must be at least 1.')
+
+        self.__ports = tuple(ports)
+        self.__concurrency = concurrency
+        self.__probe_timeout = probe_timeout
+        self.__fingerprint = fingerprint
+        self.__fingerprint_concurrency = fingerprint_concurrency
+        self.__fingerprint_timeout = fingerprint_timeout
+        self.__adbkey = adbkey
+        self.__cache_path = Path(cache_path).expanduser().resolve().absolute()
+        self.__cache_ttl = cache_ttl
+        self.__controller_factory = controller_factory or self._build_controller
+
+    def _build_controller(self, host: str, port: int) -> Controller:
+        adbkey = self.__adbkey if self.__adbkey is not None else getattr(get_core_config(), 'fire_tv_adbkey', None)
+
+        return Controller(host=host, port=port, adbkey=adbkey or '', auth_timeout=self.__fingerprint_timeout)
+
+    @property
+    def cache_path(self) -> Path:
+        """
+        Get the path of the discovery cache.
+
+        Returns:
+            Path:
+                The cache file.
+        """
+        return self.__cache_path
+
+    def _cache_key(self, targets: Union[str, Iterable[str]]) -> dict:
+        return {
+                'targets': [targets] if isinstance(targets, str) else list(targets),
+                'ports':   list(self.__ports),
+                }
+
+    def fingerprint(self, host: str, port: int) -> DiscoveredDevice:
+        """
+        Connect to a device and identify it with `getprop`.
+
+        Parameters:
+            host (str):
+                The host address.
+
+            port (int):
+                The ADB port.
+
+        Returns:
+            DiscoveredDevice:
+                The device. If it could not be fingerprinted, the fingerprint fields are None and `error` says why.
+        """
+        controller = self.__controller_factory(host, port)
+
+        try:
+            controller.connect(timeout=self.__fingerprint_timeout)
+            properties = parse_properties(controller.shell(build_fingerprint_command(), self.__fingerprint_timeout))
+        except Exception as e:
+            return DiscoveredDevice(host, port, error=str(e) or e.__class__.__name__)
+        finally:
+            try:
+                controller.close()
+            except Exception:
+                pass
+
+        values = {name: properties.get(prop) or None for name, prop in FINGERPRINT_PROPERTIES.items()}
+
+        return DiscoveredDevice(host, port, **values)
+
+    async def adiscover(self, targets: Union[str, Iterable[str]]) -> List[DiscoveredDevice]:
+        """
+        Scan for devices without consulting or updating the cache.
+
+        Parameters:
+            targets (Union[str, Iterable[str]]):
+                A network (e.g. '192.168.1.0/24'), an address, or several of either.
+
+        Returns:
+            List[DiscoveredDevice]:
+                The devices found, in address order.
+        """
+        found = await scan(expand_targets(targets), self.__ports, self.__concurrency, self.__probe_timeout)
+
+        if not self.__fingerprint:
+            return [DiscoveredDevice(host, port) for host, port in found]
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.__fingerprint_concurrency)
+
+        async def identify(host, port):
+            async with semaphore:
+                # Connecting and authenticating is blocking, so it runs in the loop's thread pool.
+                return await loop.run_in_executor(None, self.fingerprint, host, port)
+
+        return list(await asyncio.gather(*(identify(host, port) for host, port in found)))
+
+    def discover(self, targets: Union[str, Iterable[str]], refresh: Optional[bool] = False) -> List[DiscoveredDevice]:
+        """
+        Find the devices on a network, reusing the cached results of an earlier scan of the same network if they are
+        fresh enough.
+
+        Parameters:
+            targets (Union[str, Iterable[str]]):
+                A network (e.g. '192.168.1.0/24'), an address, or several of either.
+
+            refresh (bool):
+                If True, rescan even if the cache is fresh.
+
+        Returns:
+            List[DiscoveredDevice]:
+                The devices found.
+        """
+        if not refresh:
+            cached = self.load_cache(targets)
+
+            if cached is not None:
+                return cached
+
+        devices = asyncio.run(self.adiscover(targets))
+        self.save_cache(targets, devices)
+
+        return devices
+
+    def inventory(
+            self,
+            targets: Union[str, Iterable[str]],
+            refresh: Optional[bool] = False,
+            fingerprinted_only: Optional[bool] = True,
+            ) -> DeviceInventory:
+        """
+        Find the devices on a network and build an inventory from them.
+
+        Parameters:
+            targets (Union[str, Iterable[str]]):
+                A network (e.g. '192.168.1.0/24'), an address, or several of either.
+
+            refresh (bool):
+                If True, rescan even if the cache is fresh.
+
+            fingerprinted_only (bool):
+                If True, leave out hosts that have an open port but could not be identified.
+
+        Returns:
+            DeviceInventory:
+                The inventory.
+        """
+        adbkey = str(self.__adbkey) if self.__adbkey else None
+        inventory = DeviceInventory()
+
+        for device in self.discover(targets, refresh):
+            if fingerprinted_only and self.__fingerprint and not device.fingerprinted:
+                continue
+
+            entry = device.to_entry(adbkey)
+
+            if entry.name in inventory:
+                entry = DeviceEntry(f'{device.host}:{device.port}', device.host, device.port, adbkey)
+
+            inventory.add(entry)
+
+        return inventory
+
+    def load_cache(self, targets: Union[str, Iterable[str]]) -> Optional[List[DiscoveredDevice]]:
+        """
+        Load the cached results of an earlier scan.
+
+        Parameters:
+            targets (Union[str, Iterable[str]]):
+                The targets the scan must have covered.
+
+        Returns:
+            List[DiscoveredDevice]:
+                The cached devices, or None if there is no usable cache for these targets.
+        """
+        try:
+            with open(self.__cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # The cache is disposable, so anything unexpected in it just means a rescan.
+        if not isinstance(data, dict) or data.get('key') != self._cache_key(targets):
+            return None
+
+        scanned_at = data.get('scanned_at', 0)
+
+        if self.__cache_ttl is not None and time.time() - scanned_at > self.__cache_ttl:
+            return None
+
+        known = {f.name for f in fields(DiscoveredDevice)}
+
+        try:
+            return [
+                    DiscoveredDevice(**{name: value for name, value in item.items() if name in known})
+                    for item in data.get('devices', [])
+                    ]
+        except TypeError:
+            return None
+
+    def save_cache(self, targets: Union[str, Iterable[str]], devices: Iterable[DiscoveredDevice]) -> Path:
+        """
+        Write scan results to the cache.
+
+        Parameters:
+            targets (Union[str, Iterable[str]]):
+                The targets that were scanned.
+
+            devices (Iterable[DiscoveredDevice]):
+                The devices found.
+
+        Returns:
+            Path:
+                The cache file.
+        """
+        self.__cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.__cache_path.with_name(self.__cache_path.name + '.tmp')
+
+        with open(temp_path, 'w') as f:
+            json.dump(
+                    {
+                            'key':        self._cache_key(targets),
+                            'scanned_at': time.time(),
+                            'devices':    [asdict(device) for device in devices],
+                            },
+                    f,
+                    indent=4,
+                    )
+
+        temp_path.replace(self.__cache_path)
+
+        return self.__cache_path
+
+    def __repr__(self):
+        return f'<DeviceDiscovery: ports={list(self.__ports)} | cache={self.__cache_path} | @{hex(id(self))}>'
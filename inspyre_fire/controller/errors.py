@@ -0,0 +1,192 @@
+from inspyre_fire.errors import InspyreFireError
+
+
+class ControllerError(InspyreFireError):
+    """
+    Base class for errors raised by the Controller package.
+    """
+    __base_message = 'An error occurred in the Controller package.'
+    __info_unavailable = 'No additional information is available.'
+
+    def __init__(self, message=None, code=0, **kwargs):
+        self.__info_collection = []
+        self._additional_info = message if message is not None else self.__info_unavailable
+        self.__code = code
+        self.__message = self.build_message()
+        super().__init__(self.__message, self.__code, **kwargs)
+
+    @property
+    def additional_info(self):
+        """Returns additional information about the error."""
+        return self._additional_info
+
+    @additional_info.setter
+    def additional_info(self, new_info):
+        """Sets additional information about the error."""
+        self.__info_collection.append(new_info)
+
+    @property
+    def code(self):
+        """Returns the error code."""
+        return self.__code
+
+    @property
+    def info_collection(self):
+        """Returns the collection of additional information."""
+        return self.__info_collection
+
+    def build_message(self):
+        """Constructs the full error message."""
+        return f'{self.__base_message}\n\n{(" " * 4)}{self.__class__.__name__}'
+
+
+class DeviceConnectionError(ControllerError):
+    """
+    Raised when a connection to a Fire TV device could not be established.
+    """
+
+    def __init__(self, device=None, reason=None, **kwargs):
+        self._additional_info = 'Unable to connect to the device.'
+
+        if device:
+            self._additional_info += f'\nDevice: {device}'
+
+        if reason:
+            self._additional_info += f'\nReason: {reason}'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info, **kwargs)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'DeviceConnectionError: {self._additional_info}'
+
+
+class DeviceNotConnectedError(ControllerError):
+    """
+    Raised when a command is issued to a device that has not been connected yet.
+    """
+
+    def __init__(self, device=None, **kwargs):
+        self._additional_info = 'The device is not connected. Call `connect()` first.'
+
+        if device:
+            self._additional_info += f'\nDevice: {device}'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info, **kwargs)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'DeviceNotConnectedError: {self._additional_info}'
+
+
+class DeviceTimeoutError(ControllerError):
+    """
+    Raised when a device does not finish an operation within its allotted time.
+    """
+
+    def __init__(self, device=None, timeout=None, **kwargs):
+        self._additional_info = 'The device did not respond in time.'
+
+        if device:
+            self._additional_info += f'\nDevice: {device}'
+
+        if timeout is not None:
+            self._additional_info += f'\nTimeout: {timeout}s'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info, **kwargs)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'DeviceTimeoutError: {self._additional_info}'
+
+
+class InventoryError(ControllerError):
+    """
+    Raised when a device inventory file is missing or malformed.
+    """
+
+    def __init__(self, file_path=None, reason=None, **kwargs):
+        self._additional_info = 'Unable to load the device inventory.'
+
+        if file_path:
+            self._additional_info += f'\nFile: {file_path}'
+
+        if reason:
+            self._additional_info += f'\nReason: {reason}'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info, **kwargs)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'InventoryError: {self._additional_info}'
+
+
+class TransferError(ControllerError):
+    """
+    Raised when a file transfer to or from a device fails or does not verify.
+    """
+
+    def __init__(self, path=None, reason=None, **kwargs):
+        self._additional_info = 'The file transfer failed.'
+
+        if path:
+            self._additional_info += f'\nPath: {path}'
+
+        if reason:
+            self._additional_info += f'\nReason: {reason}'
+
+        self._line_number = self.get_line_number()
+        self._file_raised = self.get_file_raised()
+
+        super().__init__(self._additional_info, **kwargs)
+
+    @property
+    def line_number(self):
+        return self._line_number
+
+    @property
+    def file_raised(self):
+        return self._file_raised
+
+    def __str__(self):
+        return f'TransferError: {self._additional_info}'
@@ -0,0 +1,451 @@
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+from inspyre_fire.controller import DEFAULT_PORT, Controller, get_core_config
+from inspyre_fire.controller.errors import DeviceTimeoutError, InventoryError
+
+
+DEFAULT_DEVICE_TIMEOUT = 30.0
+MAX_WORKERS = 64
+
+
+@dataclass(frozen=True)
+class DeviceEntry:
+    """
+    A single device in a fleet inventory.
+    """
+    name: str
+    host: str
+    port: int = DEFAULT_PORT
+    adbkey: Optional[str] = None
+
+
+class DeviceInventory:
+    """
+    A named collection of devices, loaded from a JSON inventory file.
+
+    The inventory file is either a list of device objects or an object with a `devices` list. Each device object
+    needs a `host` and may have `name`, `port` and `adbkey`. Devices without an `adbkey` fall back to `fire_tv_adbkey`
+    from the core config.
+    """
+
+    def __init__(self, devices: Optional[Iterable[DeviceEntry]] = None):
+        self.__devices = {}
+
+        for device in devices or ():
+            self.add(device)
+
+    @classmethod
+    def from_core_config(cls) -> 'DeviceInventory':
+        """
+        Build a single-device inventory from the core configuration system.
+
+        Returns:
+            DeviceInventory:
+                An inventory holding the device described by `fire_tv_host` and `fire_tv_port`.
+        """
+        core = get_core_config()
+        host = getattr(core, 'fire_tv_host', None)
+
+        if not host:
+            return cls()
+
+        port = int(getattr(core, 'fire_tv_port', None) or DEFAULT_PORT)
+
+        return cls([DeviceEntry(f'{host}:{port}', host, port, getattr(core, 'fire_tv_adbkey', None))])
+
+    @classmethod
+    def load(cls, file_path: Optional[Union[str, Path]] = None) -> 'DeviceInventory':
+        """
+        Load an inventory from a JSON file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path to the inventory file. Defaults to `devices.json` in the user config directory.
+
+        Returns:
+            DeviceInventory:
+                The loaded inventory.
+
+        Raises:
+            InventoryError:
+                Raised when the file does not exist or does not describe a list of devices.
+        """
+        if file_path is None:
+            from inspyre_fire.config.constants import FILE_SYSTEM_DEFAULTS
+
+            file_path = FILE_SYSTEM_DEFAULTS['files']['inventory']
+
+        file_path = Path(file_path).expanduser().resolve().absolute()
+
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError as e:
+            raise InventoryError(file_path, 'File not found.') from e
+        except json.JSONDecodeError as e:
+            raise InventoryError(file_path, e) from e
+
+        if isinstance(data, dict):
+            data = data.get('devices')
+
+        if not isinstance(data, list):
+            raise InventoryError(file_path, 'Expected a list of devices.')
+
+        inventory = cls()
+
+        for index, item in enumerate(data):
+            if not isinstance(item, dict) or not item.get('host'):
+                raise InventoryError(file_path, f'Device #{index} has no host.')
+
+            port = int(item.get('port') or DEFAULT_PORT)
+            inventory.add(
+                    DeviceEntry(
+                            name=item.get('name') or f'{item["host"]}:{port}',
+                            host=item['host'],
+                            port=port,
+                            adbkey=item.get('adbkey'),
+                            )
+                    )
+
+        return inventory
+
+    @property
+    def devices(self) -> List[DeviceEntry]:
+        """
+        Get the devices in the inventory.
+
+        Returns:
+            List[DeviceEntry]:
+                The devices, in insertion order.
+        """
+        return list(self.__devices.values())
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Get the names of the devices in the inventory.
+
+        Returns:
+            List[str]:
+                The device names, in insertion order.
+        """
+        return list(self.__devices)
+
+    def add(self, device: DeviceEntry) -> None:
+        """
+        Add a device to the inventory.
+
+        Parameters:
+            device (DeviceEntry):
+                The device to add.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError:
+                Raised when a device with the same name is already in the inventory.
+        """
+        if device.name in self.__devices:
+            raise ValueError(f"Duplicate device name in inventory: '{device.name}'")
+
+        self.__devices[device.name] = device
+
+    def save(self, file_path: Optional[Union[str, Path]] = None) -> None:
+        """
+        Save the inventory to a JSON file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path to the inventory file. Defaults to `devices.json` in the user config directory.
+
+        Returns:
+            None
+        """
+        if file_path is None:
+            from inspyre_fire.config.constants import FILE_SYSTEM_DEFAULTS
+
+            file_path = FILE_SYSTEM_DEFAULTS['files']['inventory']
+
+        file_path = Path(file_path).expanduser().resolve().absolute()
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(file_path, 'w') as f:
+            json.dump({'devices': [asdict(device) for device in self.devices]}, f, indent=4)
+
+    def __contains__(self, name):
+        return name in self.__devices
+
+    def __getitem__(self, name) -> DeviceEntry:
+        return self.__devices[name]
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def __len__(self):
+        return len(self.__devices)
+
+
+@dataclass
+class FleetResult:
+    """
+    The aggregated outcome of an action fanned out to several devices.
+    """
+    results: Dict[str, object] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def failed(self) -> List[str]:
+        """The names of the devices the action failed on."""
+        return list(self.errors)
+
+    @property
+    def ok(self) -> bool:
+        """True if the action succeeded on every device."""
+        return not self.errors
+
+    @property
+    def succeeded(self) -> List[str]:
+        """The names of the devices the action succeeded on."""
+        return list(self.results)
+
+
+class FleetController:
+    """
+    Drive many Fire TV devices at once.
+
+    Every fleet-wide action is submitted to a thread pool, one task per device, so it takes roughly as long as the
+    slowest device rather than the sum of all of them. Each device gets its own deadline, measured from when its task
+    starts running.
+    """
+
+    def __init__(
+            self,
+            inventory: Optional[DeviceInventory] = None,
+            timeout: Optional[float] = DEFAULT_DEVICE_TIMEOUT,
+            max_workers: Optional[int] = None,
+            controller_factory: Optional[Callable[[DeviceEntry], Controller]] = None,
+            ):
+        """
+        Initialize a FleetController object.
+
+        Parameters:
+            inventory (DeviceInventory):
+                The devices to control. Defaults to the inventory file in the user config directory.
+
+            timeout (float):
+                The default per-device timeout (in seconds). None means no timeout.
+
+            max_workers (int):
+                The size of the thread pool. Defaults to one worker per device, capped at :data:`MAX_WORKERS`.
+
+            controller_factory (Callable[[DeviceEntry], Controller]):
+                Builds the controller for a device entry. Defaults to constructing a :class:`Controller`.
+        """
+        self.__inventory = inventory if inventory is not None else DeviceInventory.load()
+        self.__timeout = timeout
+        self.__max_workers = max_workers or max(1, min(MAX_WORKERS, len(self.__inventory)))
+        self.__controller_factory = controller_factory or self._build_controller
+        self.__controllers = {}
+        self.__executor = None
+
+    @staticmethod
+    def _build_controller(entry: DeviceEntry) -> Controller:
+        return Controller(
+                host=entry.host,
+                port=entry.port,
+                adbkey=entry.adbkey or getattr(get_core_config(), 'fire_tv_adbkey', None),
+                name=entry.name,
+                )
+
+    @property
+    def controllers(self) -> Dict[str, Controller]:
+        """
+        Get the controllers for every device in the inventory, creating them on first access.
+
+        Returns:
+            Dict[str, Controller]:
+                The controllers, keyed by device name.
+        """
+        for entry in self.__inventory:
+            if entry.name not in self.__controllers:
+                self.__controllers[entry.name] = self.__controller_factory(entry)
+
+        return self.__controllers
+
+    @property
+    def inventory(self) -> DeviceInventory:
+        """
+        Get the device inventory.
+
+        Returns:
+            DeviceInventory:
+                The device inventory.
+        """
+        return self.__inventory
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Get the thread pool used to fan out actions, creating it on first access.
+
+        Returns:
+            ThreadPoolExecutor:
+                The thread pool.
+        """
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix='fleet')
+
+        return self.__executor
+
+    def close_all(self) -> FleetResult:
+        """
+        Close the connection to every device and shut down the thread pool.
+
+        Returns:
+            FleetResult:
+                The outcome for each device.
+        """
+        result = self.run(lambda controller: controller.close())
+
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+        return result
+
+    def connect_all(self, timeout: Optional[float] = None, devices: Optional[Iterable[str]] = None) -> FleetResult:
+        """
+        Connect to every device concurrently.
+
+        Parameters:
+            timeout (float):
+                The per-device timeout (in seconds). Defaults to the fleet's timeout.
+
+            devices (Iterable[str]):
+                The names of the devices to connect to. Defaults to the whole inventory.
+
+        Returns:
+            FleetResult:
+                The outcome for each device.
+        """
+        timeout = self.__timeout if timeout is None else timeout
+
+        return self.run(lambda controller: controller.connect(timeout=timeout), timeout=timeout, devices=devices)
+
+    def run(
+            self,
+            action: Callable[[Controller], object],
+            timeout: Optional[float] = None,
+            devices: Optional[Iterable[str]] = None,
+            ) -> FleetResult:
+        """
+        Run an action against several devices in parallel.
+
+        Parameters:
+            action (Callable[[Controller], object]):
+                Called with each device's controller. Its return value is collected into the result.
+
+            timeout (float):
+                The per-device timeout (in seconds). Defaults to the fleet's timeout.
+
+            devices (Iterable[str]):
+                The names of the devices to run the action on. Defaults to the whole inventory.
+
+        Returns:
+            FleetResult:
+                The results and errors, keyed by device name.
+
+        Note:
+            A device that times out is reported with a :class:`DeviceTimeoutError`. Python cannot interrupt a running
+            thread, so the underlying call keeps its worker until it returns; pass the timeout down to the device call
+            (as :meth:`shell` does) to bound that.
+        """
+        timeout = self.__timeout if timeout is None else timeout
+        controllers = self.controllers
+        names = list(devices) if devices is not None else self.__inventory.names
+        result = FleetResult()
+        started = {}
+        start = time.monotonic()
+
+        def task(name):
+            started[name] = time.monotonic()
+            return action(controllers[name])
+
+        futures = {self.executor.submit(task, name): name for name in names}
+        pending = set(futures)
+
+        while pending:
+            wait_for = None
+
+            if timeout is not None:
+                deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                try:
+                    result.results[name] = future.result()
+                except Exception as e:
+                    result.errors[name] = e
+
+            if timeout is None:
+                continue
+
+            now = time.monotonic()
+
+            for future in list(pending):
+                name = futures[future]
+                if name in started and now - started[name] >= timeout:
+                    pending.discard(future)
+                    future.cancel()
+                    result.errors[name] = DeviceTimeoutError(name, timeout, skip_render=True)
+
+        result.elapsed = time.monotonic() - start
+
+        return result
+
+    def shell(
+            self,
+            command: str,
+            timeout: Optional[float] = None,
+            devices: Optional[Iterable[str]] = None,
+            ) -> FleetResult:
+        """
+        Run a shell command on several devices in parallel.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            timeout (float):
+                The per-device timeout (in seconds). Defaults to the fleet's timeout.
+
+            devices (Iterable[str]):
+                The names of the devices to run the command on. Defaults to the whole inventory.
+
+        Returns:
+            FleetResult:
+                The command output and errors, keyed by device name.
+        """
+        timeout = self.__timeout if timeout is None else timeout
+
+        return self.run(lambda controller: controller.shell(command, timeout=timeout), timeout=timeout, devices=devices)
+
+    def __enter__(self):
+        self.connect_all()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close_all()
+
+    def __repr__(self):
+        return f'<FleetController: {len(self.__inventory)} devices | @{hex(id(self))}>'
@@ -0,0 +1,492 @@
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+
+DEFAULT_HOLD_DURATION = 0.5
+LATENCY_SAMPLES = 100
+
+KEYCODES = {
+        'home':         3,
+        'back':         4,
+        'up':           19,
+        'down':         20,
+        'left':         21,
+        'right':        22,
+        'select':       23,
+        'center':       23,
+        'volume_up':    24,
+        'volume_down':  25,
+        'power':        26,
+        'enter':        66,
+        'menu':         82,
+        'search':       84,
+        'play_pause':   85,
+        'stop':         86,
+        'next':         87,
+        'previous':     88,
+        'rewind':       89,
+        'fast_forward': 90,
+        'mute':         164,
+        'sleep':        223,
+        'wakeup':       224,
+        }
+"""Friendly key names mapped to Android `KEYCODE_*` values."""
+
+ANDROID_KEYCODES = {
+        'home':               3,
+        'back':               4,
+        'dpad_up':            19,
+        'dpad_down':          20,
+        'dpad_left':          21,
+        'dpad_right':         22,
+        'dpad_center':        23,
+        'volume_up':          24,
+        'volume_down':        25,
+        'power':              26,
+        'enter':              66,
+        'menu':               82,
+        'search':             84,
+        'media_play_pause':   85,
+        'media_stop':         86,
+        'media_next':         87,
+        'media_previous':     88,
+        'media_rewind':       89,
+        'media_fast_forward': 90,
+        'volume_mute':        164,
+        'sleep':              223,
+        'wakeup':             224,
+        }
+"""Android's own `KEYCODE_*` names (lower-cased, without the prefix) for the keys in :data:`KEYCODES`."""
+
+SCANCODES = {
+        3:   172,  # KEY_HOMEPAGE
+        4:   158,  # KEY_BACK
+        19:  103,  # KEY_UP
+        20:  108,  # KEY_DOWN
+        21:  105,  # KEY_LEFT
+        22:  106,  # KEY_RIGHT
+        23:  353,  # KEY_SELECT
+        24:  115,  # KEY_VOLUMEUP
+        25:  114,  # KEY_VOLUMEDOWN
+        26:  116,  # KEY_POWER
+        66:  28,   # KEY_ENTER
+        82:  139,  # KEY_MENU
+        84:  217,  # KEY_SEARCH
+        85:  164,  # KEY_PLAYPAUSE
+        86:  128,  # KEY_STOP
+        87:  163,  # KEY_NEXTSONG
+        88:  165,  # KEY_PREVIOUSSONG
+        89:  168,  # KEY_REWIND
+        90:  208,  # KEY_FASTFORWARD
+        164: 113,  # KEY_MUTE
+        223: 142,  # KEY_SLEEP
+        224: 143,  # KEY_WAKEUP
+        }
+"""Android keycodes mapped to the Linux input event codes written by the `sendevent` backend."""
+
+BACKENDS = ('input', 'sendevent')
+
+
+def resolve_keycode(key: Union[int, str]) -> int:
+    """
+    Resolve a key name or number to an Android keycode.
+
+    Parameters:
+        key (Union[int, str]):
+            A keycode, a friendly name from :data:`KEYCODES`, or a `KEYCODE_*` name.
+
+    Returns:
+        int:
+            The Android keycode.
+
+    Raises:
+        ValueError:
+            Raised when the key is not recognised.
+    """
+    if isinstance(key, int):
+        return key
+
+    name = key.lower()
+
+    if name.startswith('keycode_'):
+        name = name[len('keycode_'):]
+
+    if name.isdigit():
+        return int(name)
+
+    if name in KEYCODES:
+        return KEYCODES[name]
+
+    if name in ANDROID_KEYCODES:
+        return ANDROID_KEYCODES[name]
+
+    raise ValueError(f"Unknown key: '{key}'")
+
+
+@dataclass(frozen=True)
+class KeyPress:
+    """
+    A key press waiting to be sent to the device.
+    """
+    keycode: int
+    repeat: int = 1
+    hold: bool = False
+    queued_at: float = 0.0
+
+
+def build_input_script(presses: List[KeyPress]) -> str:
+    """
+    Build a shell script that sends key presses, in order, with `input keyevent`.
+
+    Runs of plain presses are passed to a single `input keyevent` command.
+
+    Parameters:
+        presses (List[KeyPress]):
+            The key presses to send.
+
+    Returns:
+        str:
+            The script.
+    """
+    commands = []
+    run = []
+
+    for press in presses:
+        if not press.hold:
+            run.extend([str(press.keycode)] * press.repeat)
+            continue
+
+        if run:
+            commands.append(f'input keyevent {" ".join(run)}')
+            run = []
+
+        commands.extend([f'input keyevent --longpress {press.keycode}'] * press.repeat)
+
+    if run:
+        commands.append(f'input keyevent {" ".join(run)}')
+
+    return '; '.join(commands)
+
+
+def build_sendevent_script(
+        presses: List[KeyPress],
+        device_node: str,
+        hold_duration: Optional[float] = DEFAULT_HOLD_DURATION,
+        ) -> str:
+    """
+    Build a shell script that sends key presses, in order, as raw input events with `sendevent`.
+
+    Parameters:
+        presses (List[KeyPress]):
+            The key presses to send.
+
+        device_node (str):
+            The input device node to write to, e.g. '/dev/input/event3'.
+
+        hold_duration (float):
+            How long (in seconds) a held key stays down.
+
+    Returns:
+        str:
+            The script.
+
+    Raises:
+        ValueError:
+            Raised when a keycode has no known input event code.
+    """
+    commands = []
+
+    for press in presses:
+        if press.keycode not in SCANCODES:
+            raise ValueError(f"No input event code known for keycode {press.keycode}.")
+
+        code = SCANCODES[press.keycode]
+
+        for _ in range(press.repeat):
+            commands.append(f'sendevent {device_node} 1 {code} 1; sendevent {device_node} 0 0 0')
+
+            if press.hold:
+                commands.append(f'sleep {hold_duration}')
+
+            commands.append(f'sendevent {device_node} 1 {code} 0; sendevent {device_node} 0 0 0')
+
+    return '; '.join(commands)
+
+
+class KeyInputSession:
+    """
+    Send key presses to a device, in order, from a background writer thread.
+
+    The session is the writer, not the shell: presses are queued, and whatever has piled up by the time the writer is
+    free is sent together in one shell invocation over the controller's connection. A burst of navigation keys costs
+    one round trip instead of one per key, but an isolated press still pays for opening and closing a shell channel.
+
+    Two backends are available:
+
+    * ``sendevent`` is the low-latency path. It writes raw key events to an input device node with ``sendevent``, a
+      small native binary, so a press costs little more than the shell round trip. It needs the node of a key-capable
+      input device (see ``getevent -pl``).
+    * ``input`` (default, as it works on every device without setup) sends ``input keyevent`` commands, passing runs
+      of plain presses as one command. Every command starts the Android runtime on the device, which typically costs
+      hundreds of milliseconds per batch.
+
+    ``python -m benchmarks.bench_keys`` measures the press-to-accept latency of both backends against the local ADB
+    stand-in.
+    """
+
+    def __init__(
+            self,
+            controller,
+            backend: Optional[str] = 'input',
+            device_node: Optional[str] = None,
+            hold_duration: Optional[float] = DEFAULT_HOLD_DURATION,
+            auto_start: Optional[bool] = True,
+            ):
+        """
+        Initialize a KeyInputSession object.
+
+        Parameters:
+            controller (Controller):
+                The controller to send key presses through.
+
+            backend (str):
+                Either 'input' or 'sendevent'.
+
+            device_node (str):
+                The input device node written by the 'sendevent' backend, e.g. '/dev/input/event0'.
+
+            hold_duration (float):
+                How long (in seconds) a held key stays down with the 'sendevent' backend.
+
+            auto_start (bool):
+                If True, the writer thread is started immediately.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid backend: '{backend}'. Valid backends: {BACKENDS}")
+
+        if backend == 'sendevent' and not device_node:
+            raise ValueError("The 'sendevent' backend needs a `device_node`.")
+
+        self.__controller = controller
+        self.__backend = backend
+        self.__device_node = device_node
+        self.__hold_duration = hold_duration
+        self.__queue = queue.Queue()
+        self.__thread = None
+        self.__stop = threading.Event()
+        self.__latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.__errors = deque(maxlen=LATENCY_SAMPLES)
+
+        if auto_start:
+            self.start()
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        """
+        Get the average time (in seconds) between queueing a key press and the device accepting it.
+
+        Returns:
+            float:
+                The average over the most recent presses, or None if nothing has been sent yet.
+        """
+        if not self.__latencies:
+            return None
+
+        return sum(self.__latencies) / len(self.__latencies)
+
+    @property
+    def backend(self) -> str:
+        """
+        Get the name of the backend in use.
+
+        Returns:
+            str:
+                Either 'input' or 'sendevent'.
+        """
+        return self.__backend
+
+    @property
+    def errors(self) -> List[BaseException]:
+        """
+        Get the most recent errors raised while sending key presses.
+
+        Returns:
+            List[BaseException]:
+                The errors, oldest first.
+        """
+        return list(self.__errors)
+
+    @property
+    def latencies(self) -> List[float]:
+        """
+        Get the time (in seconds) between queueing each of the most recent key presses and the device accepting it.
+
+        Returns:
+            List[float]:
+                The latencies, oldest first.
+        """
+        return list(self.__latencies)
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of key presses waiting to be sent.
+
+        Returns:
+            int:
+                The number of queued key presses.
+        """
+        return self.__queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the writer thread is running.
+
+        Returns:
+            bool:
+                True if the writer thread is running, False otherwise.
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def _build_script(self, presses: List[KeyPress]) -> str:
+        """
+        Build the shell script that sends a run of key presses, in order.
+
+        Parameters:
+            presses (List[KeyPress]):
+                The key presses to send.
+
+        Returns:
+            str:
+                The script.
+        """
+        if self.__backend == 'sendevent':
+            return build_sendevent_script(presses, self.__device_node, self.__hold_duration)
+
+        return build_input_script(presses)
+
+    def _drain(self) -> List[KeyPress]:
+        presses = []
+
+        while True:
+            try:
+                presses.append(self.__queue.get_nowait())
+            except queue.Empty:
+                return presses
+
+    def _run(self):
+        while not self.__stop.is_set():
+            try:
+                first = self.__queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            presses = [first] + self._drain()
+
+            try:
+                self.__controller.shell(self._build_script(presses))
+            except Exception as e:
+                self.__errors.append(e)
+            else:
+                sent_at = time.monotonic()
+                self.__latencies.extend(sent_at - press.queued_at for press in presses)
+            finally:
+                for _ in presses:
+                    self.__queue.task_done()
+
+    def press(self, key: Union[int, str], repeat: Optional[int] = 1, hold: Optional[bool] = False) -> None:
+        """
+        Queue a key press.
+
+        Parameters:
+            key (Union[int, str]):
+                A keycode, a friendly name from :data:`KEYCODES`, or a `KEYCODE_*` name.
+
+            repeat (int):
+                How many times to press the key.
+
+            hold (bool):
+                If True, the key is held down (a long press) instead of tapped.
+
+        Returns:
+            None
+        """
+        if repeat < 1:
+            raise ValueError('`repeat` must be at least 1.')
+
+        self.__queue.put(KeyPress(resolve_keycode(key), repeat, hold, time.monotonic()))
+
+    def start(self) -> None:
+        """
+        Start the writer thread.
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self._run, name='key-input', daemon=True)
+        self.__thread.start()
+
+    def stop(self, flush: Optional[bool] = True) -> None:
+        """
+        Stop the writer thread.
+
+        Parameters:
+            flush (bool):
+                If True, wait for queued key presses to be sent first. Otherwise, they are discarded.
+
+        Returns:
+            None
+        """
+        if flush and self.running:
+            self.wait()
+        else:
+            for _ in self._drain():
+                self.__queue.task_done()
+
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for every queued key press to be sent.
+
+        Parameters:
+            timeout (float):
+                The longest time (in seconds) to wait. If None, wait indefinitely.
+
+        Returns:
+            bool:
+                True if the queue was emptied, False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.__queue.all_tasks_done:
+            while self.__queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    return False
+
+                self.__queue.all_tasks_done.wait(remaining)
+
+        return True
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,440 @@
+import asyncio
+import re
+import shlex
+import sys
+import threading
+from collections import deque
+from typing import Iterable, List, Optional
+from inspyre_fire.controller.parsers import iter_lines
+
+
+DEFAULT_BUFFER_SIZE = 10_000
+DEFAULT_READ_TIMEOUT = 3600.0
+POLL_INTERVAL = 0.1
+PRIORITIES = 'VDIWEFS'
+OVERFLOW_POLICIES = ('drop_oldest', 'block')
+
+LINE_PATTERN = re.compile(
+        r'^(?P<timestamp>\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(?P<pid>\d+)\s+(?P<tid>\d+)\s+'
+        r'(?P<priority>[VDIWEFS])\s(?P<tag>.*?)\s*: (?P<message>.*)$'
+        )
+"""Matches a line of `logcat -v threadtime` output."""
+
+
+class LogRecord:
+    """
+    A single parsed logcat line.
+
+    Records use `__slots__` and share (interned) tag strings, so a full ring buffer costs little more than the
+    messages themselves.
+    """
+    __slots__ = ('timestamp', 'pid', 'tid', 'priority', 'tag', 'message')
+
+    def __init__(self, timestamp: str, pid: int, tid: int, priority: str, tag: str, message: str):
+        self.timestamp = timestamp
+        self.pid = pid
+        self.tid = tid
+        self.priority = priority
+        self.tag = tag
+        self.message = message
+
+    @classmethod
+    def parse(cls, line: str) -> Optional['LogRecord']:
+        """
+        Parse a line of `logcat -v threadtime` output.
+
+        Parameters:
+            line (str):
+                The line to parse, without its line terminator.
+
+        Returns:
+            LogRecord:
+                The record, or None if the line is not a log entry (e.g. a `--------- beginning of main` banner).
+        """
+        match = LINE_PATTERN.match(line)
+
+        if match is None:
+            return None
+
+        return cls(
+                match['timestamp'],
+                int(match['pid']),
+                int(match['tid']),
+                sys.intern(match['priority']),
+                sys.intern(match['tag']),
+                match['message'],
+                )
+
+    def __repr__(self):
+        return f'<LogRecord: {self.timestamp} {self.priority}/{self.tag}({self.pid}): {self.message!r}>'
+
+
+def build_logcat_command(
+        tags: Optional[Iterable[str]] = None,
+        priority: Optional[str] = 'V',
+        buffers: Optional[Iterable[str]] = None,
+        tail: Optional[int] = None,
+        ) -> str:
+    """
+    Build a `logcat` command whose filtering happens on the device, so filtered-out lines never cross the wire.
+
+    Parameters:
+        tags (Iterable[str]):
+            Only include these tags. If None, every tag is included.
+
+        priority (str):
+            The lowest priority to include; one of 'V', 'D', 'I', 'W', 'E', 'F' or 'S'.
+
+        buffers (Iterable[str]):
+            The log buffers to read (e.g. 'main', 'system', 'crash'). If None, logcat's defaults are used.
+
+        tail (int):
+            Start with this many of the most recent lines instead of the whole buffer.
+
+    Returns:
+        str:
+            The command.
+    """
+    priority = priority.upper()
+
+    if priority not in PRIORITIES:
+        raise ValueError(f"Invalid priority: '{priority}'. Valid priorities: {list(PRIORITIES)}")
+
+    parts = ['logcat', '-v', 'threadtime']
+
+    for buffer in buffers or ():
+        parts.extend(['-b', shlex.quote(buffer)])
+
+    if tail is not None:
+        parts.extend(['-T', str(int(tail))])
+
+    if tags:
+        parts.extend(shlex.quote(f'{tag}:{priority}') for tag in tags)
+        parts.append(shlex.quote('*:S'))
+    else:
+        parts.append(shlex.quote(f'*:{priority}'))
+
+    return ' '.join(parts)
+
+
+class LogcatStream:
+    """
+    Tail a device's logcat into a bounded ring buffer.
+
+    A reader thread pulls output from the device incrementally, parses it into :class:`LogRecord` objects and appends
+    them to a ring buffer holding at most `buffer_size` records. When the consumer falls behind, the `overflow` policy
+    decides what gives:
+
+    * ``drop_oldest`` (default) discards the oldest buffered record and counts it in :attr:`dropped`.
+    * ``block`` stops reading from the device until there is room, so the connection's flow control pushes back on
+      the device instead.
+
+    The stream reads over a connection of its own (see :meth:`Controller.open_connection`), so stopping it never
+    disturbs the controller's shared connection.
+
+    Iterate over the stream (``for record in stream``, or ``async for`` in a coroutine) to consume records.
+    """
+
+    def __init__(
+            self,
+            controller,
+            command: str,
+            buffer_size: Optional[int] = DEFAULT_BUFFER_SIZE,
+            overflow: Optional[str] = 'drop_oldest',
+            read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+            auto_start: Optional[bool] = True,
+            ):
+        """
+        Initialize a LogcatStream object.
+
+        Parameters:
+            controller (Controller):
+                The controller to stream from.
+
+            command (str):
+                The logcat command to run. See :func:`build_logcat_command`.
+
+            buffer_size (int):
+                The largest number of records held in memory at once.
+
+            overflow (str):
+                Either 'drop_oldest' or 'block'.
+
+            read_timeout (float):
+                How long (in seconds) the device may stay silent before the stream is considered dead.
+
+            auto_start (bool):
+                If True, the reader thread is started immediately.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: '{overflow}'. Valid policies: {OVERFLOW_POLICIES}")
+
+        if buffer_size < 1:
+            raise ValueError('`buffer_size` must be at least 1.')
+
+        self.__controller = controller
+        self.__command = command
+        self.__buffer_size = buffer_size
+        self.__overflow = overflow
+        self.__read_timeout = read_timeout
+        self.__buffer = deque()
+        self.__condition = threading.Condition()
+        self.__stop = threading.Event()
+        self.__finished = False
+        self.__thread = None
+        self.__connection = None
+        self.__chunks = None
+        self.__error = None
+        self.__dropped = 0
+        self.__received = 0
+        self.__unparsed = 0
+
+        if auto_start:
+            self.start()
+
+    @property
+    def command(self) -> str:
+        """
+        Get the logcat command being run.
+
+        Returns:
+            str:
+                The command.
+        """
+        return self.__command
+
+    @property
+    def dropped(self) -> int:
+        """
+        Get the number of records discarded because the buffer was full.
+
+        Returns:
+            int:
+                The number of dropped records.
+        """
+        return self.__dropped
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """
+        Get the error that ended the stream, if any.
+
+        Returns:
+            BaseException:
+                The error, or None.
+        """
+        return self.__error
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of buffered records not consumed yet.
+
+        Returns:
+            int:
+                The number of buffered records.
+        """
+        return len(self.__buffer)
+
+    @property
+    def received(self) -> int:
+        """
+        Get the number of records parsed so far.
+
+        Returns:
+            int:
+                The number of records parsed.
+        """
+        return self.__received
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the reader thread is running.
+
+        Returns:
+            bool:
+                True if the reader thread is running, False otherwise.
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    @property
+    def unparsed(self) -> int:
+        """
+        Get the number of lines that were not log entries (banners, blank lines).
+
+        Returns:
+            int:
+                The number of skipped lines.
+        """
+        return self.__unparsed
+
+    def _put(self, record: LogRecord) -> bool:
+        with self.__condition:
+            if len(self.__buffer) >= self.__buffer_size:
+                if self.__overflow == 'drop_oldest':
+                    self.__buffer.popleft()
+                    self.__dropped += 1
+                else:
+                    while len(self.__buffer) >= self.__buffer_size and not self.__stop.is_set():
+                        self.__condition.wait(POLL_INTERVAL)
+
+                    if self.__stop.is_set():
+                        return False
+
+            self.__buffer.append(record)
+            self.__received += 1
+            self.__condition.notify_all()
+
+        return True
+
+    def _run(self):
+        chunks = self.__chunks
+
+        try:
+            for line in iter_lines(chunks):
+                if self.__stop.is_set():
+                    break
+
+                record = LogRecord.parse(line)
+
+                if record is None:
+                    self.__unparsed += 1
+                    continue
+
+                if not self._put(record):
+                    break
+        except Exception as e:
+            # Closing the connection in `stop` ends the read with an error; that is not a failure of the stream.
+            if not self.__stop.is_set():
+                self.__error = e
+        finally:
+            self._close_chunks()
+            self.__connection.close()
+
+            with self.__condition:
+                self.__finished = True
+                self.__condition.notify_all()
+
+    def _close_chunks(self) -> bool:
+        try:
+            self.__chunks.close()
+        except ValueError:
+            # The reader thread is inside the generator, waiting for output.
+            return False
+
+        return True
+
+    def drain(self, max_records: Optional[int] = None) -> List[LogRecord]:
+        """
+        Take every buffered record without waiting.
+
+        Parameters:
+            max_records (int):
+                The largest number of records to take. If None, take them all.
+
+        Returns:
+            List[LogRecord]:
+                The records, oldest first.
+        """
+        with self.__condition:
+            count = len(self.__buffer) if max_records is None else min(max_records, len(self.__buffer))
+            records = [self.__buffer.popleft() for _ in range(count)]
+            self.__condition.notify_all()
+
+        return records
+
+    def get(self, timeout: Optional[float] = None) -> Optional[LogRecord]:
+        """
+        Take the oldest buffered record, waiting for one if the buffer is empty.
+
+        Parameters:
+            timeout (float):
+                The longest time (in seconds) to wait. If None, wait until a record arrives or the stream ends.
+
+        Returns:
+            LogRecord:
+                The record, or None if the timeout expired or the stream ended (or was stopped) with nothing buffered.
+        """
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__buffer or self.__finished or self.__stop.is_set(), timeout):
+                return None
+
+            if not self.__buffer:
+                return None
+
+            record = self.__buffer.popleft()
+            self.__condition.notify_all()
+
+        return record
+
+    def start(self) -> None:
+        """
+        Start the reader thread.
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+
+        self.__stop.clear()
+        self.__finished = False
+        self.__connection = self.__controller.open_connection()
+        self.__chunks = self.__connection.streaming_shell(self.__command, read_timeout_s=self.__read_timeout)
+        self.__thread = threading.Thread(target=self._run, name='logcat', daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the stream and close the `logcat` command. Records already buffered can still be consumed.
+
+        If the reader thread is waiting for output, the stream's own connection is closed to interrupt the read.
+
+        Returns:
+            None
+        """
+        self.__stop.set()
+
+        with self.__condition:
+            self.__condition.notify_all()
+
+        if self.running and not self._close_chunks():
+            self.__connection.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> LogRecord:
+        loop = asyncio.get_running_loop()
+
+        # Wait in short slices, so an executor thread is never held for longer than `POLL_INTERVAL` and a cancelled
+        # consumer lets go of it promptly.
+        while True:
+            record = await loop.run_in_executor(None, self.get, POLL_INTERVAL)
+
+            if record is not None:
+                return record
+
+            with self.__condition:
+                if not self.__buffer and (self.__finished or self.__stop.is_set()):
+                    raise StopAsyncIteration
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> LogRecord:
+        record = self.get()
+
+        if record is None:
+            raise StopIteration
+
+        return record
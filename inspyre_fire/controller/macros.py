@@ -0,0 +1,322 @@
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from inspyre_fire.controller.keys import (
+    BACKENDS,
+    DEFAULT_HOLD_DURATION,
+    KeyPress,
+    build_input_script,
+    build_sendevent_script,
+    resolve_keycode,
+    )
+
+
+DEFAULT_MIN_DELAY = 0.05
+"""Gaps between recorded steps shorter than this (in seconds) are dropped when a macro is compiled."""
+
+
+@dataclass(frozen=True)
+class MacroStep:
+    """
+    A single key press in a macro, and how long after the previous step it happened.
+    """
+    keycode: int
+    hold: bool = False
+    delay: float = 0.0
+
+
+@dataclass
+class Macro:
+    """
+    A named sequence of key presses that can be replayed on any number of devices.
+
+    A macro is compiled into a single shell script (runs of quick presses become one `input keyevent` command, and
+    the recorded pauses become `sleep` commands), so replaying it costs one round trip to the device no matter how
+    many keys it presses. Compiled scripts are cached per backend.
+    """
+    name: str
+    steps: List[MacroStep] = field(default_factory=list)
+    _compiled: Dict[Tuple, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Macro':
+        """
+        Build a macro from the structure written by :meth:`to_dict`.
+
+        Parameters:
+            data (dict):
+                The macro's name and steps.
+
+        Returns:
+            Macro:
+                The macro.
+        """
+        return cls(data['name'], [MacroStep(**step) for step in data.get('steps', [])])
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'Macro':
+        """
+        Load a macro from a JSON file written by :meth:`save`.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path of the file.
+
+        Returns:
+            Macro:
+                The macro.
+        """
+        file_path = Path(file_path).expanduser().resolve().absolute()
+
+        with open(file_path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    @property
+    def duration(self) -> float:
+        """The recorded length of the macro (in seconds), not counting how long held keys stay down."""
+        return sum(step.delay for step in self.steps)
+
+    def add(self, key: Union[int, str], hold: Optional[bool] = False, delay: Optional[float] = 0.0) -> 'Macro':
+        """
+        Append a key press to the macro.
+
+        Parameters:
+            key (Union[int, str]):
+                A keycode, a friendly name from :data:`KEYCODES`, or a `KEYCODE_*` name.
+
+            hold (bool):
+                If True, the key is held down (a long press) instead of tapped.
+
+            delay (float):
+                How long (in seconds) to wait after the previous step.
+
+        Returns:
+            Macro:
+                The macro, so calls can be chained.
+        """
+        self.steps.append(MacroStep(resolve_keycode(key), hold, delay))
+        self._compiled.clear()
+
+        return self
+
+    def compile(
+            self,
+            backend: Optional[str] = 'input',
+            device_node: Optional[str] = None,
+            hold_duration: Optional[float] = DEFAULT_HOLD_DURATION,
+            min_delay: Optional[float] = DEFAULT_MIN_DELAY,
+            ) -> str:
+        """
+        Compile the macro into a single shell script.
+
+        Parameters:
+            backend (str):
+                'input' or 'sendevent'. See :class:`KeyInputSession`.
+
+            device_node (str):
+                The input device node, for the 'sendevent' backend.
+
+            hold_duration (float):
+                How long (in seconds) a held key stays down, for the 'sendevent' backend.
+
+            min_delay (float):
+                Pauses shorter than this (in seconds) are dropped, letting the presses on either side share one
+                command. Pass None to drop every pause.
+
+        Returns:
+            str:
+                The script.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid backend: '{backend}'. Valid backends: {BACKENDS}")
+
+        if backend == 'sendevent' and not device_node:
+            raise ValueError("The 'sendevent' backend needs a `device_node`.")
+
+        key = (backend, device_node, hold_duration, min_delay)
+
+        if key not in self._compiled:
+            self._compiled[key] = self._build(backend, device_node, hold_duration, min_delay)
+
+        return self._compiled[key]
+
+    def _build(self, backend, device_node, hold_duration, min_delay) -> str:
+        segments = []
+        presses = []
+
+        def flush():
+            if not presses:
+                return
+
+            if backend == 'sendevent':
+                segments.append(build_sendevent_script(presses, device_node, hold_duration))
+            else:
+                segments.append(build_input_script(presses))
+
+            presses.clear()
+
+        for step in self.steps:
+            if min_delay is not None and step.delay >= min_delay and (presses or segments):
+                flush()
+                segments.append(f'sleep {step.delay:.3f}')
+
+            presses.append(KeyPress(step.keycode, hold=step.hold))
+
+        flush()
+
+        return '; '.join(segments)
+
+    def play(self, controller, timeout: Optional[float] = None, **compile_options) -> float:
+        """
+        Replay the macro on a device in a single shell invocation.
+
+        Parameters:
+            controller (Controller):
+                The controller of the device.
+
+            timeout (float):
+                The total time (in seconds) to allow the replay to run. If None, there is no limit.
+
+            **compile_options:
+                Passed to :meth:`compile`.
+
+        Returns:
+            float:
+                The time (in seconds) the replay took.
+        """
+        script = self.compile(**compile_options)
+        start = time.perf_counter()
+
+        if script:
+            controller.shell(script, timeout=timeout)
+
+        return time.perf_counter() - start
+
+    def play_fleet(self, fleet, timeout: Optional[float] = None, devices=None, **compile_options):
+        """
+        Replay the macro on several devices concurrently.
+
+        Parameters:
+            fleet (FleetController):
+                The fleet to replay on.
+
+            timeout (float):
+                The per-device timeout (in seconds). Defaults to the fleet's timeout.
+
+            devices (Iterable[str]):
+                The names of the devices to replay on. Defaults to the whole inventory.
+
+            **compile_options:
+                Passed to :meth:`compile`.
+
+        Returns:
+            FleetResult:
+                The replay time of each device, and errors, keyed by device name.
+        """
+        # Compile once up front, rather than racing to fill the cache from every worker.
+        self.compile(**compile_options)
+
+        return fleet.run(
+                lambda controller: self.play(controller, timeout=timeout, **compile_options),
+                timeout=timeout,
+                devices=devices,
+                )
+
+    def save(self, file_path: Union[str, Path]) -> Path:
+        """
+        Save the macro to a JSON file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The path of the file.
+
+        Returns:
+            Path:
+                The path the macro was written to.
+        """
+        file_path = Path(file_path).expanduser().resolve().absolute()
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+        return file_path
+
+    def to_dict(self) -> dict:
+        """
+        Get the macro as a JSON-serializable structure.
+
+        Returns:
+            dict:
+                The macro's name and steps.
+        """
+        return {'name': self.name, 'steps': [asdict(step) for step in self.steps]}
+
+    def __len__(self):
+        return len(self.steps)
+
+
+class MacroRecorder:
+    """
+    Record key presses, with the time between them, into a :class:`Macro`.
+
+    If a controller is given, every press is also sent to its device as it is recorded, so the macro can be recorded
+    by driving a real device.
+    """
+
+    def __init__(self, name: str, controller=None):
+        """
+        Initialize a MacroRecorder object.
+
+        Parameters:
+            name (str):
+                The name of the macro.
+
+            controller (Controller):
+                If given, presses are forwarded to this controller's key input session as they are recorded.
+        """
+        self.__macro = Macro(name)
+        self.__controller = controller
+        self.__last = None
+
+    @property
+    def macro(self) -> Macro:
+        """
+        Get the macro recorded so far.
+
+        Returns:
+            Macro:
+                The macro.
+        """
+        return self.__macro
+
+    def press(self, key: Union[int, str], hold: Optional[bool] = False) -> None:
+        """
+        Record a key press.
+
+        Parameters:
+            key (Union[int, str]):
+                A keycode, a friendly name from :data:`KEYCODES`, or a `KEYCODE_*` name.
+
+            hold (bool):
+                If True, the key is held down (a long press) instead of tapped.
+
+        Returns:
+            None
+        """
+        now = time.monotonic()
+        delay = 0.0 if self.__last is None else now - self.__last
+        self.__last = now
+        self.__macro.add(key, hold, delay)
+
+        if self.__controller is not None:
+            self.__controller.keys.press(key, hold=hold)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__controller is not None:
+            self.__controller.keys.wait()
@@ -0,0 +1,219 @@
+import re
+from typing import Dict, Iterable, Iterator, Optional, Pattern, Set, Union
+
+
+PACKAGE_HEADER = re.compile(r'^\s*Package \[(?P<name>[^\]]+)\]')
+PACKAGE_FIELDS = {
+        'uid':          re.compile(r'^\s*(?:userId|appId)=(?P<value>\d+)'),
+        'version_code': re.compile(r'^\s*versionCode=(?P<value>\d+)'),
+        'version_name': re.compile(r'^\s*versionName=(?P<value>\S*)'),
+        }
+"""Patterns for the per-package lines of `dumpsys package` that :func:`parse_dumpsys_packages` extracts."""
+
+PM_LIST_LINE = re.compile(r'^package:(?P<name>\S+)(?:\s+versionCode:(?P<version_code>\d+))?(?:\s+uid:(?P<uid>\d+))?')
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Split a stream of text chunks into lines, carrying partial lines over to the next chunk.
+
+    Parameters:
+        chunks (Iterable[str]):
+            The chunks, as read from the device.
+
+    Yields:
+        str:
+            Each complete line, without its line terminator.
+    """
+    partial = ''
+
+    for chunk in chunks:
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+
+        for line in lines:
+            yield line.rstrip('\r')
+
+    if partial:
+        yield partial.rstrip('\r')
+
+
+def _close(lines: Iterable[str]) -> None:
+    # This only stops reading: adb-shell does not close the command on the device, so the rest of its output is still
+    # sent. Commands read with an early exit should be narrowed on the device so they end by themselves.
+    close = getattr(lines, 'close', None)
+
+    if close is not None:
+        close()
+
+
+class PackageInfo:
+    """
+    The version and uid of an installed package.
+    """
+    __slots__ = ('name', 'version_code', 'version_name', 'uid')
+
+    def __init__(
+            self,
+            name: str,
+            version_code: Optional[int] = None,
+            version_name: Optional[str] = None,
+            uid: Optional[int] = None,
+            ):
+        self.name = name
+        self.version_code = version_code
+        self.version_name = version_name
+        self.uid = uid
+
+    def __eq__(self, other):
+        if not isinstance(other, PackageInfo):
+            return NotImplemented
+
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f'<PackageInfo: {self.name} {self.version_name} ({self.version_code}) | uid={self.uid}>'
+
+
+def find_fields(
+        lines: Iterable[str],
+        patterns: Dict[str, Union[str, Pattern]],
+        ) -> Dict[str, Optional[str]]:
+    """
+    Scan lines for the first match of each pattern, stopping as soon as every pattern has matched.
+
+    Parameters:
+        lines (Iterable[str]):
+            The lines to scan, e.g. ``controller.stream_lines('dumpsys power | grep -m 2 mWakefulness')``.
+
+        patterns (Dict[str, Union[str, Pattern]]):
+            The fields to find, mapped to a pattern whose first group (or whole match, if it has no groups) is the
+            value.
+
+    Returns:
+        Dict[str, Optional[str]]:
+            The value of each field, or None for fields that never matched.
+    """
+    compiled = {name: re.compile(pattern) if isinstance(pattern, str) else pattern for name, pattern in
+                patterns.items()}
+    found = dict.fromkeys(compiled)
+    remaining = dict(compiled)
+
+    try:
+        for line in lines:
+            for name, pattern in list(remaining.items()):
+                match = pattern.search(line)
+
+                if match is None:
+                    continue
+
+                found[name] = match.group(1) if pattern.groups else match.group(0)
+                del remaining[name]
+
+            if not remaining:
+                break
+    finally:
+        _close(lines)
+
+    return found
+
+
+def parse_dumpsys_packages(
+        lines: Iterable[str],
+        packages: Optional[Iterable[str]] = None,
+        ) -> Dict[str, PackageInfo]:
+    """
+    Build a package index from `dumpsys package packages` output, line by line.
+
+    Parameters:
+        lines (Iterable[str]):
+            The lines of output.
+
+        packages (Iterable[str]):
+            Only index these packages, and stop reading as soon as all of them have been fully read. If None, every
+            package is indexed.
+
+    Returns:
+        Dict[str, PackageInfo]:
+            The index, keyed by package name.
+    """
+    wanted: Optional[Set[str]] = set(packages) if packages is not None else None
+    index = {}
+    current = None
+
+    try:
+        for line in lines:
+            header = PACKAGE_HEADER.match(line)
+
+            if header is not None:
+                name = header['name']
+
+                if wanted is not None and current is not None:
+                    wanted.discard(current.name)
+
+                    if not wanted:
+                        break
+
+                if wanted is None or name in wanted:
+                    current = index.setdefault(name, PackageInfo(name))
+                else:
+                    current = None
+
+                continue
+
+            if current is None:
+                continue
+
+            for field, pattern in PACKAGE_FIELDS.items():
+                if getattr(current, field) is not None:
+                    continue
+
+                match = pattern.match(line)
+
+                if match is not None:
+                    value = match['value']
+                    setattr(current, field, value if field == 'version_name' else int(value))
+                    break
+
+            if wanted is not None and all(getattr(current, field) is not None for field in PACKAGE_FIELDS):
+                wanted.discard(current.name)
+                current = None
+
+                if not wanted:
+                    break
+    finally:
+        _close(lines)
+
+    return index
+
+
+def parse_pm_list_packages(lines: Iterable[str]) -> Dict[str, PackageInfo]:
+    """
+    Build a package index from `pm list packages --show-versioncode -U` output, line by line.
+
+    Plain `pm list packages` output works too; the version code and uid are then None.
+
+    Parameters:
+        lines (Iterable[str]):
+            The lines of output.
+
+    Returns:
+        Dict[str, PackageInfo]:
+            The index, keyed by package name.
+    """
+    index = {}
+
+    for line in lines:
+        match = PM_LIST_LINE.match(line)
+
+        if match is None:
+            continue
+
+        version_code, uid = match['version_code'], match['uid']
+        index[match['name']] = PackageInfo(
+                match['name'],
+                int(version_code) if version_code else None,
+                uid=int(uid) if uid else None,
+                )
+
+    return index
@@ -0,0 +1,580 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from inspyre_fire.controller.errors import DeviceTimeoutError
+
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 5
+
+PRIORITIES = {
+        'interactive': 0,
+        'status':      1,
+        'bulk':        2,
+        }
+"""Priority classes mapped to their rank; a lower rank is served first."""
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: up to `capacity` commands may go out back to back, after which they are spaced out to
+    `rate` per second.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize a TokenBucket object.
+
+        Parameters:
+            rate (float):
+                The number of tokens added per second.
+
+            capacity (int):
+                The largest number of tokens the bucket holds.
+        """
+        if rate <= 0:
+            raise ValueError('`rate` must be greater than 0.')
+
+        if capacity < 1:
+            raise ValueError('`capacity` must be at least 1.')
+
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__tokens = float(capacity)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """
+        Get the number of tokens currently available.
+
+        Returns:
+            float:
+                The number of tokens.
+        """
+        with self.__lock:
+            self._refill(time.monotonic())
+
+            return self.__tokens
+
+    def _refill(self, now: float) -> None:
+        self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Take a token, waiting for one if the bucket is empty.
+
+        Parameters:
+            deadline (float):
+                Give up at this `time.monotonic()` value. If None, wait as long as it takes.
+
+        Returns:
+            bool:
+                True if a token was taken, False if the deadline passed first.
+        """
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return True
+
+                wait = (1 - self.__tokens) / self.__rate
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+
+            time.sleep(wait)
+
+
+@dataclass
+class QueueMetrics:
+    """
+    Counters and wait times for one priority class.
+    """
+    depth: int = 0
+    submitted: int = 0
+    completed: int = 0
+    coalesced: int = 0
+    expired: int = 0
+    cancelled: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> Optional[float]:
+        """The average time (in seconds) a command waited before it was sent, or None if none were sent."""
+        sent = self.completed
+
+        return self.total_wait / sent if sent else None
+
+
+class ScheduledCommand:
+    """
+    A shell command waiting in a :class:`CommandScheduler` queue.
+
+    `future` is the command's own future; each caller gets a future of its own from :meth:`add_caller`, resolved from
+    it, so one caller cancelling does not cancel the command for the others.
+    """
+    __slots__ = ('command', 'decode', 'priority', 'deadline', 'submitted_at', 'future', 'dispatched', 'callers', 'lock')
+
+    def __init__(self, command: str, decode: bool, priority: int, deadline: Optional[float]):
+        self.command = command
+        self.decode = decode
+        self.priority = priority
+        self.deadline = deadline
+        self.submitted_at = time.monotonic()
+        self.future = Future()
+        self.dispatched = False
+        self.callers = set()
+        self.lock = threading.RLock()
+        self.future.add_done_callback(self._resolve)
+
+    def add_caller(self) -> Optional[Future]:
+        """
+        Get a future for one more caller of the command.
+
+        Returns:
+            Optional[Future]:
+                The caller's future, or None if the command has already been cancelled.
+        """
+        caller = Future()
+
+        with self.lock:
+            if self.future.cancelled():
+                return None
+
+            self.callers.add(caller)
+
+        caller.add_done_callback(self._caller_done)
+
+        return caller
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return self.deadline is not None and (time.monotonic() if now is None else now) >= self.deadline
+
+    def _caller_done(self, caller: Future) -> None:
+        if not caller.cancelled():
+            return
+
+        with self.lock:
+            self.callers.discard(caller)
+
+            # Nobody wants the output any more; a command that is already running just finishes.
+            if not self.callers:
+                self.future.cancel()
+
+    def _resolve(self, future: Future) -> None:
+        with self.lock:
+            callers, self.callers = self.callers, set()
+
+        for caller in callers:
+            if future.cancelled():
+                caller.cancel()
+                continue
+
+            try:
+                if future.exception() is not None:
+                    caller.set_exception(future.exception())
+                else:
+                    caller.set_result(future.result())
+            except InvalidStateError:
+                # The caller cancelled in the meantime.
+                pass
+
+
+class CommandScheduler:
+    """
+    Serialize and pace the shell commands sent to a single device.
+
+    Commands are queued by priority class ('interactive' before 'status' before 'bulk', first come first served
+    within a class) and released through a token bucket, so a burst of callers cannot flood the device's ADB daemon.
+    A command that is still queued when its deadline passes is failed with :class:`DeviceTimeoutError` as soon as the
+    deadline passes, instead of being sent. Identical status queries that are queued at the same time are sent once
+    and share the result.
+
+    The scheduler is opt-in: only commands sent through :meth:`shell` or :meth:`submit` are paced. The controller's
+    own subsystems (key input, the state cache, logcat streams, transfers and batches) call :meth:`Controller.shell`
+    directly, so they neither wait in its queues nor count against its rate.
+    """
+
+    def __init__(
+            self,
+            controller,
+            rate: Optional[float] = DEFAULT_RATE,
+            burst: Optional[int] = DEFAULT_BURST,
+            max_concurrency: Optional[int] = 1,
+            auto_start: Optional[bool] = True,
+            ):
+        """
+        Initialize a CommandScheduler object.
+
+        Parameters:
+            controller (Controller):
+                The controller to send commands through.
+
+            rate (float):
+                The steady-state number of commands sent per second.
+
+            burst (int):
+                The number of commands that may be sent back to back before `rate` applies.
+
+            max_concurrency (int):
+                The largest number of commands in flight on the device at once.
+
+            auto_start (bool):
+                If True, start the worker threads immediately.
+        """
+        if max_concurrency < 1:
+            raise ValueError('`max_concurrency` must be at least 1.')
+
+        self.__controller = controller
+        self.__bucket = TokenBucket(rate, burst)
+        self.__max_concurrency = max_concurrency
+        self.__heap = []
+        self.__pending: Dict[tuple, ScheduledCommand] = {}
+        self.__deadlines = []
+        self.__counter = itertools.count()
+        lock = threading.RLock()
+        self.__condition = threading.Condition(lock)
+        self.__deadline_condition = threading.Condition(lock)
+        self.__metrics = {name: QueueMetrics() for name in PRIORITIES}
+        self.__names = {rank: name for name, rank in PRIORITIES.items()}
+        self.__threads: List[threading.Thread] = []
+        self.__stopping = False
+
+        if auto_start:
+            self.start()
+
+    @property
+    def bucket(self) -> TokenBucket:
+        """
+        Get the token bucket that paces the device.
+
+        Returns:
+            TokenBucket:
+                The token bucket.
+        """
+        return self.__bucket
+
+    @property
+    def depth(self) -> int:
+        """
+        Get the number of commands waiting to be sent, across every priority class.
+
+        Returns:
+            int:
+                The queue depth.
+        """
+        with self.__condition:
+            return sum(metrics.depth for metrics in self.__metrics.values())
+
+    @property
+    def metrics(self) -> Dict[str, QueueMetrics]:
+        """
+        Get a snapshot of the counters and wait times of each priority class.
+
+        Returns:
+            Dict[str, QueueMetrics]:
+                The metrics, keyed by priority class.
+        """
+        with self.__condition:
+            return {name: QueueMetrics(**vars(metrics)) for name, metrics in self.__metrics.items()}
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the worker threads are running.
+
+        Returns:
+            bool:
+                True if the scheduler is running, False otherwise.
+        """
+        return any(thread.is_alive() for thread in self.__threads)
+
+    def _expire(self, item: ScheduledCommand) -> None:
+        metrics = self.__metrics[self.__names[item.priority]]
+
+        if item.future.set_running_or_notify_cancel():
+            metrics.expired += 1
+            item.future.set_exception(
+                    DeviceTimeoutError(self.__controller.name, item.deadline - item.submitted_at, skip_render=True)
+                    )
+        else:
+            metrics.cancelled += 1
+
+    def _dequeue(self, item: ScheduledCommand) -> None:
+        item.dispatched = True
+        self.__metrics[self.__names[item.priority]].depth -= 1
+
+        if self.__pending.get((item.command, item.decode)) is item:
+            del self.__pending[(item.command, item.decode)]
+
+    def _expire_overdue(self):
+        with self.__deadline_condition:
+            while not self.__stopping:
+                now = time.monotonic()
+
+                while self.__deadlines and self.__deadlines[0][0] <= now:
+                    _, _, item = heapq.heappop(self.__deadlines)
+
+                    if item.dispatched or item.deadline is None:
+                        continue
+
+                    # A coalesced caller may have pushed the deadline back since the entry was added.
+                    if item.deadline > now:
+                        heapq.heappush(self.__deadlines, (item.deadline, next(self.__counter), item))
+                        continue
+
+                    # Its heap entry stays behind; the workers skip it because it is marked as dispatched.
+                    self._dequeue(item)
+                    self._expire(item)
+
+                self.__deadline_condition.wait(self.__deadlines[0][0] - now if self.__deadlines else None)
+
+    def _next(self) -> Optional[ScheduledCommand]:
+        with self.__condition:
+            while True:
+                while not self.__heap and not self.__stopping:
+                    self.__condition.wait()
+
+                if not self.__heap:
+                    return None
+
+                _, _, item = heapq.heappop(self.__heap)
+
+                # A coalesced command that was promoted to a higher priority has a second, stale heap entry.
+                if item.dispatched:
+                    continue
+
+                self._dequeue(item)
+
+                if item.future.cancelled():
+                    self.__metrics[self.__names[item.priority]].cancelled += 1
+                    continue
+
+                return item
+
+    def _run(self):
+        while True:
+            item = self._next()
+
+            if item is None:
+                return
+
+            if item.expired() or not self.__bucket.acquire(item.deadline):
+                with self.__condition:
+                    self._expire(item)
+
+                continue
+
+            if not item.future.set_running_or_notify_cancel():
+                with self.__condition:
+                    self.__metrics[self.__names[item.priority]].cancelled += 1
+
+                continue
+
+            waited = time.monotonic() - item.submitted_at
+
+            try:
+                output = self.__controller.shell(item.command, decode=item.decode)
+            except BaseException as e:
+                item.future.set_exception(e)
+            else:
+                item.future.set_result(output)
+
+            with self.__condition:
+                metrics = self.__metrics[self.__names[item.priority]]
+                metrics.completed += 1
+                metrics.total_wait += waited
+                metrics.max_wait = max(metrics.max_wait, waited)
+
+    def shell(
+            self,
+            command: str,
+            priority: Optional[str] = 'status',
+            deadline: Optional[float] = None,
+            decode: Optional[bool] = True,
+            ):
+        """
+        Queue a shell command and wait for its output.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            priority (str):
+                The priority class; one of 'interactive', 'status' or 'bulk'.
+
+            deadline (float):
+                The time (in seconds from now) the command may spend queued before it is dropped.
+
+            decode (bool):
+                If True, the output is decoded to a string.
+
+        Returns:
+            Union[str, bytes]:
+                The output of the command.
+
+        Raises:
+            DeviceTimeoutError:
+                Raised when the deadline passed before the command was sent.
+        """
+        return self.submit(command, priority, deadline, decode=decode).result()
+
+    def start(self) -> None:
+        """
+        Start the worker threads.
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+
+        self.__stopping = False
+        self.__threads = [
+                threading.Thread(target=self._run, name=f'command-scheduler-{index}', daemon=True)
+                for index in range(self.__max_concurrency)
+                ]
+        self.__threads.append(
+                threading.Thread(target=self._expire_overdue, name='command-scheduler-deadlines', daemon=True)
+                )
+
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self, cancel_pending: Optional[bool] = True) -> None:
+        """
+        Stop the worker threads once the commands in flight have finished.
+
+        Parameters:
+            cancel_pending (bool):
+                If True, cancel the commands that are still queued. Otherwise, they are sent before the workers exit.
+
+        Returns:
+            None
+        """
+        with self.__condition:
+            if cancel_pending:
+                for _, _, item in self.__heap:
+                    if not item.dispatched:
+                        item.dispatched = True
+                        item.future.cancel()
+                        metrics = self.__metrics[self.__names[item.priority]]
+                        metrics.depth -= 1
+                        metrics.cancelled += 1
+
+                self.__heap.clear()
+                self.__deadlines.clear()
+                self.__pending.clear()
+
+            self.__stopping = True
+            self.__condition.notify_all()
+            self.__deadline_condition.notify_all()
+
+        for thread in self.__threads:
+            thread.join()
+
+        self.__threads = []
+
+    def submit(
+            self,
+            command: str,
+            priority: Optional[str] = 'status',
+            deadline: Optional[float] = None,
+            coalesce: Optional[bool] = None,
+            decode: Optional[bool] = True,
+            ) -> Future:
+        """
+        Queue a shell command.
+
+        Parameters:
+            command (str):
+                The command to run.
+
+            priority (str):
+                The priority class; one of 'interactive', 'status' or 'bulk'.
+
+            deadline (float):
+                The time (in seconds from now) the command may spend queued before it is dropped. If None, it waits
+                as long as it takes.
+
+            coalesce (bool):
+                If True, share the result of an identical command that is already queued instead of queuing another.
+                Defaults to True for 'status' commands, which are read-only queries, and False otherwise.
+
+            decode (bool):
+                If True, the output is decoded to a string.
+
+        Returns:
+            Future:
+                A future resolving to the output of the command. Each caller gets its own future, even when the
+                command is coalesced; cancelling it only drops the command once every caller has cancelled.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Invalid priority: '{priority}'. Valid priorities: {list(PRIORITIES)}")
+
+        rank = PRIORITIES[priority]
+        coalesce = priority == 'status' if coalesce is None else coalesce
+        absolute_deadline = time.monotonic() + deadline if deadline is not None else None
+
+        with self.__condition:
+            if self.__stopping:
+                raise RuntimeError('The command scheduler has been stopped.')
+
+            metrics = self.__metrics[priority]
+            metrics.submitted += 1
+            key = (command, decode)
+            queued = self.__pending.get(key) if coalesce else None
+
+            caller = queued.add_caller() if queued is not None else None
+
+            if caller is not None:
+                metrics.coalesced += 1
+
+                # The shared command must satisfy the most demanding of its callers.
+                if queued.deadline is not None:
+                    queued.deadline = None if absolute_deadline is None else max(queued.deadline, absolute_deadline)
+
+                if rank < queued.priority:
+                    self.__metrics[self.__names[queued.priority]].depth -= 1
+                    metrics.depth += 1
+                    queued.priority = rank
+                    heapq.heappush(self.__heap, (rank, next(self.__counter), queued))
+                    self.__condition.notify()
+
+                return caller
+
+            item = ScheduledCommand(command, decode, rank, absolute_deadline)
+            caller = item.add_caller()
+            heapq.heappush(self.__heap, (rank, next(self.__counter), item))
+            metrics.depth += 1
+
+            if absolute_deadline is not None:
+                heapq.heappush(self.__deadlines, (absolute_deadline, next(self.__counter), item))
+                self.__deadline_condition.notify()
+
+            if coalesce:
+                self.__pending[key] = item
+
+            self.__condition.notify()
+
+        return caller
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop(cancel_pending=False)
@@ -0,0 +1,429 @@
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_TILE_SIZE = 64
+DEFAULT_KEYFRAME_INTERVAL = 300
+DEFAULT_COMPRESSION_LEVEL = 1
+
+PIXEL_FORMATS = {
+        1: ('RGBA_8888', 4),
+        2: ('RGBX_8888', 4),
+        3: ('RGB_888', 3),
+        4: ('RGB_565', 2),
+        5: ('BGRA_8888', 4),
+        }
+"""`screencap` pixel format ids mapped to their name and bytes per pixel."""
+
+HEADER_SIZES = (16, 12)
+"""`screencap` writes a 12-byte header (width, height, format), plus a 4-byte dataspace on Android 8 and later."""
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    A raw framebuffer as returned by `screencap` (without `-p`).
+
+    :attr:`pixels` is a `memoryview` over the bytes that came off the wire, so slicing rows and tiles copies nothing.
+    """
+    width: int
+    height: int
+    pixel_format: int
+    pixels: memoryview
+    captured_at: float = 0.0
+
+    @classmethod
+    def decode(cls, raw: bytes, captured_at: Optional[float] = None) -> 'Frame':
+        """
+        Decode the output of `screencap`.
+
+        Parameters:
+            raw (bytes):
+                The raw output, header included.
+
+            captured_at (float):
+                When the frame was captured. Defaults to now.
+
+        Returns:
+            Frame:
+                The frame.
+
+        Raises:
+            ValueError:
+                Raised when the output is not a raw framebuffer of a supported pixel format.
+        """
+        if len(raw) < 12:
+            raise ValueError('Raw screen capture is too short to hold a header.')
+
+        width, height, pixel_format = struct.unpack_from('<III', raw)
+
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f'Unsupported pixel format: {pixel_format}')
+
+        size = width * height * PIXEL_FORMATS[pixel_format][1]
+
+        for header_size in HEADER_SIZES:
+            if len(raw) - header_size == size:
+                break
+        else:
+            raise ValueError(f'Raw screen capture is {len(raw)} bytes; expected {size} plus a header.')
+
+        return cls(
+                width,
+                height,
+                pixel_format,
+                memoryview(raw)[header_size:],
+                time.monotonic() if captured_at is None else captured_at,
+                )
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        """The number of bytes per pixel."""
+        return PIXEL_FORMATS[self.pixel_format][1]
+
+    @property
+    def stride(self) -> int:
+        """The number of bytes per row."""
+        return self.width * self.bytes_per_pixel
+
+    def row(self, y: int, x: int = 0, width: Optional[int] = None) -> memoryview:
+        """
+        Get (part of) a row of pixels without copying.
+
+        Parameters:
+            y (int):
+                The row.
+
+            x (int):
+                The first column.
+
+            width (int):
+                The number of columns. Defaults to the rest of the row.
+
+        Returns:
+            memoryview:
+                The pixels.
+        """
+        bpp = self.bytes_per_pixel
+        width = self.width - x if width is None else width
+        start = y * self.stride + x * bpp
+
+        return self.pixels[start:start + width * bpp]
+
+    def to_numpy(self):
+        """
+        View the frame as a NumPy array of shape (height, width, bytes per pixel) without copying.
+
+        Returns:
+            numpy.ndarray:
+                The array.
+
+        Raises:
+            ImportError:
+                Raised when NumPy is not installed.
+        """
+        try:
+            import numpy
+        except ImportError as e:
+            raise ImportError('NumPy is required for Frame.to_numpy(). Install it with `pip install numpy`.') from e
+
+        return numpy.frombuffer(self.pixels, dtype=numpy.uint8).reshape(self.height, self.width, self.bytes_per_pixel)
+
+
+@dataclass(frozen=True)
+class Tile:
+    """
+    A rectangular region of a frame whose pixels changed, compressed with zlib.
+    """
+    x: int
+    y: int
+    width: int
+    height: int
+    data: bytes
+
+    def pixels(self) -> bytes:
+        """
+        Decompress the tile's pixels.
+
+        Returns:
+            bytes:
+                The raw pixels, row by row.
+        """
+        return zlib.decompress(self.data)
+
+    def to_png(self, pixel_format: int = 1) -> bytes:
+        """
+        Encode the tile as a PNG image.
+
+        RGBA_8888 and RGB_888 pixels are written as they are, BGRA_8888 pixels have their red and blue channels swapped
+        and RGBX_8888 pixels lose their padding byte. RGB_565 is not supported.
+
+        Parameters:
+            pixel_format (int):
+                The pixel format id of the frame the tile came from (a key of :data:`PIXEL_FORMATS`).
+
+        Returns:
+            bytes:
+                The PNG file contents.
+
+        Raises:
+            ValueError:
+                Raised when the pixel format cannot be encoded as PNG.
+        """
+        name, bytes_per_pixel = PIXEL_FORMATS.get(pixel_format, (str(pixel_format), None))
+        pixels = self.pixels()
+
+        if name in ('RGBA_8888', 'RGB_888'):
+            color_type = 6 if bytes_per_pixel == 4 else 2
+        elif name == 'BGRA_8888':
+            color_type = 6
+            swapped = bytearray(pixels)
+            swapped[0::4], swapped[2::4] = pixels[2::4], pixels[0::4]
+            pixels = bytes(swapped)
+        elif name == 'RGBX_8888':
+            color_type, bytes_per_pixel = 2, 3
+            rgb = bytearray(len(pixels) // 4 * 3)
+
+            for channel in range(3):
+                rgb[channel::3] = pixels[channel::4]
+
+            pixels = bytes(rgb)
+        else:
+            raise ValueError(f'Cannot encode pixel format {name} as PNG.')
+
+        stride = self.width * bytes_per_pixel
+        scanlines = b''.join(b'\x00' + pixels[y * stride:(y + 1) * stride] for y in range(self.height))
+
+        def chunk(kind, body):
+            return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, color_type, 0, 0, 0)
+
+        return b''.join([
+                b'\x89PNG\r\n\x1a\n',
+                chunk(b'IHDR', header),
+                chunk(b'IDAT', zlib.compress(scanlines)),
+                chunk(b'IEND', b''),
+                ])
+
+
+@dataclass
+class FrameDelta:
+    """
+    The tiles that changed since the previous frame. A keyframe holds every tile.
+    """
+    index: int
+    width: int
+    height: int
+    pixel_format: int
+    keyframe: bool
+    tiles: List[Tile] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        """The number of compressed bytes in the delta."""
+        return sum(len(tile.data) for tile in self.tiles)
+
+    def apply(self, target: bytearray) -> bytearray:
+        """
+        Paint the delta's tiles onto a framebuffer.
+
+        Parameters:
+            target (bytearray):
+                The framebuffer (pixels only, no header) to update in place. Pass an empty bytearray with a keyframe
+                to start a new one.
+
+        Returns:
+            bytearray:
+                The updated framebuffer.
+        """
+        bpp = PIXEL_FORMATS[self.pixel_format][1]
+        stride = self.width * bpp
+
+        if self.keyframe and len(target) != stride * self.height:
+            target[:] = bytes(stride * self.height)
+
+        for tile in self.tiles:
+            pixels = tile.pixels()
+            tile_stride = tile.width * bpp
+
+            for row in range(tile.height):
+                start = (tile.y + row) * stride + tile.x * bpp
+                target[start:start + tile_stride] = pixels[row * tile_stride:(row + 1) * tile_stride]
+
+        return target
+
+
+class ScreenCapture:
+    """
+    Capture a device's screen as a stream of tile-level deltas.
+
+    Frames are pulled as raw framebuffers (`screencap` without `-p`, through `exec-out` so binary output is not
+    mangled by a terminal), which skips PNG encoding on the device. Each frame is split into bands of tiles; a CRC of
+    every band, and of every tile in a band that changed, is compared with the previous frame's, and only tiles whose
+    CRC changed are copied and compressed. Only the CRCs of the previous frame are kept, not its pixels.
+    """
+
+    def __init__(
+            self,
+            controller,
+            tile_size: Optional[int] = DEFAULT_TILE_SIZE,
+            keyframe_interval: Optional[int] = DEFAULT_KEYFRAME_INTERVAL,
+            compression_level: Optional[int] = DEFAULT_COMPRESSION_LEVEL,
+            display: Optional[int] = None,
+            ):
+        """
+        Initialize a ScreenCapture object.
+
+        Parameters:
+            controller (Controller):
+                The controller to capture from.
+
+            tile_size (int):
+                The width and height (in pixels) of a tile.
+
+            keyframe_interval (int):
+                Send every tile once in this many frames, so a consumer that missed a delta recovers. 0 disables
+                periodic keyframes (the first frame is always a keyframe).
+
+            compression_level (int):
+                The zlib level used for changed tiles.
+
+            display (int):
+                The display id to capture, for devices with more than one.
+        """
+        if tile_size < 1:
+            raise ValueError('`tile_size` must be at least 1.')
+
+        self.__controller = controller
+        self.__tile_size = tile_size
+        self.__keyframe_interval = keyframe_interval
+        self.__compression_level = compression_level
+        self.__display = display
+        self.__checksums: Dict[Tuple[int, int], int] = {}
+        self.__band_checksums: Dict[int, int] = {}
+        self.__geometry = None
+        self.__index = 0
+
+    @property
+    def command(self) -> str:
+        """
+        Get the capture command.
+
+        Returns:
+            str:
+                The command.
+        """
+        if self.__display is None:
+            return 'screencap'
+
+        return f'screencap -d {self.__display}'
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Get the number of frames captured so far.
+
+        Returns:
+            int:
+                The number of frames.
+        """
+        return self.__index
+
+    def capture(self) -> Frame:
+        """
+        Capture a single raw frame.
+
+        Returns:
+            Frame:
+                The frame.
+        """
+        return Frame.decode(self.__controller.exec_out(self.command))
+
+    def diff(self, frame: Frame, keyframe: Optional[bool] = False) -> FrameDelta:
+        """
+        Compute the delta between a frame and the previous one passed to this method.
+
+        Parameters:
+            frame (Frame):
+                The frame.
+
+            keyframe (bool):
+                If True, every tile is included regardless of whether it changed.
+
+        Returns:
+            FrameDelta:
+                The delta.
+        """
+        geometry = (frame.width, frame.height, frame.pixel_format)
+        interval = self.__keyframe_interval
+        keyframe = (
+                keyframe
+                or geometry != self.__geometry
+                or (interval and self.__index % interval == 0)
+                )
+        delta = FrameDelta(self.__index, frame.width, frame.height, frame.pixel_format, bool(keyframe))
+        checksums = self.__checksums
+        band_checksums = self.__band_checksums
+        crc32 = zlib.crc32
+        size = self.__tile_size
+        stride = frame.stride
+
+        for y in range(0, frame.height, size):
+            height = min(size, frame.height - y)
+
+            # The rows of a band of tiles are contiguous, so an unchanged band costs a single CRC.
+            band = crc32(frame.pixels[y * stride:(y + height) * stride])
+
+            if not keyframe and band_checksums.get(y) == band:
+                continue
+
+            band_checksums[y] = band
+
+            for x in range(0, frame.width, size):
+                width = min(size, frame.width - x)
+                rows = [frame.row(row, x, width) for row in range(y, y + height)]
+                checksum = 0
+
+                for row in rows:
+                    checksum = crc32(row, checksum)
+
+                if not keyframe and checksums.get((x, y)) == checksum:
+                    continue
+
+                checksums[(x, y)] = checksum
+                delta.tiles.append(Tile(x, y, width, height, zlib.compress(b''.join(rows), self.__compression_level)))
+
+        self.__geometry = geometry
+        self.__index += 1
+
+        return delta
+
+    def capture_delta(self, keyframe: Optional[bool] = False) -> FrameDelta:
+        """
+        Capture a frame and compute its delta against the previous one.
+
+        Parameters:
+            keyframe (bool):
+                If True, every tile is included regardless of whether it changed.
+
+        Returns:
+            FrameDelta:
+                The delta.
+        """
+        return self.diff(self.capture(), keyframe)
+
+    def reset(self) -> None:
+        """
+        Forget the previous frame, so the next delta is a keyframe.
+
+        Returns:
+            None
+        """
+        self.__checksums.clear()
+        self.__band_checksums.clear()
+        self.__geometry = None
+        self.__index = 0
@@ -0,0 +1,385 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+from inspyre_fire.controller.keys import resolve_keycode
+
+
+DEFAULT_REFRESH_INTERVAL = 1.0
+REFRESH_AHEAD = 0.8
+"""Background refreshes start once a value has used up this fraction of its TTL."""
+
+
+def parse_current_app(output: str) -> Optional[str]:
+    """Extract the package of the focused window from `dumpsys window windows`."""
+    match = re.search(r'(?:mCurrentFocus|mFocusedApp)=.*?\s([\w.]+)/', output)
+
+    return match.group(1) if match else None
+
+
+def parse_power_state(output: str) -> Optional[str]:
+    """Extract the wakefulness ('Awake', 'Asleep', 'Dozing', ...) from `dumpsys power`."""
+    match = re.search(r'mWakefulness=(\w+)', output)
+
+    return match.group(1) if match else None
+
+
+def parse_volume(output: str) -> Optional[int]:
+    """Extract the music stream volume from `cmd media_session volume --get`."""
+    match = re.search(r'volume is (\d+)', output)
+
+    return int(match.group(1)) if match else None
+
+
+def parse_packages(output: str) -> frozenset:
+    """Collect the package names listed by `pm list packages`."""
+    return frozenset(line[len('package:'):].strip() for line in output.splitlines() if line.startswith('package:'))
+
+
+def parse_properties(output: str) -> Dict[str, str]:
+    """Collect the `[name]: [value]` pairs printed by `getprop`."""
+    return dict(re.findall(r'^\[([^\]]+)\]: \[(.*)\]$', output, re.MULTILINE))
+
+
+@dataclass(frozen=True)
+class StateField:
+    """
+    How to fetch and parse one piece of device state, and how long a fetched value stays fresh.
+    """
+    command: str
+    parser: Callable[[str], Any]
+    ttl: float
+
+
+STATE_FIELDS = {
+        'current_app': StateField(
+                "dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'",
+                parse_current_app,
+                2.0
+                ),
+        'power':       StateField("dumpsys power | grep mWakefulness=", parse_power_state, 5.0),
+        'volume':      StateField('cmd media_session volume --stream 3 --get', parse_volume, 5.0),
+        'packages':    StateField('pm list packages', parse_packages, 300.0),
+        'properties':  StateField('getprop', parse_properties, 600.0),
+        }
+"""The device state the cache knows how to fetch, keyed by field name."""
+
+KEY_INVALIDATIONS = {
+        3:   {'current_app'},
+        4:   {'current_app'},
+        23:  {'current_app'},
+        66:  {'current_app'},
+        24:  {'volume'},
+        25:  {'volume'},
+        164: {'volume'},
+        26:  {'power', 'current_app'},
+        223: {'power', 'current_app'},
+        224: {'power', 'current_app'},
+        }
+"""Android keycodes mapped to the fields a press of that key may change."""
+
+COMMAND_INVALIDATIONS = (
+        (re.compile(r'\b(am\s+(start|force-stop|kill)|monkey)\b'), {'current_app'}),
+        (re.compile(r'\b(pm\s+(install|uninstall|enable|disable)|cmd\s+package\s+install)'), {'packages'}),
+        (re.compile(r'\bsetprop\b'), {'properties'}),
+        (re.compile(r'\bmedia_session\s+volume\s+.*--set\b'), {'volume'}),
+        (re.compile(r'\bsendevent\b'), {'current_app', 'power', 'volume'}),
+        )
+"""Shell command patterns mapped to the fields the command may change."""
+
+KEYEVENT_PATTERN = re.compile(r'\binput\s+keyevent\s+((?:--\w+\s+)*)([\w\s]+)')
+
+
+class CachedValue:
+    """
+    A fetched piece of device state and when it was fetched.
+    """
+    __slots__ = ('value', 'fetched_at')
+
+    def __init__(self, value, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.fetched_at
+
+
+class DeviceStateCache:
+    """
+    Memoize slow status queries (`dumpsys`, `getprop`, `pm`) for a single device.
+
+    Every field has its own TTL. A read within the TTL is served from memory; a read after it runs the query again,
+    and concurrent readers of a stale field share one query instead of each sending their own. Commands sent through
+    the controller that change a field (launching an app, pressing home, changing the volume, ...) invalidate it
+    straight away.
+
+    With `background_refresh`, a thread refreshes every field that has been read at least once shortly before it
+    expires, so frequent pollers never wait on the device.
+    """
+
+    def __init__(
+            self,
+            controller,
+            ttls: Optional[Dict[str, float]] = None,
+            fields: Optional[Dict[str, StateField]] = None,
+            background_refresh: Optional[bool] = False,
+            refresh_interval: Optional[float] = DEFAULT_REFRESH_INTERVAL,
+            ):
+        """
+        Initialize a DeviceStateCache object.
+
+        Parameters:
+            controller (Controller):
+                The controller to query.
+
+            ttls (Dict[str, float]):
+                Per-field TTL overrides (in seconds).
+
+            fields (Dict[str, StateField]):
+                Extra (or replacement) fields to cache, on top of :data:`STATE_FIELDS`.
+
+            background_refresh (bool):
+                If True, start a thread that refreshes fields before they expire.
+
+            refresh_interval (float):
+                How often (in seconds) the background thread looks for fields to refresh.
+        """
+        self.__controller = controller
+        self.__fields = dict(STATE_FIELDS)
+        self.__fields.update(fields or {})
+
+        for name, ttl in (ttls or {}).items():
+            if name not in self.__fields:
+                raise KeyError(f"Unknown state field: '{name}'")
+
+            field = self.__fields[name]
+            self.__fields[name] = StateField(field.command, field.parser, ttl)
+
+        self.__values: Dict[str, CachedValue] = {}
+        self.__generations = dict.fromkeys(self.__fields, 0)
+        self.__locks = {name: threading.Lock() for name in self.__fields}
+        self.__watched: Set[str] = set()
+        self.__refresh_interval = refresh_interval
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__hits = 0
+        self.__misses = 0
+
+        if background_refresh:
+            self.start()
+
+    @property
+    def fields(self) -> Dict[str, StateField]:
+        """
+        Get the fields the cache knows how to fetch.
+
+        Returns:
+            Dict[str, StateField]:
+                The fields, keyed by name.
+        """
+        return dict(self.__fields)
+
+    @property
+    def hits(self) -> int:
+        """
+        Get the number of reads served from memory.
+
+        Returns:
+            int:
+                The number of cache hits.
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Get the number of reads that had to query the device.
+
+        Returns:
+            int:
+                The number of cache misses.
+        """
+        return self.__misses
+
+    def _fresh(self, name: str, max_age: float) -> Optional[CachedValue]:
+        cached = self.__values.get(name)
+
+        if cached is not None and cached.age() < max_age:
+            return cached
+
+        return None
+
+    def _run(self):
+        while not self.__stop.wait(self.__refresh_interval):
+            for name in list(self.__watched):
+                cached = self.__values.get(name)
+                ttl = self.__fields[name].ttl
+
+                if cached is None or cached.age() >= ttl * REFRESH_AHEAD:
+                    try:
+                        self.refresh(name)
+                    except Exception:
+                        # A failed background refresh leaves the field to be fetched on the next read.
+                        pass
+
+    def get(self, name: str, max_age: Optional[float] = None):
+        """
+        Get a piece of device state.
+
+        Parameters:
+            name (str):
+                The field to get, e.g. 'current_app', 'power', 'volume', 'packages' or 'properties'.
+
+            max_age (float):
+                Accept a cached value up to this old (in seconds). Defaults to the field's TTL.
+
+        Returns:
+            Any:
+                The parsed value.
+        """
+        if name not in self.__fields:
+            raise KeyError(f"Unknown state field: '{name}'")
+
+        max_age = self.__fields[name].ttl if max_age is None else max_age
+        self.__watched.add(name)
+
+        cached = self._fresh(name, max_age)
+
+        if cached is not None:
+            self.__hits += 1
+            return cached.value
+
+        with self.__locks[name]:
+            # Another reader may have refreshed the field while this one waited for the lock.
+            cached = self._fresh(name, max_age)
+
+            if cached is not None:
+                self.__hits += 1
+                return cached.value
+
+            self.__misses += 1
+
+            return self._fetch(name)
+
+    def _fetch(self, name: str):
+        field = self.__fields[name]
+        generation = self.__generations[name]
+        value = field.parser(self.__controller.shell(field.command))
+
+        # If the field was invalidated while the query was in flight, the answer may predate the change.
+        if self.__generations[name] == generation:
+            self.__values[name] = CachedValue(value, time.monotonic())
+
+        return value
+
+    def invalidate(self, *names: str) -> None:
+        """
+        Drop cached fields, so the next read queries the device. With no names, drop every field.
+
+        Parameters:
+            *names (str):
+                The fields to drop.
+
+        Returns:
+            None
+        """
+        for name in names or list(self.__fields):
+            self.__generations[name] += 1
+            self.__values.pop(name, None)
+
+    def invalidate_for_keys(self, keycodes: Iterable[int]) -> None:
+        """
+        Drop the fields that pressing the given keys may change.
+
+        Parameters:
+            keycodes (Iterable[int]):
+                The Android keycodes that were pressed.
+
+        Returns:
+            None
+        """
+        names = set()
+
+        for keycode in keycodes:
+            names.update(KEY_INVALIDATIONS.get(keycode, ()))
+
+        if names:
+            self.invalidate(*names)
+
+    def observe_command(self, command: str) -> None:
+        """
+        Drop the fields that a shell command sent to the device may change.
+
+        Parameters:
+            command (str):
+                The command that was sent.
+
+        Returns:
+            None
+        """
+        names = set()
+
+        for pattern, fields in COMMAND_INVALIDATIONS:
+            if pattern.search(command):
+                names.update(fields)
+
+        for match in KEYEVENT_PATTERN.finditer(command):
+            keycodes = []
+
+            # `input keyevent` takes numbers and `KEYCODE_*` names alike.
+            for code in match.group(2).split():
+                try:
+                    keycodes.append(resolve_keycode(code))
+                except ValueError:
+                    continue
+
+            self.invalidate_for_keys(keycodes)
+
+        if names:
+            self.invalidate(*names)
+
+    def refresh(self, name: str):
+        """
+        Query a field from the device now, regardless of its age.
+
+        Parameters:
+            name (str):
+                The field to refresh.
+
+        Returns:
+            Any:
+                The parsed value.
+        """
+        with self.__locks[name]:
+            return self._fetch(name)
+
+    def start(self) -> None:
+        """
+        Start the background refresh thread.
+
+        Returns:
+            None
+        """
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self._run, name='device-state', daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background refresh thread.
+
+        Returns:
+            None
+        """
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __getitem__(self, name):
+        return self.get(name)
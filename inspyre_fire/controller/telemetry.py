@@ -0,0 +1,550 @@
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_INTERVAL = 10.0
+DEFAULT_CAPACITY = 360
+MAX_WORKERS = 64
+
+SAMPLE_COMMANDS = {
+        'stat':    'head -n 1 /proc/stat',
+        'meminfo': "grep -E '^(MemTotal|MemAvailable|MemFree|Buffers|Cached):' /proc/meminfo",
+        'thermal': 'cat /sys/class/thermal/thermal_zone*/temp 2>/dev/null',
+        'net':     'cat /proc/net/dev',
+        }
+"""The commands run (as one batch) for every sample, keyed by the name their output is parsed under."""
+
+METRICS = (
+        'cpu_percent',
+        'memory_used_percent',
+        'memory_available_mb',
+        'temperature_c',
+        'rx_bytes_per_s',
+        'tx_bytes_per_s',
+        )
+"""The metrics recorded for every device."""
+
+
+def parse_cpu_times(output: str) -> Optional[Tuple[int, int]]:
+    """Extract the (busy, total) jiffies from the aggregate `cpu` line of `/proc/stat`."""
+    parts = output.split()
+
+    if len(parts) < 5 or parts[0] != 'cpu':
+        return None
+
+    values = [int(value) for value in parts[1:] if value.isdigit()]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+
+    return sum(values) - idle, sum(values)
+
+
+def parse_meminfo(output: str) -> Dict[str, int]:
+    """Collect the `/proc/meminfo` fields (in kB), keyed by name."""
+    fields = {}
+
+    for line in output.splitlines():
+        name, _, rest = line.partition(':')
+        value = rest.split()
+
+        if value and value[0].isdigit():
+            fields[name.strip()] = int(value[0])
+
+    return fields
+
+
+def parse_temperature(output: str) -> Optional[float]:
+    """Extract the hottest thermal zone (in degrees Celsius) from the contents of `thermal_zone*/temp`."""
+    readings = [int(value) for value in output.split() if value.lstrip('-').isdigit()]
+    readings = [reading for reading in readings if reading > 0]
+
+    if not readings:
+        return None
+
+    hottest = max(readings)
+
+    # Most kernels report millidegrees; a few report whole degrees.
+    return hottest / 1000 if hottest > 1000 else float(hottest)
+
+
+def parse_net_dev(output: str) -> Optional[Tuple[int, int]]:
+    """Sum the received and transmitted bytes of every interface but loopback in `/proc/net/dev`."""
+    rx = tx = 0
+    seen = False
+
+    for line in output.splitlines():
+        interface, separator, counters = line.partition(':')
+
+        if not separator or interface.strip() == 'lo':
+            continue
+
+        values = counters.split()
+
+        if len(values) < 9:
+            continue
+
+        rx += int(values[0])
+        tx += int(values[8])
+        seen = True
+
+    return (rx, tx) if seen else None
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    Summary statistics of a metric over a window.
+    """
+    count: int
+    minimum: float
+    maximum: float
+    average: float
+    last: float
+
+
+class TimeSeries:
+    """
+    A fixed-capacity ring buffer of (timestamp, value) samples.
+
+    Timestamps and values live in two preallocated `array('d')` buffers, so a series costs 16 bytes per slot no
+    matter how long it runs; once full, each new sample overwrites the oldest.
+    """
+    __slots__ = ('__times', '__values', '__capacity', '__head', '__count')
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError('`capacity` must be at least 1.')
+
+        self.__times = array('d', bytes(8 * capacity))
+        self.__values = array('d', bytes(8 * capacity))
+        self.__capacity = capacity
+        self.__head = 0
+        self.__count = 0
+
+    @property
+    def capacity(self) -> int:
+        """The largest number of samples held."""
+        return self.__capacity
+
+    @property
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """The most recent (timestamp, value) sample, or None if the series is empty."""
+        if not self.__count:
+            return None
+
+        index = (self.__head - 1) % self.__capacity
+
+        return self.__times[index], self.__values[index]
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by the sample buffers, in bytes."""
+        return (self.__times.itemsize + self.__values.itemsize) * self.__capacity
+
+    def append(self, timestamp: float, value: float) -> None:
+        """
+        Add a sample, overwriting the oldest one if the series is full.
+
+        Parameters:
+            timestamp (float):
+                When the sample was taken (`time.monotonic()`).
+
+            value (float):
+                The sample.
+
+        Returns:
+            None
+        """
+        self.__times[self.__head] = timestamp
+        self.__values[self.__head] = value
+        self.__head = (self.__head + 1) % self.__capacity
+        self.__count = min(self.__count + 1, self.__capacity)
+
+    def items(self, since: Optional[float] = None) -> Iterator[Tuple[float, float]]:
+        """
+        Iterate over the samples, oldest first.
+
+        Parameters:
+            since (float):
+                Only include samples taken at or after this timestamp.
+
+        Yields:
+            Tuple[float, float]:
+                Each (timestamp, value) sample.
+        """
+        start = (self.__head - self.__count) % self.__capacity
+
+        for offset in range(self.__count):
+            index = (start + offset) % self.__capacity
+            timestamp = self.__times[index]
+
+            if since is None or timestamp >= since:
+                yield timestamp, self.__values[index]
+
+    def rollup(self, window: Optional[float] = None, now: Optional[float] = None) -> Optional[Rollup]:
+        """
+        Summarize the samples in a window.
+
+        Parameters:
+            window (float):
+                The length of the window (in seconds), ending now. If None, every sample is included.
+
+            now (float):
+                The end of the window. Defaults to `time.monotonic()`.
+
+        Returns:
+            Rollup:
+                The summary, or None if the window holds no samples.
+        """
+        since = None if window is None else (time.monotonic() if now is None else now) - window
+        count = 0
+        total = 0.0
+        minimum = math.inf
+        maximum = -math.inf
+        last = math.nan
+
+        for _, value in self.items(since):
+            count += 1
+            total += value
+            minimum = min(minimum, value)
+            maximum = max(maximum, value)
+            last = value
+
+        if not count:
+            return None
+
+        return Rollup(count, minimum, maximum, total / count, last)
+
+    def __len__(self):
+        return self.__count
+
+
+class TelemetryCollector:
+    """
+    Periodically sample health metrics from many devices.
+
+    Every sample is a single batched shell call per device (see :class:`ShellBatch`) that reads `/proc/stat`,
+    `/proc/meminfo`, the thermal zones and `/proc/net/dev`; devices are sampled concurrently from a thread pool.
+    CPU usage and network throughput are derived from the difference between consecutive samples. Each metric of each
+    device is kept in a fixed-size :class:`TimeSeries`, so memory use is bounded by
+    `devices x metrics x capacity` however long the collector runs.
+    """
+
+    def __init__(
+            self,
+            controllers,
+            interval: Optional[float] = DEFAULT_INTERVAL,
+            capacity: Optional[int] = DEFAULT_CAPACITY,
+            timeout: Optional[float] = None,
+            max_workers: Optional[int] = None,
+            auto_start: Optional[bool] = False,
+            ):
+        """
+        Initialize a TelemetryCollector object.
+
+        Parameters:
+            controllers:
+                The devices to sample: a :class:`FleetController`, a dict of controllers keyed by name, or an
+                iterable of controllers.
+
+            interval (float):
+                The time (in seconds) between samples.
+
+            capacity (int):
+                The number of samples kept per metric per device.
+
+            timeout (float):
+                The time (in seconds) allowed for a single device's sample. Defaults to `interval`.
+
+            max_workers (int):
+                The size of the thread pool. Defaults to one worker per device, capped at :data:`MAX_WORKERS`.
+
+            auto_start (bool):
+                If True, start sampling in the background immediately.
+        """
+        if hasattr(controllers, 'controllers'):
+            controllers = controllers.controllers
+
+        if not isinstance(controllers, dict):
+            controllers = {controller.name: controller for controller in controllers}
+
+        self.__controllers = dict(controllers)
+        self.__interval = interval
+        self.__timeout = interval if timeout is None else timeout
+        self.__series = {
+                name: {metric: TimeSeries(capacity) for metric in METRICS}
+                for name in self.__controllers
+                }
+        self.__previous: Dict[str, Tuple[float, Optional[Tuple[int, int]], Optional[Tuple[int, int]]]] = {}
+        self.__last_sample: Dict[str, float] = {}
+        self.__errors: Dict[str, BaseException] = {}
+        self.__max_workers = max_workers or max(1, min(MAX_WORKERS, len(self.__controllers)))
+        self.__executor = None
+        self.__stop = threading.Event()
+        self.__thread = None
+
+        if auto_start:
+            self.start()
+
+    @property
+    def devices(self) -> List[str]:
+        """
+        Get the names of the sampled devices.
+
+        Returns:
+            List[str]:
+                The device names.
+        """
+        return list(self.__controllers)
+
+    @property
+    def errors(self) -> Dict[str, BaseException]:
+        """
+        Get the error of each device whose most recent sample failed.
+
+        Returns:
+            Dict[str, BaseException]:
+                The errors, keyed by device name.
+        """
+        return dict(self.__errors)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory held by every time series, in bytes.
+
+        Returns:
+            int:
+                The number of bytes.
+        """
+        return sum(series.nbytes for metrics in self.__series.values() for series in metrics.values())
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the background sampler is running.
+
+        Returns:
+            bool:
+                True if the sampler is running, False otherwise.
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix='telemetry')
+
+        return self.__executor
+
+    def _run(self):
+        while not self.__stop.is_set():
+            started = time.monotonic()
+            self.sample_all()
+            self.__stop.wait(max(0.0, self.__interval - (time.monotonic() - started)))
+
+    def rollup(self, device: str, metric: str, window: Optional[float] = None) -> Optional[Rollup]:
+        """
+        Summarize one metric of one device over a window.
+
+        Parameters:
+            device (str):
+                The device name.
+
+            metric (str):
+                The metric; one of :data:`METRICS`.
+
+            window (float):
+                The length of the window (in seconds), ending now. If None, every kept sample is included.
+
+        Returns:
+            Rollup:
+                The summary, or None if the window holds no samples.
+        """
+        return self.series(device, metric).rollup(window)
+
+    def rollups(self, metric: str, window: Optional[float] = None) -> Dict[str, Optional[Rollup]]:
+        """
+        Summarize one metric of every device over a window.
+
+        Parameters:
+            metric (str):
+                The metric; one of :data:`METRICS`.
+
+            window (float):
+                The length of the window (in seconds), ending now. If None, every kept sample is included.
+
+        Returns:
+            Dict[str, Optional[Rollup]]:
+                The summaries, keyed by device name.
+        """
+        now = time.monotonic()
+
+        return {name: self.series(name, metric).rollup(window, now) for name in self.__controllers}
+
+    def sample(self, device: str) -> Dict[str, float]:
+        """
+        Take one sample from a device and record it.
+
+        Parameters:
+            device (str):
+                The device name.
+
+        Returns:
+            Dict[str, float]:
+                The metrics that could be computed, keyed by name. The first sample of a device has no CPU or network
+                figures, as those are rates.
+        """
+        controller = self.__controllers[device]
+        results = controller.batch(SAMPLE_COMMANDS.values()).run(timeout=self.__timeout)
+        outputs = dict(zip(SAMPLE_COMMANDS, (result.output for result in results)))
+        now = time.monotonic()
+
+        cpu = parse_cpu_times(outputs['stat'])
+        net = parse_net_dev(outputs['net'])
+        memory = parse_meminfo(outputs['meminfo'])
+        temperature = parse_temperature(outputs['thermal'])
+        metrics = {}
+
+        if 'MemAvailable' in memory:
+            available = memory['MemAvailable']
+        elif 'MemFree' in memory:
+            # Kernels before 3.14 (older Fire OS releases) have no MemAvailable; free plus reclaimable caches is the
+            # usual estimate.
+            available = memory['MemFree'] + memory.get('Buffers', 0) + memory.get('Cached', 0)
+        else:
+            available = None
+
+        if memory.get('MemTotal') and available is not None:
+            metrics['memory_used_percent'] = 100.0 * (memory['MemTotal'] - available) / memory['MemTotal']
+            metrics['memory_available_mb'] = available / 1024
+
+        if temperature is not None:
+            metrics['temperature_c'] = temperature
+
+        previous = self.__previous.get(device)
+
+        if previous is not None:
+            previous_time, previous_cpu, previous_net = previous
+            elapsed = now - previous_time
+
+            if cpu and previous_cpu and cpu[1] > previous_cpu[1]:
+                metrics['cpu_percent'] = 100.0 * (cpu[0] - previous_cpu[0]) / (cpu[1] - previous_cpu[1])
+
+            # Counters go backwards when the device reboots or an interface is reset; skip that interval.
+            if net and previous_net and elapsed > 0 and net[0] >= previous_net[0] and net[1] >= previous_net[1]:
+                metrics['rx_bytes_per_s'] = (net[0] - previous_net[0]) / elapsed
+                metrics['tx_bytes_per_s'] = (net[1] - previous_net[1]) / elapsed
+
+        self.__previous[device] = (now, cpu, net)
+        series = self.__series[device]
+
+        for metric, value in metrics.items():
+            series[metric].append(now, value)
+
+        self.__last_sample[device] = now
+
+        return metrics
+
+    def sample_all(self) -> Dict[str, object]:
+        """
+        Take one sample from every device concurrently.
+
+        Returns:
+            Dict[str, object]:
+                The metrics of each device, or the error its sample raised, keyed by device name.
+        """
+        futures = {name: self._executor().submit(self.sample, name) for name in self.__controllers}
+        outcomes = {}
+
+        for name, future in futures.items():
+            try:
+                outcomes[name] = future.result()
+            except Exception as e:
+                outcomes[name] = self.__errors[name] = e
+            else:
+                self.__errors.pop(name, None)
+
+        return outcomes
+
+    def series(self, device: str, metric: str) -> TimeSeries:
+        """
+        Get the time series of one metric of one device.
+
+        Parameters:
+            device (str):
+                The device name.
+
+            metric (str):
+                The metric; one of :data:`METRICS`.
+
+        Returns:
+            TimeSeries:
+                The time series.
+        """
+        if metric not in METRICS:
+            raise KeyError(f"Unknown metric: '{metric}'. Valid metrics: {list(METRICS)}")
+
+        return self.__series[device][metric]
+
+    def stale(self, max_age: Optional[float] = None) -> List[str]:
+        """
+        Get the devices that have not been sampled successfully recently.
+
+        Parameters:
+            max_age (float):
+                How old (in seconds) the last successful sample may be. Defaults to three intervals.
+
+        Returns:
+            List[str]:
+                The names of the stale devices.
+        """
+        max_age = 3 * self.__interval if max_age is None else max_age
+        now = time.monotonic()
+
+        return [
+                name for name in self.__controllers
+                if name in self.__errors or now - self.__last_sample.get(name, -math.inf) > max_age
+                ]
+
+    def start(self) -> None:
+        """
+        Start sampling in the background.
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling and shut down the thread pool.
+
+        Returns:
+            None
+        """
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
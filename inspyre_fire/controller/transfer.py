@@ -0,0 +1,295 @@
+import hashlib
+import io
+import mmap
+import os
+import shlex
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+from inspyre_fire.controller.errors import TransferError
+from inspyre_fire.instrumentation import count, timed
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHECKSUM = 'md5'
+PARTIAL_SUFFIX = '.ifpart'
+
+CHECKSUM_COMMANDS = {
+        'md5':    'md5sum',
+        'sha1':   'sha1sum',
+        'sha256': 'sha256sum',
+        }
+"""Checksum algorithms mapped to the toybox command that computes them on the device."""
+
+
+class _ViewReader(io.BytesIO):
+    """
+    A reader over a memoryview, passed off as a BytesIO: adb-shell only streams from a BytesIO (anything else is
+    opened as a path), and only ever calls `read` on it.
+
+    The chunk is not copied into the reader; each `read` copies just the piece adb-shell asks for.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self.__view = view
+        self.__position = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        end = len(self.__view) if size is None or size < 0 else min(self.__position + size, len(self.__view))
+        data = self.__view[self.__position:end].tobytes()
+        self.__position = end
+
+        return data
+
+
+@dataclass
+class TransferStats:
+    """
+    Throughput figures for a single transfer.
+    """
+    path: str
+    total_bytes: int = 0
+    transferred_bytes: int = 0
+    resumed_from: int = 0
+    elapsed: float = 0.0
+    chunk_latencies: List[float] = field(default_factory=list)
+
+    @property
+    def average_chunk_latency(self) -> Optional[float]:
+        """The average time (in seconds) per chunk, or None if no chunks were sent."""
+        if not self.chunk_latencies:
+            return None
+
+        return sum(self.chunk_latencies) / len(self.chunk_latencies)
+
+    @property
+    def throughput(self) -> float:
+        """The bytes per second moved by this transfer (resumed bytes excluded)."""
+        return self.transferred_bytes / self.elapsed if self.elapsed else 0.0
+
+
+class TransferManager:
+    """
+    Move files to and from a device in chunks that survive interruptions.
+
+    A push streams the local file from a memory map, one chunk at a time, into a `.ifpart` file next to the
+    destination; a pull reads the remote file with `dd`, one chunk at a time, into a `.ifpart` file next to the local
+    destination. If a transfer is interrupted, the next attempt picks up from the partial file instead of starting
+    over. Both ends are checksummed before the partial file is renamed into place.
+    """
+
+    def __init__(
+            self,
+            controller,
+            chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE,
+            checksum: Optional[str] = DEFAULT_CHECKSUM,
+            progress_callback: Optional[Callable[[str, int, int], None]] = None,
+            ):
+        """
+        Initialize a TransferManager object.
+
+        Parameters:
+            controller (Controller):
+                The controller to transfer through.
+
+            chunk_size (int):
+                The number of bytes moved per chunk.
+
+            checksum (str):
+                The checksum used to verify transfers; one of 'md5', 'sha1' or 'sha256'.
+
+            progress_callback (Callable[[str, int, int], None]):
+                Called after every chunk with the path, the bytes done so far and the total bytes.
+        """
+        if chunk_size < 1:
+            raise ValueError('`chunk_size` must be at least 1.')
+
+        if checksum not in CHECKSUM_COMMANDS:
+            raise ValueError(f"Invalid checksum: '{checksum}'. Valid checksums: {list(CHECKSUM_COMMANDS)}")
+
+        self.__controller = controller
+        self.__chunk_size = chunk_size
+        self.__checksum = checksum
+        self.__progress_callback = progress_callback
+        self.__history = []
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        Get the number of bytes moved per chunk.
+
+        Returns:
+            int:
+                The chunk size.
+        """
+        return self.__chunk_size
+
+    @property
+    def history(self) -> List[TransferStats]:
+        """
+        Get the statistics of every completed transfer, oldest first.
+
+        Returns:
+            List[TransferStats]:
+                The statistics.
+        """
+        return list(self.__history)
+
+    def _progress(self, path: str, done: int, total: int) -> None:
+        if self.__progress_callback is not None:
+            self.__progress_callback(path, done, total)
+
+    def _remote_checksum(self, path: str) -> str:
+        output = self.__controller.shell(f'{CHECKSUM_COMMANDS[self.__checksum]} {shlex.quote(path)}')
+
+        return output.split()[0] if output.strip() else ''
+
+    def _remote_size(self, path: str) -> Optional[int]:
+        output = self.__controller.shell(f'stat -c %s {shlex.quote(path)} 2>/dev/null').strip()
+
+        return int(output) if output.isdigit() else None
+
+    @timed('controller.transfer.pull')
+    def pull(self, device_path: str, local_path: Union[str, Path], resume: Optional[bool] = True) -> TransferStats:
+        """
+        Pull a file from the device.
+
+        Parameters:
+            device_path (str):
+                The file to pull.
+
+            local_path (Union[str, Path]):
+                Where to write it locally.
+
+            resume (bool):
+                If True, continue from a partial file left by an earlier, interrupted pull.
+
+        Returns:
+            TransferStats:
+                The transfer's statistics.
+
+        Raises:
+            TransferError:
+                Raised when the remote file does not exist or the checksums do not match.
+        """
+        local_path = Path(local_path).expanduser().resolve().absolute()
+        partial = local_path.with_name(local_path.name + PARTIAL_SUFFIX)
+        total = self._remote_size(device_path)
+
+        if total is None:
+            raise TransferError(device_path, 'File not found on the device.')
+
+        chunk_size = self.__chunk_size
+        offset = partial.stat().st_size if resume and partial.exists() else 0
+
+        # Pulls are chunk-aligned, so a partial file can only be trusted up to the last whole chunk.
+        offset = min(offset - offset % chunk_size, total - total % chunk_size)
+        stats = TransferStats(device_path, total, resumed_from=offset)
+        quoted = shlex.quote(device_path)
+        digest = hashlib.new(self.__checksum)
+        start = time.perf_counter()
+
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(partial, 'r+b' if partial.exists() else 'w+b') as f:
+            f.truncate(offset)
+
+            if offset:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(block)
+
+            f.seek(offset)
+
+            for index in range(offset // chunk_size, -(-total // chunk_size)):
+                chunk_start = time.perf_counter()
+                data = self.__controller.exec_out(
+                        f'dd if={quoted} bs={chunk_size} skip={index} count=1 2>/dev/null'
+                        )
+                f.write(data)
+                digest.update(data)
+                stats.chunk_latencies.append(time.perf_counter() - chunk_start)
+                stats.transferred_bytes += len(data)
+                self._progress(device_path, offset + stats.transferred_bytes, total)
+
+        if digest.hexdigest() != self._remote_checksum(device_path):
+            partial.unlink()
+            raise TransferError(device_path, f'{self.__checksum} checksum mismatch after pull; partial file removed.')
+
+        os.replace(partial, local_path)
+        stats.elapsed = time.perf_counter() - start
+        self.__history.append(stats)
+        count('controller.transfer.pull.bytes', stats.transferred_bytes)
+
+        return stats
+
+    @timed('controller.transfer.push')
+    def push(self, local_path: Union[str, Path], device_path: str, resume: Optional[bool] = True) -> TransferStats:
+        """
+        Push a file to the device.
+
+        Parameters:
+            local_path (Union[str, Path]):
+                The file to push.
+
+            device_path (str):
+                Where to write it on the device.
+
+            resume (bool):
+                If True, continue from a partial file left on the device by an earlier, interrupted push.
+
+        Returns:
+            TransferStats:
+                The transfer's statistics.
+
+        Raises:
+            TransferError:
+                Raised when the checksums do not match after the transfer.
+        """
+        local_path = Path(local_path).expanduser().resolve().absolute()
+        partial = device_path + PARTIAL_SUFFIX
+        chunk_file = partial + '.chunk'
+        quoted_partial = shlex.quote(partial)
+        quoted_chunk = shlex.quote(chunk_file)
+        total = local_path.stat().st_size
+        offset = (self._remote_size(partial) or 0) if resume else 0
+
+        if offset > total:
+            offset = 0
+
+        if not offset:
+            self.__controller.shell(f': > {quoted_partial}')
+
+        stats = TransferStats(str(local_path), total, resumed_from=offset)
+        start = time.perf_counter()
+
+        with open(local_path, 'rb') as f:
+            # An empty file cannot be memory-mapped.
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if total else b''
+
+            with memoryview(source) as view:
+                digest = hashlib.new(self.__checksum, view)
+
+                for chunk_start in range(offset, total, self.__chunk_size):
+                    with view[chunk_start:chunk_start + self.__chunk_size] as chunk:
+                        sent_at = time.perf_counter()
+                        self.__controller.device.push(_ViewReader(chunk), chunk_file)
+                        self.__controller.shell(f'cat {quoted_chunk} >> {quoted_partial} && rm {quoted_chunk}')
+                        stats.chunk_latencies.append(time.perf_counter() - sent_at)
+                        stats.transferred_bytes += len(chunk)
+                        self._progress(str(local_path), chunk_start + len(chunk), total)
+
+            if total:
+                source.close()
+
+        if digest.hexdigest() != self._remote_checksum(partial):
+            self.__controller.shell(f'rm -f {quoted_partial}')
+            raise TransferError(device_path, f'{self.__checksum} checksum mismatch after push; partial file removed.')
+
+        self.__controller.shell(f'mv {quoted_partial} {shlex.quote(device_path)}')
+        stats.elapsed = time.perf_counter() - start
+        self.__history.append(stats)
+        count('controller.transfer.push.bytes', stats.transferred_bytes)
+
+        return stats
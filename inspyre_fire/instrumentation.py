@@ -0,0 +1,496 @@
+"""
+Operation timers, counters and on-demand profiling for the whole package.
+
+Instrumented code reports into the process-wide :data:`INSTRUMENTATION` registry through :func:`timed`,
+:func:`timer` and :func:`count`. The registry starts disabled (unless the `INSPYRE_FIRE_INSTRUMENTATION` environment
+variable is set to a true value), and while it is disabled every hook returns after a single attribute check.
+
+    from inspyre_fire.instrumentation import INSTRUMENTATION
+
+    INSTRUMENTATION.enable()
+    ...
+    print(INSTRUMENTATION.export_prometheus())
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+
+ENV_VARIABLE = 'INSPYRE_FIRE_INSTRUMENTATION'
+PROMETHEUS_PREFIX = 'inspyre_fire'
+PROFILERS = ('cprofile', 'tracemalloc')
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+_DISABLED = nullcontext()
+
+
+class TimerStats:
+    """
+    The running totals of one timed operation.
+    """
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'errors')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = 0.0
+        self.errors = 0
+
+    @property
+    def average(self) -> Optional[float]:
+        """The average duration (in seconds), or None if the operation has not run."""
+        return self.total / self.count if self.count else None
+
+    def add(self, duration: float, failed: bool = False) -> None:
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        self.errors += failed
+
+    def to_dict(self) -> dict:
+        return {
+                'count':   self.count,
+                'total':   self.total,
+                'average': self.average,
+                'min':     self.minimum if self.count else None,
+                'max':     self.maximum if self.count else None,
+                'errors':  self.errors,
+                }
+
+
+class Instrumentation:
+    """
+    A thread-safe registry of operation timers and event counters, with a cProfile/tracemalloc capture toggle.
+    """
+
+    def __init__(self, enabled: Optional[bool] = False):
+        """
+        Initialize an Instrumentation object.
+
+        Parameters:
+            enabled (bool):
+                If True, start recording straight away.
+        """
+        self.enabled = enabled
+        self.__timers: Dict[str, TimerStats] = {}
+        self.__counters: Dict[str, float] = {}
+        self.__lock = threading.Lock()
+        self.__profiler = None
+        self.__profiler_kind = None
+
+    @property
+    def counters(self) -> Dict[str, float]:
+        """
+        Get a snapshot of the counters.
+
+        Returns:
+            Dict[str, float]:
+                The counter values, keyed by name.
+        """
+        with self.__lock:
+            return dict(self.__counters)
+
+    @property
+    def profiling(self) -> Optional[str]:
+        """
+        Get the profiler that is currently capturing.
+
+        Returns:
+            str:
+                'cprofile' or 'tracemalloc', or None if no capture is running.
+        """
+        return self.__profiler_kind
+
+    @property
+    def timers(self) -> Dict[str, dict]:
+        """
+        Get a snapshot of the timers.
+
+        Returns:
+            Dict[str, dict]:
+                The count, total, average, min, max (in seconds) and error count of each operation, keyed by name.
+        """
+        with self.__lock:
+            return {name: stats.to_dict() for name, stats in self.__timers.items()}
+
+    def count(self, name: str, value: Optional[float] = 1) -> None:
+        """
+        Add to a counter.
+
+        Parameters:
+            name (str):
+                The counter, e.g. 'controller.transfer.bytes'.
+
+            value (float):
+                The amount to add.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def disable(self) -> None:
+        """
+        Stop recording. Recorded values are kept until :meth:`reset`.
+
+        Returns:
+            None
+        """
+        self.enabled = False
+
+    def enable(self) -> None:
+        """
+        Start recording.
+
+        Returns:
+            None
+        """
+        self.enabled = True
+
+    def export_json(self, indent: Optional[int] = 4) -> str:
+        """
+        Export the timers and counters as JSON.
+
+        Parameters:
+            indent (int):
+                The indentation passed to `json.dumps`.
+
+        Returns:
+            str:
+                The JSON document.
+        """
+        return json.dumps({'timers': self.timers, 'counters': self.counters}, indent=indent)
+
+    def export_prometheus(self, prefix: Optional[str] = PROMETHEUS_PREFIX) -> str:
+        """
+        Export the timers and counters in the Prometheus text exposition format.
+
+        Timers become a summary (`<prefix>_operation_seconds`, labelled by operation) plus min/max gauges and an
+        error counter; counters become `<prefix>_events_total`, labelled by event.
+
+        Parameters:
+            prefix (str):
+                The metric name prefix.
+
+        Returns:
+            str:
+                The exposition text.
+        """
+        timers = self.timers
+        counters = self.counters
+        lines = []
+
+        def label(value):
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        if timers:
+            name = f'{prefix}_operation_seconds'
+            lines.append(f'# HELP {name} Time spent in instrumented operations.')
+            lines.append(f'# TYPE {name} summary')
+
+            for operation, stats in sorted(timers.items()):
+                lines.append(f'{name}_count{{operation="{label(operation)}"}} {stats["count"]}')
+                lines.append(f'{name}_sum{{operation="{label(operation)}"}} {stats["total"]!r}')
+
+            for key in ('min', 'max'):
+                gauge = f'{prefix}_operation_{key}_seconds'
+                lines.append(f'# TYPE {gauge} gauge')
+
+                for operation, stats in sorted(timers.items()):
+                    lines.append(f'{gauge}{{operation="{label(operation)}"}} {stats[key]!r}')
+
+            errors = f'{prefix}_operation_errors_total'
+            lines.append(f'# TYPE {errors} counter')
+
+            for operation, stats in sorted(timers.items()):
+                lines.append(f'{errors}{{operation="{label(operation)}"}} {stats["errors"]}')
+
+        if counters:
+            name = f'{prefix}_events_total'
+            lines.append(f'# HELP {name} Instrumented event counters.')
+            lines.append(f'# TYPE {name} counter')
+
+            for event, value in sorted(counters.items()):
+                lines.append(f'{name}{{event="{label(event)}"}} {value!r}')
+
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def record(self, name: str, duration: float, failed: Optional[bool] = False) -> None:
+        """
+        Record one run of an operation.
+
+        Parameters:
+            name (str):
+                The operation, e.g. 'config.save'.
+
+            duration (float):
+                How long it took (in seconds).
+
+            failed (bool):
+                If True, the operation raised an exception.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+
+        with self.__lock:
+            stats = self.__timers.get(name)
+
+            if stats is None:
+                stats = self.__timers[name] = TimerStats()
+
+            stats.add(duration, failed)
+
+    def reset(self) -> None:
+        """
+        Clear every timer and counter.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__timers.clear()
+            self.__counters.clear()
+
+    def save(self, file_path: Union[str, Path], fmt: Optional[str] = 'json') -> Path:
+        """
+        Write an export to a file.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                The file to write.
+
+            fmt (str):
+                'json' or 'prometheus'.
+
+        Returns:
+            Path:
+                The file that was written.
+        """
+        exporters = {'json': self.export_json, 'prometheus': self.export_prometheus}
+
+        if fmt not in exporters:
+            raise ValueError(f"Invalid format: '{fmt}'. Valid formats: {list(exporters)}")
+
+        file_path = Path(file_path).expanduser().resolve().absolute()
+        file_path.write_text(exporters[fmt]())
+
+        return file_path
+
+    def start_profiling(self, kind: Optional[str] = 'cprofile') -> None:
+        """
+        Start a cProfile or tracemalloc capture.
+
+        Parameters:
+            kind (str):
+                'cprofile' to profile calls, or 'tracemalloc' to trace memory allocations.
+
+        Returns:
+            None
+        """
+        if kind not in PROFILERS:
+            raise ValueError(f"Invalid profiler: '{kind}'. Valid profilers: {list(PROFILERS)}")
+
+        if self.__profiler_kind is not None:
+            raise RuntimeError(f"A '{self.__profiler_kind}' capture is already running.")
+
+        if kind == 'cprofile':
+            import cProfile
+
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        else:
+            import tracemalloc
+
+            tracemalloc.start()
+
+        self.__profiler_kind = kind
+
+    def stop_profiling(self, file_path: Optional[Union[str, Path]] = None):
+        """
+        Stop the running capture.
+
+        Parameters:
+            file_path (Union[str, Path]):
+                If given, the capture is also written to this file (a `pstats` dump or a tracemalloc snapshot), for
+                later inspection.
+
+        Returns:
+            Union[pstats.Stats, tracemalloc.Snapshot]:
+                The capture.
+        """
+        kind = self.__profiler_kind
+
+        if kind is None:
+            raise RuntimeError('No capture is running.')
+
+        if kind == 'cprofile':
+            import pstats
+
+            self.__profiler.disable()
+            capture = pstats.Stats(self.__profiler)
+        else:
+            import tracemalloc
+
+            capture = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        self.__profiler = self.__profiler_kind = None
+
+        if file_path is not None and kind == 'cprofile':
+            capture.dump_stats(str(file_path))
+        elif file_path is not None:
+            capture.dump(str(file_path))
+
+        return capture
+
+    @contextmanager
+    def profile(self, kind: Optional[str] = 'cprofile', file_path: Optional[Union[str, Path]] = None):
+        """
+        Capture a profile of a block of code.
+
+        Parameters:
+            kind (str):
+                'cprofile' or 'tracemalloc'.
+
+            file_path (Union[str, Path]):
+                If given, the capture is also written to this file.
+
+        Yields:
+            dict:
+                A dict whose 'capture' key holds the capture once the block exits.
+        """
+        result = {'capture': None}
+        self.start_profiling(kind)
+
+        try:
+            yield result
+        finally:
+            result['capture'] = self.stop_profiling(file_path)
+
+    @contextmanager
+    def _time(self, name: str):
+        start = time.perf_counter()
+        failed = False
+
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, failed)
+
+    def timer(self, name: str):
+        """
+        Time a block of code.
+
+        Parameters:
+            name (str):
+                The operation, e.g. 'config.save'.
+
+        Returns:
+            ContextManager:
+                The timing context; a shared no-op context while recording is disabled.
+        """
+        if not self.enabled:
+            return _DISABLED
+
+        return self._time(name)
+
+    def __repr__(self):
+        return f'<Instrumentation: enabled={self.enabled} | {len(self.__timers)} timers | @{hex(id(self))}>'
+
+
+INSTRUMENTATION = Instrumentation(os.environ.get(ENV_VARIABLE, '').lower() in TRUE_VALUES)
+"""The process-wide registry every instrumented operation reports into."""
+
+
+def count(name: str, value: Optional[float] = 1) -> None:
+    """
+    Add to a counter in :data:`INSTRUMENTATION`.
+
+    Parameters:
+        name (str):
+            The counter.
+
+        value (float):
+            The amount to add.
+
+    Returns:
+        None
+    """
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.count(name, value)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorate a function so every call is timed into :data:`INSTRUMENTATION` under `name`.
+
+    Parameters:
+        name (str):
+            The operation, e.g. 'config.save'.
+
+    Returns:
+        Callable:
+            The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                INSTRUMENTATION.record(name, time.perf_counter() - start, True)
+                raise
+
+            INSTRUMENTATION.record(name, time.perf_counter() - start)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def timer(name: str):
+    """
+    Time a block of code into :data:`INSTRUMENTATION`.
+
+    Parameters:
+        name (str):
+            The operation.
+
+    Returns:
+        ContextManager:
+            The timing context.
+    """
+    return INSTRUMENTATION.timer(name)
+
+
+__all__ = [
+        'INSTRUMENTATION',
+        'Instrumentation',
+        'count',
+        'timed',
+        'timer',
+        ]
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+# Importing the package creates config files in the user directories; keep the tests out of them.
+_SCRATCH = tempfile.mkdtemp(prefix='inspyre-fire-tests-')
+
+for _variable in ('XDG_CONFIG_HOME', 'XDG_CACHE_HOME', 'XDG_DATA_HOME', 'XDG_STATE_HOME'):
+    os.environ[_variable] = os.path.join(_SCRATCH, _variable.lower())
+
+# The local ADB stand-in lives in `benchmarks`.
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import socket
+import pytest
+from benchmarks.fake_adb import FakeAdbDevice
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.discovery import DEFAULT_CACHE_TTL, DeviceDiscovery, probe, scan
+
+
+GETPROP = '''#!/bin/sh
+case "$1" in
+    ro.serialno) echo G070VM1234 ;;
+    ro.product.model) echo AFTMM ;;
+    ro.product.manufacturer) echo Amazon ;;
+esac
+'''
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    yield server
+
+    server.close()
+
+
+@pytest.fixture
+def closed_port():
+    # A port that was free a moment ago and that nothing listens on now.
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def getprop(tmp_path, monkeypatch):
+    bin_directory = tmp_path / 'bin'
+    bin_directory.mkdir()
+    script = bin_directory / 'getprop'
+    script.write_text(GETPROP)
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{bin_directory}{os.pathsep}{os.environ["PATH"]}')
+
+
+def fake_controller(host, port):
+    return Controller(host=host, port=port, adbkey='', device_factory=lambda: FakeAdbDevice(latency=0))
+
+
+def make_discovery(tmp_path, port, **kwargs):
+    kwargs.setdefault('fingerprint', False)
+
+    return DeviceDiscovery(ports=(port,), cache_path=tmp_path / 'discovered.json', **kwargs)
+
+
+def test_probe_open_and_closed_ports(listener, closed_port):
+    port = listener.getsockname()[1]
+
+    assert asyncio.run(probe('127.0.0.1', port, timeout=1.0))
+    assert not asyncio.run(probe('127.0.0.1', closed_port, timeout=1.0))
+
+
+def test_scan_finds_open_ports_one_at_a_time(closed_port):
+    servers = []
+
+    try:
+        for _ in range(3):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(('127.0.0.1', 0))
+            server.listen(4)
+            servers.append(server)
+
+        ports = [server.getsockname()[1] for server in servers] + [closed_port]
+        found = asyncio.run(scan(['127.0.0.1'], ports, concurrency=1, timeout=1.0))
+
+        assert found == [('127.0.0.1', port) for port in ports[:3]]
+    finally:
+        for server in servers:
+            server.close()
+
+
+def test_discover_reuses_the_cache(tmp_path, listener):
+    port = listener.getsockname()[1]
+    discovery = make_discovery(tmp_path, port)
+
+    devices = discovery.discover('127.0.0.1')
+    assert [(device.host, device.port) for device in devices] == [('127.0.0.1', port)]
+    assert discovery.cache_path.exists()
+
+    # Nothing listens any more, so only the cache can still report the device.
+    listener.close()
+    assert discovery.discover('127.0.0.1') == devices
+    assert discovery.discover('127.0.0.1', refresh=True) == []
+
+
+def test_cache_is_ignored_for_other_targets_and_when_stale(tmp_path, listener):
+    port = listener.getsockname()[1]
+    discovery = make_discovery(tmp_path, port)
+    discovery.discover('127.0.0.1')
+
+    assert discovery.load_cache('127.0.0.2') is None
+    assert make_discovery(tmp_path, port + 1).load_cache('127.0.0.1') is None
+
+    data = json.loads(discovery.cache_path.read_text())
+    data['scanned_at'] -= DEFAULT_CACHE_TTL + 1
+    discovery.cache_path.write_text(json.dumps(data))
+
+    assert discovery.load_cache('127.0.0.1') is None
+    assert make_discovery(tmp_path, port, cache_ttl=None).load_cache('127.0.0.1') is not None
+
+
+def test_corrupt_cache_means_a_rescan(tmp_path, listener):
+    port = listener.getsockname()[1]
+    discovery = make_discovery(tmp_path, port)
+    discovery.cache_path.write_text('{not json')
+
+    assert discovery.load_cache('127.0.0.1') is None
+    assert len(discovery.discover('127.0.0.1')) == 1
+
+
+def test_fingerprinted_inventory(tmp_path, listener, closed_port, getprop):
+    port = listener.getsockname()[1]
+    discovery = DeviceDiscovery(
+            ports=(port, closed_port),
+            cache_path=tmp_path / 'discovered.json',
+            controller_factory=fake_controller,
+            )
+
+    devices = discovery.discover('127.0.0.1')
+
+    assert len(devices) == 1
+    assert devices[0].serial == 'G070VM1234'
+    assert devices[0].model == 'AFTMM'
+    assert devices[0].manufacturer == 'Amazon'
+    assert devices[0].android_version is None
+
+    inventory = discovery.inventory('127.0.0.1')
+
+    assert [entry.name for entry in inventory] == ['AFTMM (G070VM1234)']
@@ -0,0 +1,50 @@
+import struct
+import zlib
+import pytest
+from inspyre_fire.controller.screen import Tile
+
+
+# One red pixel and one translucent blue pixel, in each framebuffer layout.
+PIXELS = {
+        1: bytes([255, 0, 0, 255, 0, 0, 255, 128]),  # RGBA_8888
+        2: bytes([255, 0, 0, 7, 0, 0, 255, 7]),      # RGBX_8888
+        3: bytes([255, 0, 0, 0, 0, 255]),            # RGB_888
+        5: bytes([0, 0, 255, 255, 255, 0, 0, 128]),  # BGRA_8888
+        }
+
+EXPECTED = {
+        1: (6, bytes([255, 0, 0, 255, 0, 0, 255, 128])),
+        2: (2, bytes([255, 0, 0, 0, 0, 255])),
+        3: (2, bytes([255, 0, 0, 0, 0, 255])),
+        5: (6, bytes([255, 0, 0, 255, 0, 0, 255, 128])),
+        }
+
+
+def decode_png(png):
+    assert png.startswith(b'\x89PNG\r\n\x1a\n')
+    offset, chunks = 8, {}
+
+    while offset < len(png):
+        length, kind = struct.unpack_from('>I4s', png, offset)
+        chunks[kind] = png[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+    width, height, _, color_type = struct.unpack_from('>IIBB', chunks[b'IHDR'])
+    scanlines = zlib.decompress(chunks[b'IDAT'])
+    stride = len(scanlines) // height
+
+    return color_type, b''.join(scanlines[y * stride + 1:(y + 1) * stride] for y in range(height))
+
+
+@pytest.mark.parametrize('pixel_format', sorted(PIXELS))
+def test_to_png_writes_rgb_channels_in_order(pixel_format):
+    tile = Tile(0, 0, 2, 1, zlib.compress(PIXELS[pixel_format]))
+
+    assert decode_png(tile.to_png(pixel_format)) == EXPECTED[pixel_format]
+
+
+def test_to_png_rejects_rgb_565():
+    tile = Tile(0, 0, 2, 1, zlib.compress(bytes(4)))
+
+    with pytest.raises(ValueError):
+        tile.to_png(4)
@@ -0,0 +1,113 @@
+import os
+import pytest
+from benchmarks.fake_adb import FakeAdbDevice
+from inspyre_fire.controller import Controller
+from inspyre_fire.controller.errors import DeviceNotConnectedError, TransferError
+from inspyre_fire.controller.transfer import PARTIAL_SUFFIX, TransferManager
+
+
+CHUNK_SIZE = 4096
+FILE_SIZE = CHUNK_SIZE * 10 + 123
+
+
+@pytest.fixture
+def controller():
+    controller = Controller(host='127.0.0.1', port=5555, adbkey='', device_factory=lambda: FakeAdbDevice(latency=0))
+    controller.connect()
+
+    yield controller
+
+    controller.close()
+
+
+@pytest.fixture
+def manager(controller):
+    return TransferManager(controller, chunk_size=CHUNK_SIZE)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source.bin'
+    path.write_bytes(os.urandom(FILE_SIZE))
+
+    return path
+
+
+def test_push_writes_the_file(manager, source, tmp_path):
+    remote = tmp_path / 'remote.bin'
+    stats = manager.push(source, str(remote), resume=False)
+
+    assert remote.read_bytes() == source.read_bytes()
+    assert stats.transferred_bytes == FILE_SIZE
+    assert len(stats.chunk_latencies) == 11
+    assert not (tmp_path / f'remote.bin{PARTIAL_SUFFIX}').exists()
+
+
+def test_push_resumes_from_a_partial_file(manager, source, tmp_path):
+    remote = tmp_path / 'remote.bin'
+    partial = tmp_path / f'remote.bin{PARTIAL_SUFFIX}'
+    partial.write_bytes(source.read_bytes()[:5000])
+
+    stats = manager.push(source, str(remote))
+
+    assert remote.read_bytes() == source.read_bytes()
+    assert stats.resumed_from == 5000
+    assert stats.transferred_bytes == FILE_SIZE - 5000
+
+
+def test_push_checksum_mismatch_removes_the_partial_file(manager, source, tmp_path):
+    remote = tmp_path / 'remote.bin'
+    partial = tmp_path / f'remote.bin{PARTIAL_SUFFIX}'
+    partial.write_bytes(b'\0' * 5000)
+
+    with pytest.raises(TransferError):
+        manager.push(source, str(remote))
+
+    assert not partial.exists()
+    assert not remote.exists()
+
+
+def test_pull_writes_the_file(manager, source, tmp_path):
+    local = tmp_path / 'local.bin'
+    stats = manager.pull(str(source), local, resume=False)
+
+    assert local.read_bytes() == source.read_bytes()
+    assert stats.transferred_bytes == FILE_SIZE
+
+
+def test_pull_resumes_from_the_last_whole_chunk(manager, source, tmp_path):
+    local = tmp_path / 'local.bin'
+    (tmp_path / f'local.bin{PARTIAL_SUFFIX}').write_bytes(source.read_bytes()[:CHUNK_SIZE * 3 + 100])
+
+    stats = manager.pull(str(source), local)
+
+    assert local.read_bytes() == source.read_bytes()
+    assert stats.resumed_from == CHUNK_SIZE * 3
+    assert stats.transferred_bytes == FILE_SIZE - CHUNK_SIZE * 3
+
+
+def test_pull_checksum_mismatch_removes_the_partial_file(manager, source, tmp_path):
+    local = tmp_path / 'local.bin'
+    partial = tmp_path / f'local.bin{PARTIAL_SUFFIX}'
+    partial.write_bytes(b'\0' * CHUNK_SIZE * 2)
+
+    with pytest.raises(TransferError):
+        manager.pull(str(source), local)
+
+    assert not partial.exists()
+    assert not local.exists()
+
+
+def test_pull_of_a_missing_file(manager, tmp_path):
+    with pytest.raises(TransferError):
+        manager.pull(str(tmp_path / 'missing.bin'), tmp_path / 'local.bin')
+
+
+def test_transfers_need_a_connection(controller, source, tmp_path):
+    controller.close()
+
+    with pytest.raises(DeviceNotConnectedError):
+        controller.push(source, str(tmp_path / 'remote.bin'))
+
+    with pytest.raises(DeviceNotConnectedError):
+        controller.pull(str(source), tmp_path / 'local.bin')